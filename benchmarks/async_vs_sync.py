@@ -0,0 +1,116 @@
+# Teste de carga comparando DB_MODO=sync (threadpool) e DB_MODO=async (AsyncEngine).
+# Cada modo sobe um servidor uvicorn real sobre uma cópia do mesmo banco sintético e
+# recebe a mesma mistura de leituras e escritas com N clientes concorrentes.
+#
+# Uso: python -m benchmarks.async_vs_sync [--voos 20000] [--concorrencia 64] [--segundos 10]
+from datetime import datetime, timedelta
+import argparse
+import asyncio
+import logging
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from database import criar_engine
+from benchmarks.dados import popular
+
+# Mistura de requisições (método, caminho, corpo) ponderada por frequência
+def _requisicao(aleatorio: random.Random, n_voos: int):
+    sorteio = aleatorio.random()
+    if sorteio < 0.35:
+        return "GET", f"/cias/{aleatorio.randint(1, 10)}", None
+    if sorteio < 0.60:
+        return "GET", f"/aeronaves/{aleatorio.randint(1, 100)}", None
+    if sorteio < 0.85:
+        return "GET", "/voos/?ordenacao=hr_partida&limit=20", None
+    if sorteio < 0.90:
+        return "GET", "/voos/contagem-por-companhia", None
+    partida = datetime(2025, 6, 1) + timedelta(minutes=aleatorio.randint(0, 100_000))
+    return "PUT", f"/voos/{aleatorio.randint(1, n_voos)}", {
+        "numero_voo": aleatorio.randint(1, 9999), "origem": "São Paulo (GRU)", "destino": "Recife (REC)",
+        "hr_partida": partida.isoformat(), "hr_chegada": (partida + timedelta(hours=3)).isoformat(),
+        "status": "Atrasado", "aeronave_id": aleatorio.randint(1, 100), "cia_id": aleatorio.randint(1, 10),
+    }
+
+async def _cliente(cliente: httpx.AsyncClient, fim: float, n_voos: int, latencias: list, erros: list) -> None:
+    aleatorio = random.Random()
+    while time.perf_counter() < fim:
+        metodo, caminho, corpo = _requisicao(aleatorio, n_voos)
+        inicio = time.perf_counter()
+        resposta = await cliente.request(metodo, caminho, json=corpo)
+        latencias.append(time.perf_counter() - inicio)
+        if resposta.status_code >= 500:
+            erros.append(resposta.status_code)
+
+async def carga(url: str, concorrencia: int, segundos: float, n_voos: int) -> tuple[list, list]:
+    latencias, erros = [], []
+    limites = httpx.Limits(max_connections=concorrencia)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+        fim = time.perf_counter() + segundos
+        await asyncio.gather(*(_cliente(cliente, fim, n_voos, latencias, erros) for _ in range(concorrencia)))
+    return latencias, erros
+
+def aguardar_servidor(url: str, processo: subprocess.Popen) -> None:
+    for _ in range(100):
+        if processo.poll() is not None:
+            raise RuntimeError("O servidor encerrou durante a inicialização")
+        try:
+            httpx.get(f"{url}/monitoramento/pool", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError("O servidor não respondeu a tempo")
+
+def executar(modo: str, banco_base: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = os.path.join(diretorio, "bench.db")
+        shutil.copy(banco_base, banco)
+        ambiente = dict(os.environ, DATABASE_URL=f"sqlite:///{banco}", DB_MODO=modo)
+        porta = 8100 if modo == "sync" else 8101
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(porta), "--log-level", "warning"],
+            env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            url = f"http://127.0.0.1:{porta}"
+            aguardar_servidor(url, processo)
+            latencias, erros = asyncio.run(carga(url, args.concorrencia, args.segundos, args.voos))
+        finally:
+            processo.terminate()
+            processo.wait()
+
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        "modo": modo,
+        "req/s": round(len(latencias) / args.segundos),
+        "p50 (ms)": round(quantis[49] * 1000, 2),
+        "p95 (ms)": round(quantis[94] * 1000, 2),
+        "p99 (ms)": round(quantis[98] * 1000, 2),
+        "erros 5xx": len(erros),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga: rotas síncronas x assíncronas")
+    parser.add_argument("--voos", type=int, default=20_000)
+    parser.add_argument("--concorrencia", type=int, default=64)
+    parser.add_argument("--segundos", type=float, default=10)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco_base = os.path.join(diretorio, "base.db")
+        engine = criar_engine(f"sqlite:///{banco_base}", nome="bench")
+        popular(engine, n_voos=args.voos)
+        engine.dispose()
+        for modo in ("sync", "async"):
+            print(executar(modo, banco_base, args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# Cenários de carga para benchmarks.suite: operações sobre as rotas de voos, aeronaves, cias e
+# busca, com parâmetros sorteados a partir dos dados do banco, e misturas ponderadas dessas
+# operações. Também lê e grava tráfego em JSONL para reprodução.
+#
+# As escritas não conflitam com os dados existentes: voos novos ocupam horários livres depois do
+# último voo do banco, e atualizações e exclusões individuais atuam sobre registros criados pelo
+# próprio benchmark.
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func, select
+from models.aeronave import Aeronave
+from models.cia import Cia
+from models.voo import Voo
+from urllib.parse import urlencode
+import itertools
+import json
+import random
+
+STATUS_ALTERADOS = ["No Horário", "Atrasado", "Cancelado"]
+
+@dataclass
+class Requisicao:
+    metodo: str
+    caminho: str
+    corpo: object = None  # Enviado como JSON
+    conteudo: str | None = None  # Corpo bruto (ex.: NDJSON da importação)
+    tipo: str | None = None  # Content-Type do corpo bruto
+    ao_responder: object = field(default=None, repr=False)  # Chamado com (status, json) da resposta
+
+    def como_json(self) -> dict:
+        linha = {"metodo": self.metodo, "caminho": self.caminho}
+        if self.corpo is not None:
+            linha["corpo"] = self.corpo
+        if self.conteudo is not None:
+            linha.update(conteudo=self.conteudo, tipo=self.tipo)
+        return linha
+
+# Dados do banco usados para montar requisições válidas. Com vários processos de carga, cada um
+# recebe o seu índice para que os horários e códigos gerados não colidam
+class Contexto:
+    def __init__(self, url_banco: str, processo: int = 0, processos: int = 1):
+        engine = create_engine(url_banco)
+        try:
+            with engine.connect() as conexao:
+                self.cias = [tuple(linha) for linha in conexao.execute(select(Cia.id, Cia.nome))]
+                self.aeronaves = [tuple(linha) for linha in conexao.execute(select(Aeronave.id, Aeronave.cia_id))]
+                self.modelos = sorted(conexao.execute(select(Aeronave.modelo).distinct()).scalars())
+                self.aeroportos = sorted(conexao.execute(select(Voo.origem).distinct()).scalars())
+                self.maior_voo, primeira, ultima = conexao.execute(
+                    select(func.max(Voo.id), func.min(Voo.hr_partida), func.max(Voo.hr_chegada))
+                ).one()
+        finally:
+            engine.dispose()
+        if not self.cias or not self.aeronaves:
+            raise ValueError("O banco precisa de ao menos uma companhia e uma aeronave")
+        self.primeira_partida = _data(primeira) or datetime(2025, 1, 1)
+        self.ultima_chegada = _data(ultima) or self.primeira_partida
+        self.processo, self.processos = processo, processos
+        self._sequencia = itertools.count()
+        self.criados = {"voo": {}, "aeronave": {}, "cia": {}}  # tabela -> {id: corpo}
+
+    def proximo_numero(self) -> int:
+        return next(self._sequencia) * self.processos + self.processo
+
+    def data(self, aleatorio: random.Random) -> datetime:
+        dias = max(0, (self.ultima_chegada - self.primeira_partida).days)
+        return self.primeira_partida + timedelta(days=aleatorio.randint(0, dias), hours=aleatorio.randint(0, 23))
+
+def _data(valor) -> datetime | None:
+    return datetime.fromisoformat(valor) if isinstance(valor, str) else valor
+
+# Corpos de criação e alterações parciais de cada tabela
+def _corpo_voo(contexto: Contexto, aleatorio: random.Random) -> dict:
+    # Horários livres: um voo a cada 4 horas depois do fim da malha, sem sobreposição entre si
+    numero = contexto.proximo_numero()
+    partida = contexto.ultima_chegada.replace(minute=0, second=0, microsecond=0) + timedelta(days=30, hours=4 * numero)
+    aeronave_id, cia_id = aleatorio.choice(contexto.aeronaves)
+    origem, destino = aleatorio.sample(contexto.aeroportos, 2) if len(contexto.aeroportos) > 1 else ("Origem", "Destino")
+    return {
+        "numero_voo": 90000 + numero % 10000, "origem": origem, "destino": destino,
+        "hr_partida": partida.isoformat(), "hr_chegada": (partida + timedelta(minutes=aleatorio.randint(45, 200))).isoformat(),
+        "status": "No Horário", "aeronave_id": aeronave_id, "cia_id": cia_id,
+    }
+
+def _corpo_aeronave(contexto: Contexto, aleatorio: random.Random) -> dict:
+    ultimo = contexto.primeira_partida - timedelta(days=aleatorio.randint(0, 180))
+    return {
+        "modelo": aleatorio.choice(contexto.modelos or ["Airbus A320"]), "capacidade": aleatorio.randint(70, 220),
+        "last_check": ultimo.isoformat(), "next_check": (ultimo + timedelta(days=aleatorio.randint(120, 200))).isoformat(),
+        "cia_id": aleatorio.choice(contexto.cias)[0],
+    }
+
+def _corpo_cia(contexto: Contexto, aleatorio: random.Random) -> dict:
+    numero = contexto.proximo_numero()
+    return {"nome": f"Companhia Benchmark {numero}", "cod_iata": f"BX{numero}"}
+
+def _alteracao(tabela: str, aleatorio: random.Random) -> dict:
+    if tabela == "voo":
+        return {"status": aleatorio.choice(STATUS_ALTERADOS)}
+    if tabela == "aeronave":
+        return {"capacidade": aleatorio.randint(70, 220)}
+    return {"nome": f"Companhia Benchmark Renomeada {aleatorio.randint(1, 10 ** 6)}"}
+
+TABELAS = {
+    "voo": ("/voos", _corpo_voo),
+    "aeronave": ("/aeronaves", _corpo_aeronave),
+    "cia": ("/cias", _corpo_cia),
+}
+
+# Operações de escrita, iguais para as três tabelas
+def criar(tabela: str):
+    prefixo, gerar = TABELAS[tabela]
+
+    def operacao(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+        corpo = gerar(contexto, aleatorio)
+
+        def registrar(status, resposta):
+            if status == 200 and isinstance(resposta, dict) and "id" in resposta:
+                contexto.criados[tabela][resposta["id"]] = corpo
+        return Requisicao("POST", f"{prefixo}/", corpo, ao_responder=registrar)
+    return operacao
+
+def atualizar(tabela: str):
+    prefixo, _ = TABELAS[tabela]
+
+    def operacao(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+        criados = contexto.criados[tabela]
+        if not criados:
+            return criar(tabela)(contexto, aleatorio)
+        id_registro = aleatorio.choice(list(criados))
+        criados[id_registro] = {**criados[id_registro], **_alteracao(tabela, aleatorio)}
+        return Requisicao("PUT", f"{prefixo}/{id_registro}", criados[id_registro])
+    return operacao
+
+# Alteração parcial de um registro existente (PATCH), sem a versão: mede o caminho de um UPDATE só
+def alterar(tabela: str):
+    prefixo, _ = TABELAS[tabela]
+
+    def operacao(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+        if tabela == "cia":
+            id_cia, nome = aleatorio.choice(contexto.cias)
+            return Requisicao("PATCH", f"{prefixo}/{id_cia}", {"nome": nome})
+        if tabela == "voo":
+            id_registro = aleatorio.randint(1, contexto.maior_voo or 1)
+        else:
+            id_registro = aleatorio.choice(contexto.aeronaves)[0]
+        return Requisicao("PATCH", f"{prefixo}/{id_registro}", _alteracao(tabela, aleatorio))
+    return operacao
+
+def excluir(tabela: str):
+    prefixo, _ = TABELAS[tabela]
+
+    def operacao(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+        criados = contexto.criados[tabela]
+        if not criados:
+            return criar(tabela)(contexto, aleatorio)
+        id_registro = aleatorio.choice(list(criados))
+        del criados[id_registro]
+        return Requisicao("DELETE", f"{prefixo}/{id_registro}")
+    return operacao
+
+def criar_lote(tabela: str, tamanho: int = 20):
+    prefixo, gerar = TABELAS[tabela]
+
+    def operacao(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+        corpos = [gerar(contexto, aleatorio) for _ in range(aleatorio.randint(1, tamanho))]
+
+        def registrar(status, resposta):
+            if status == 200 and isinstance(resposta, dict):
+                # "ids" traz só os itens gravados, na ordem do lote
+                recusados = {erro["indice"] for erro in resposta.get("erros", [])}
+                gravados = [corpo for indice, corpo in enumerate(corpos) if indice not in recusados]
+                contexto.criados[tabela].update(zip(resposta.get("ids", []), gravados))
+        return Requisicao("POST", f"{prefixo}/bulk", corpos, ao_responder=registrar)
+    return operacao
+
+def atualizar_lote(tabela: str, tamanho: int = 10):
+    prefixo, _ = TABELAS[tabela]
+
+    def operacao(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+        # Alterações parciais em registros existentes (para voos: atualização do painel de status)
+        quantidade = aleatorio.randint(1, tamanho)
+        if tabela == "cia":
+            # Regrava o nome atual: renomear as companhias mudaria os filtros das leituras
+            cias = [aleatorio.choice(contexto.cias) for _ in range(quantidade)]
+            return Requisicao("PATCH", f"{prefixo}/bulk", [{"id": id_cia, "nome": nome} for id_cia, nome in cias])
+        if tabela == "voo":
+            ids = [aleatorio.randint(1, contexto.maior_voo or 1) for _ in range(quantidade)]
+        else:
+            ids = [aleatorio.choice(contexto.aeronaves)[0] for _ in range(quantidade)]
+        return Requisicao("PATCH", f"{prefixo}/bulk", [{"id": id_registro, **_alteracao(tabela, aleatorio)} for id_registro in ids])
+    return operacao
+
+def excluir_lote(tabela: str, tamanho: int = 20):
+    prefixo, _ = TABELAS[tabela]
+
+    def operacao(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+        criados = contexto.criados[tabela]
+        if not criados:
+            return criar_lote(tabela, tamanho)(contexto, aleatorio)
+        ids = aleatorio.sample(list(criados), min(len(criados), aleatorio.randint(1, tamanho)))
+        for id_registro in ids:
+            del criados[id_registro]
+        return Requisicao("DELETE", f"{prefixo}/bulk", ids)
+    return operacao
+
+def importar_voos(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+    linhas = [json.dumps(_corpo_voo(contexto, aleatorio), ensure_ascii=False) for _ in range(aleatorio.randint(1, 20))]
+    return Requisicao("POST", "/voos/import?formato=ndjson", conteudo="\n".join(linhas) + "\n", tipo="application/x-ndjson")
+
+# Status pela fila de escrita diferida (202, gravado em lotes)
+def status_fila(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+    id_voo = aleatorio.randint(1, contexto.maior_voo or 1)
+    return Requisicao("PUT", f"/voos/{id_voo}/status", _alteracao("voo", aleatorio))
+
+# Operações de leitura
+def _get(caminho: str, **parametros) -> Requisicao:
+    consulta = urlencode({nome: valor for nome, valor in parametros.items() if valor is not None})
+    return Requisicao("GET", f"{caminho}?{consulta}" if consulta else caminho)
+
+def _codigo_aeroporto(nome: str) -> str:
+    # "São Paulo (GRU)" -> "GRU": busca por substring, como um usuário digitaria
+    return nome[nome.find("(") + 1:nome.find(")")] if "(" in nome else nome[:3]
+
+LEITURAS = {
+    "voos_periodo": lambda contexto, aleatorio: _get(
+        "/voos/", data_inicio=contexto.data(aleatorio).date(), ordenacao="hr_partida", limit=20,
+    ),
+    "voos_texto": lambda contexto, aleatorio: _get(
+        "/voos/", busca_texto=_codigo_aeroporto(aleatorio.choice(contexto.aeroportos)) if contexto.aeroportos else "a", limit=20,
+    ),
+    "voos_companhia": lambda contexto, aleatorio: _get(
+        "/voos/", companhia_nome=aleatorio.choice(contexto.cias)[1].split()[0], limit=20,
+    ),
+    "voos_contagem": lambda contexto, aleatorio: _get("/voos/contagem-por-companhia"),
+    "voos_conexoes": lambda contexto, aleatorio: _get(
+        "/voos/conexoes", origem=aleatorio.choice(contexto.aeroportos), destino=aleatorio.choice(contexto.aeroportos),
+        partida_apos=contexto.data(aleatorio).isoformat(),
+    ) if contexto.aeroportos else _get("/voos/contagem-por-companhia"),
+    "voos_completo": lambda contexto, aleatorio: _get("/voos/voos-completo", formato="ndjson"),
+    "voos_exportar": lambda contexto, aleatorio: _get("/voos/export", formato="ndjson"),
+    "aeronave": lambda contexto, aleatorio: _get(f"/aeronaves/{aleatorio.choice(contexto.aeronaves)[0]}"),
+    "aeronaves_cia": lambda contexto, aleatorio: _get("/aeronaves/", cia_id=aleatorio.choice(contexto.cias)[0], limit=20),
+    "aeronaves_listar": lambda contexto, aleatorio: _get("/aeronaves/listar", limit=100),
+    "aeronaves_contagem": lambda contexto, aleatorio: _get("/aeronaves/contagem-aeronaves-por-voos"),
+    "aeronaves_completas": lambda contexto, aleatorio: _get("/aeronaves/aeronaves-completas"),
+    "aeronaves_disponiveis": lambda contexto, aleatorio: _disponiveis(contexto, aleatorio),
+    "aeronaves_manutencao": lambda contexto, aleatorio: _get(
+        "/aeronaves/manutencao", cia_id=aleatorio.choice(contexto.cias)[0], referencia=contexto.data(aleatorio).isoformat(),
+    ),
+    "cia": lambda contexto, aleatorio: _get(f"/cias/{aleatorio.choice(contexto.cias)[0]}"),
+    "cias_nome": lambda contexto, aleatorio: _get("/cias/", busca_texto=aleatorio.choice(contexto.cias)[1][:4], limit=20),
+    "cias_listar": lambda contexto, aleatorio: _get("/cias/listar", limit=100),
+    "cias_contagem": lambda contexto, aleatorio: _get("/cias/contagem-por-modelo"),
+    "cias_completa": lambda contexto, aleatorio: _get("/cias/cias-completa"),
+    "busca": lambda contexto, aleatorio: _get(
+        "/busca/", q=aleatorio.choice([_codigo_aeroporto(nome) for nome in contexto.aeroportos] + [nome for _, nome in contexto.cias])[:5],
+    ),
+}
+
+def _disponiveis(contexto: Contexto, aleatorio: random.Random) -> Requisicao:
+    inicio = contexto.data(aleatorio)
+    return _get(
+        "/aeronaves/disponiveis", inicio=inicio.isoformat(), fim=(inicio + timedelta(hours=aleatorio.randint(1, 6))).isoformat(),
+        cia_id=aleatorio.choice(contexto.cias)[0],
+    )
+
+ESCRITAS = {
+    **{f"{tabela}_{nome}": fabrica(tabela) for tabela in TABELAS for nome, fabrica in (
+        ("criar", criar), ("atualizar", atualizar), ("alterar", alterar), ("excluir", excluir),
+        ("criar_lote", criar_lote), ("atualizar_lote", atualizar_lote), ("excluir_lote", excluir_lote),
+    )},
+    "voo_importar": importar_voos,
+    "voo_status_fila": status_fila,
+}
+OPERACOES = {**LEITURAS, **ESCRITAS}
+
+# Misturas ponderadas (operação -> peso). "completo" passa por todas as rotas de voos, aeronaves,
+# cias e busca, inclusive as de streaming de tabelas inteiras
+_LEITURA = {
+    "voos_periodo": 20, "voos_texto": 8, "voos_companhia": 5, "voos_contagem": 4, "voos_conexoes": 6,
+    "aeronave": 15, "aeronaves_cia": 6, "aeronaves_disponiveis": 4, "aeronaves_contagem": 2,
+    "cia": 15, "cias_nome": 4, "cias_contagem": 2, "busca": 9,
+}
+CENARIOS = {
+    "leitura": _LEITURA,
+    "misto": {
+        **{operacao: peso * 4 for operacao, peso in _LEITURA.items()},
+        "voo_criar": 40, "voo_atualizar": 25, "voo_alterar": 25, "voo_atualizar_lote": 25, "voo_excluir": 10, "voo_criar_lote": 5,
+    },
+    "escrita": {
+        "voo_criar": 30, "voo_atualizar": 20, "voo_alterar": 20, "voo_status_fila": 20, "voo_atualizar_lote": 20, "voo_excluir": 10, "voo_criar_lote": 5,
+        "voo_excluir_lote": 3, "voo_importar": 2, "aeronave_criar": 3, "aeronave_atualizar": 2, "cia_atualizar_lote": 1,
+        "voos_periodo": 4,
+    },
+    "completo": {operacao: 1 for operacao in OPERACOES},
+}
+
+class Cenario:
+    def __init__(self, nome: str, contexto: Contexto, semente: int | None = None):
+        if nome not in CENARIOS:
+            raise ValueError(f"Cenário desconhecido: {nome!r} (use {', '.join(CENARIOS)})")
+        self.nome = nome
+        self.contexto = contexto
+        self.aleatorio = random.Random(semente)
+        self._operacoes = list(CENARIOS[nome])
+        self._pesos = list(CENARIOS[nome].values())
+
+    def proxima(self) -> Requisicao:
+        operacao = self.aleatorio.choices(self._operacoes, self._pesos)[0]
+        return OPERACOES[operacao](self.contexto, self.aleatorio)
+
+# Tráfego gravado: uma requisição por linha, {"metodo", "caminho", "corpo"} (ou "method", "path",
+# "body"), opcionalmente com "conteudo"/"tipo" para corpos não JSON. Linhas que não descrevem uma
+# requisição HTTP são ignoradas e contadas
+def ler_trafego(arquivo: str) -> tuple[list[Requisicao], int]:
+    requisicoes, ignoradas = [], 0
+    with open(arquivo, encoding="utf-8") as entrada:
+        for linha in entrada:
+            if not linha.strip():
+                continue
+            try:
+                dados = json.loads(linha)
+            except ValueError:
+                ignoradas += 1
+                continue
+            metodo = dados.get("metodo") or dados.get("method") if isinstance(dados, dict) else None
+            caminho = dados.get("caminho") or dados.get("path") if isinstance(dados, dict) else None
+            if not isinstance(metodo, str) or not isinstance(caminho, str) or not caminho.startswith("/"):
+                ignoradas += 1
+                continue
+            requisicoes.append(Requisicao(
+                metodo.upper(), caminho, dados.get("corpo", dados.get("body")), dados.get("conteudo"), dados.get("tipo"),
+            ))
+    return requisicoes, ignoradas
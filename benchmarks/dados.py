@@ -0,0 +1,182 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from sqlmodel import SQLModel
+from models.cia import Cia
+from models.aeronave import Aeronave
+from models.voo import Voo
+import math
+import random
+
+AEROPORTOS = ["São Paulo (GRU)", "Rio de Janeiro (GIG)", "Brasília (BSB)", "Salvador (SSA)",
+              "Fortaleza (FOR)", "Recife (REC)", "Curitiba (CWB)", "Porto Alegre (POA)"]
+MODELOS = ["Airbus A320", "Boeing 737-800", "Embraer E195", "Airbus A321"]
+STATUS = ["No Horário", "Atrasado", "Em voo", "Pousado", "Cancelado"]
+
+# Cria as tabelas e popula o banco com dados sintéticos (inserções em lote)
+def popular(engine, n_cias: int = 10, n_aeronaves: int = 100, n_voos: int = 10_000, semente: int = 42) -> None:
+    aleatorio = random.Random(semente)
+    SQLModel.metadata.create_all(engine)
+    inicio = datetime(2025, 1, 1)
+
+    with engine.begin() as conexao:
+        conexao.execute(insert(Cia), [
+            {"id": i, "nome": f"Companhia {i}", "cod_iata": f"C{i}"} for i in range(1, n_cias + 1)
+        ])
+        conexao.execute(insert(Aeronave), [
+            {"id": i, "modelo": aleatorio.choice(MODELOS), "capacidade": aleatorio.randint(100, 300),
+             "last_check": inicio, "next_check": inicio + timedelta(days=aleatorio.randint(1, 180)),
+             "cia_id": aleatorio.randint(1, n_cias)}
+            for i in range(1, n_aeronaves + 1)
+        ])
+        voos = []
+        for i in range(1, n_voos + 1):
+            partida = inicio + timedelta(minutes=aleatorio.randint(0, 365 * 24 * 60))
+            origem, destino = aleatorio.sample(AEROPORTOS, 2)
+            voos.append({
+                "id": i, "numero_voo": i, "origem": origem, "destino": destino,
+                "hr_partida": partida, "hr_chegada": partida + timedelta(minutes=aleatorio.randint(45, 240)),
+                "status": aleatorio.choice(STATUS), "aeronave_id": aleatorio.randint(1, n_aeronaves),
+                "cia_id": aleatorio.randint(1, n_cias),
+            })
+            if len(voos) == 5000:
+                conexao.execute(insert(Voo), voos)
+                voos = []
+        if voos:
+            conexao.execute(insert(Voo), voos)
+
+# Aeroportos com peso (participação no tráfego) e coordenadas, para durações plausíveis
+AEROPORTOS_REAIS = {
+    "São Paulo (GRU)": (10, -23.43, -46.47), "São Paulo (CGH)": (7, -23.63, -46.66),
+    "Brasília (BSB)": (7, -15.87, -47.92), "Rio de Janeiro (GIG)": (6, -22.81, -43.25),
+    "Campinas (VCP)": (5, -23.01, -47.13), "Rio de Janeiro (SDU)": (4, -22.91, -43.16),
+    "Belo Horizonte (CNF)": (4, -19.62, -43.97), "Recife (REC)": (4, -8.13, -34.92),
+    "Porto Alegre (POA)": (3, -29.99, -51.17), "Salvador (SSA)": (3, -12.91, -38.33),
+    "Fortaleza (FOR)": (3, -3.78, -38.53), "Curitiba (CWB)": (3, -25.53, -49.18),
+    "Florianópolis (FLN)": (2, -27.67, -48.55), "Belém (BEL)": (2, -1.38, -48.48),
+    "Manaus (MAO)": (2, -3.04, -60.05), "Goiânia (GYN)": (1, -16.63, -49.22),
+    "Vitória (VIX)": (1, -20.26, -40.29), "Natal (NAT)": (1, -5.77, -35.37),
+    "Cuiabá (CGB)": (1, -15.65, -56.12), "Maceió (MCZ)": (1, -9.51, -35.79),
+}
+HUBS = ["São Paulo (GRU)", "Campinas (VCP)", "Brasília (BSB)", "São Paulo (CGH)", "Rio de Janeiro (GIG)", "Recife (REC)"]
+CIAS_REAIS = ["LATAM Airlines Brasil", "Gol Linhas Aéreas", "Azul Linhas Aéreas", "Voepass", "Sideral", "MAP Linhas Aéreas"]
+# Modelo -> (capacidade, alcance em km)
+FROTA = {
+    "Airbus A320": (174, 6000), "Airbus A321": (220, 7000), "Boeing 737-800": (186, 5400),
+    "Boeing 737 MAX 8": (186, 6500), "Embraer E195": (118, 4000), "ATR 72-600": (70, 1500),
+}
+
+def _distancia_km(origem: str, destino: str) -> float:
+    _, lat1, lon1 = AEROPORTOS_REAIS[origem]
+    _, lat2, lon2 = AEROPORTOS_REAIS[destino]
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6371 * math.asin(math.sqrt(a))
+
+def _codigos_iata():
+    # Códigos de duas letras únicos, na ordem AA, AB, ..., ZZ
+    letras = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    for primeira in letras:
+        for segunda in letras:
+            yield primeira + segunda
+
+# Banco sintético com distribuições próximas das reais: participação de mercado das companhias
+# decrescente (Zipf), frotas com um modelo predominante por companhia e base em um hub, e voos em
+# rotações por aeronave (o destino de uma perna é a origem da seguinte, sem sobreposição), com
+# duração pela distância, bancos de horários ao longo do dia e status coerentes com o horário.
+def popular_realista(engine, n_cias: int = 8, n_aeronaves: int = 300, n_voos: int = 100_000,
+                     semente: int = 42, inicio: datetime = datetime(2025, 1, 1)) -> None:
+    aleatorio = random.Random(semente)
+    SQLModel.metadata.create_all(engine)
+    aeroportos = list(AEROPORTOS_REAIS)
+    pesos_aeroportos = [peso for peso, _, _ in AEROPORTOS_REAIS.values()]
+    modelos = list(FROTA)
+
+    participacao = [1 / posicao ** 1.1 for posicao in range(1, n_cias + 1)]
+    codigos = _codigos_iata()
+    cias = [
+        {"id": i, "nome": CIAS_REAIS[i - 1] if i <= len(CIAS_REAIS) else f"Companhia Regional {i}", "cod_iata": next(codigos)}
+        for i in range(1, n_cias + 1)
+    ]
+    hub_cia = {cia["id"]: HUBS[(cia["id"] - 1) % len(HUBS)] for cia in cias}
+    modelo_cia = {cia["id"]: aleatorio.choice(modelos) for cia in cias}
+
+    aeronaves = []
+    for i in range(1, n_aeronaves + 1):
+        # As primeiras aeronaves garantem ao menos uma por companhia
+        cia_id = i if i <= n_cias else aleatorio.choices(range(1, n_cias + 1), participacao)[0]
+        modelo = modelo_cia[cia_id] if aleatorio.random() < 0.7 else aleatorio.choice(modelos)
+        ultimo = inicio - timedelta(days=aleatorio.randint(0, 180))
+        aeronaves.append({
+            "id": i, "modelo": modelo, "capacidade": FROTA[modelo][0], "cia_id": cia_id,
+            "last_check": ultimo, "next_check": ultimo + timedelta(days=aleatorio.randint(120, 200)),
+        })
+
+    # Destinos ao alcance de cada modelo a partir de cada aeroporto
+    destinos = {
+        (origem, modelo): [(destino, AEROPORTOS_REAIS[destino][0]) for destino in aeroportos
+                           if destino != origem and _distancia_km(origem, destino) <= FROTA[modelo][1]]
+        for origem in aeroportos for modelo in modelos
+    }
+
+    # Rotações: cada aeronave voa a partir do hub da sua companhia até completar a sua cota de voos
+    voos = []
+    numeros = {cia["id"]: 1000 * cia["id"] for cia in cias}
+    for indice, aeronave in enumerate(aeronaves):
+        cota = n_voos * (indice + 1) // n_aeronaves - n_voos * indice // n_aeronaves
+        hub = local = hub_cia[aeronave["cia_id"]]
+        horario = inicio + timedelta(hours=6, minutes=aleatorio.randint(0, 240))
+        for _ in range(cota):
+            # Fora do hub, a maior parte das pernas volta para ele
+            opcoes = destinos[local, aeronave["modelo"]] or destinos[local, "Airbus A321"]
+            if local != hub and aleatorio.random() < 0.6:
+                destino = hub
+            else:
+                destino = aleatorio.choices([nome for nome, _ in opcoes], [peso for _, peso in opcoes])[0]
+            duracao = timedelta(minutes=round(25 + _distancia_km(local, destino) / 12.5 + aleatorio.randint(-5, 15)))
+            numeros[aeronave["cia_id"]] += 1
+            voos.append({
+                "numero_voo": numeros[aeronave["cia_id"]], "origem": local, "destino": destino,
+                "hr_partida": horario, "hr_chegada": horario + duracao,
+                "aeronave_id": aeronave["id"], "cia_id": aeronave["cia_id"],
+            })
+            local = destino
+            # Tempo de solo entre pernas; depois das 23h a aeronave pernoita até o banco da manhã
+            horario = horario + duracao + timedelta(minutes=aleatorio.randint(35, 120))
+            if horario.hour >= 23 or horario.hour < 5:
+                horario = (horario - timedelta(hours=5)).replace(hour=6, minute=aleatorio.randint(0, 59)) + timedelta(days=1)
+
+    # Ids na ordem de partida, como uma malha carregada cronologicamente. O "agora" dos status é o
+    # meio da malha: voos anteriores já pousaram (ou foram cancelados), os seguintes estão previstos
+    voos.sort(key=lambda voo: (voo["hr_partida"], voo["aeronave_id"]))
+    agora = voos[len(voos) // 2]["hr_partida"] if voos else inicio
+    for voo in voos:
+        if voo["hr_chegada"] < agora:
+            voo["status"] = aleatorio.choices(["Pousado", "Cancelado"], [96, 4])[0]
+        elif voo["hr_partida"] <= agora:
+            voo["status"] = aleatorio.choices(["Em voo", "Cancelado"], [97, 3])[0]
+        else:
+            voo["status"] = aleatorio.choices(["No Horário", "Atrasado", "Cancelado"], [88, 8, 4])[0]
+    with engine.begin() as conexao:
+        conexao.execute(insert(Cia), cias)
+        conexao.execute(insert(Aeronave), aeronaves)
+        for posicao in range(0, len(voos), 5000):
+            bloco = voos[posicao:posicao + 5000]
+            for deslocamento, voo in enumerate(bloco, posicao + 1):
+                voo["id"] = deslocamento
+            conexao.execute(insert(Voo), bloco)
+
+# Uso: python -m benchmarks.dados bench.db [--cias 8] [--aeronaves 300] [--voos 100000]
+if __name__ == "__main__":
+    import argparse
+    from sqlalchemy import create_engine
+
+    parser = argparse.ArgumentParser(description="Gera um banco SQLite sintético com distribuições realistas")
+    parser.add_argument("arquivo")
+    parser.add_argument("--cias", type=int, default=8)
+    parser.add_argument("--aeronaves", type=int, default=300)
+    parser.add_argument("--voos", type=int, default=100_000)
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+    engine = create_engine(f"sqlite:///{args.arquivo}")
+    popular_realista(engine, args.cias, args.aeronaves, args.voos, args.semente)
+    engine.dispose()
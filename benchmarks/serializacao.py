@@ -0,0 +1,135 @@
+# Custo por linha da serialização das listagens: caminho anterior (instâncias do ORM, cópia para
+# dicts e validação do FastAPI contra o response_model) contra o caminho rápido (projeção de
+# colunas + Response codificada uma vez, com orjson quando instalado).
+#
+# Uso: python -m benchmarks.serializacao [--aeronaves 5000] [--repeticoes 20]
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy.orm import joinedload
+from sqlmodel import Session, select
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+
+from database import criar_engine
+from benchmarks.dados import popular
+from models.aeronave import Aeronave
+from models.cia import Cia
+from models.voo import Voo
+from routes.aeronave import aeronaves_completas
+from routes.cia import cias_completas
+from routes.voo import read_voos
+from services.paginacao import Paginacao
+from services.serializacao import RespostaJSON
+
+# Caminho anterior: o FastAPI valida o retorno contra o response_model e o JSONResponse codifica
+async def _responder_antes(campo, conteudo) -> bytes:
+    return JSONResponse(await serialize_response(field=campo, response_content=conteudo, is_coroutine=False)).body
+
+# Caminho rápido: a rota já devolve a Response codificada
+async def _rapido(resposta) -> bytes:
+    return resposta.body
+
+def _voos_antes(session: Session, limite: int) -> list:
+    return session.exec(select(Voo).order_by(Voo.id).limit(limite)).all()
+
+def _aeronaves_antes(session: Session) -> list[dict]:
+    resultados = session.exec(select(Aeronave).options(joinedload(Aeronave.cia))).unique().all()
+    return [
+        {
+            "id": aeronave.id, "modelo": aeronave.modelo, "capacidade": aeronave.capacidade,
+            "last_check": aeronave.last_check, "next_check": aeronave.next_check,
+            "cia": {"id": aeronave.cia.id, "nome": aeronave.cia.nome, "cod_iata": aeronave.cia.cod_iata},
+        }
+        for aeronave in resultados
+    ]
+
+def _cias_antes(session: Session) -> list[dict]:
+    resultados = session.exec(select(Cia).options(joinedload(Cia.aeronaves))).unique().all()
+    return [
+        {
+            "id": cia.id, "nome": cia.nome, "cod_iata": cia.cod_iata,
+            "aeronaves": [
+                {
+                    "id": aeronave.id, "modelo": aeronave.modelo, "capacidade": aeronave.capacidade,
+                    "last_check": aeronave.last_check, "next_check": aeronave.next_check,
+                }
+                for aeronave in cia.aeronaves
+            ],
+        }
+        for cia in resultados
+    ]
+
+async def _medir(engine, funcao, repeticoes: int) -> float:
+    tempos = []
+    for _ in range(repeticoes):
+        # Sessão nova a cada repetição: o identity map não pode reaproveitar instâncias
+        with Session(engine) as session:
+            inicio = time.perf_counter()
+            await funcao(session)
+            tempos.append(time.perf_counter() - inicio)
+    return statistics.median(tempos)
+
+async def executar(n_aeronaves: int, repeticoes: int) -> list[dict]:
+    limite = 100  # Tamanho máximo de página de /voos
+    campo_voos = create_model_field(name="voos", type_=list[Voo], mode="serialization")
+    campo_dicts = create_model_field(name="dicts", type_=list[dict], mode="serialization")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = criar_engine(f"sqlite:///{os.path.join(diretorio, 'bench.db')}", nome="bench-serializacao")
+        popular(engine, n_cias=50, n_aeronaves=n_aeronaves, n_voos=limite * 10)
+
+        cenarios = {
+            "/voos (página de 100)": (
+                limite,
+                lambda s: _responder_antes(campo_voos, _voos_antes(s, limite)),
+                lambda s: _rapido(read_voos(
+                    id=None, data_inicio=None, data_fim=None, companhia_nome=None, busca_texto=None,
+                    ordenacao=None, paginacao=Paginacao(cursor=None, limit=limite), response=Response(), session=s,
+                )),
+            ),
+            "/aeronaves/aeronaves-completas": (
+                n_aeronaves,
+                lambda s: _responder_antes(campo_dicts, _aeronaves_antes(s)),
+                lambda s: _rapido(aeronaves_completas(response=Response(), session=s)),
+            ),
+            "/cias/cias-completa": (
+                n_aeronaves,
+                lambda s: _responder_antes(campo_dicts, _cias_antes(s)),
+                lambda s: _rapido(cias_completas(response=Response(), session=s)),
+            ),
+        }
+
+        resultados = []
+        for nome, (linhas, antes, depois) in cenarios.items():
+            tempo_antes = await _medir(engine, antes, repeticoes)
+            tempo_depois = await _medir(engine, depois, repeticoes)
+            resultados.append({
+                "endpoint": nome,
+                "linhas": linhas,
+                "antes (µs/linha)": round(tempo_antes / linhas * 1e6, 2),
+                "depois (µs/linha)": round(tempo_depois / linhas * 1e6, 2),
+                "ganho": f"{tempo_antes / tempo_depois:.1f}x",
+            })
+        engine.dispose()
+    return resultados
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do custo de serialização por linha")
+    parser.add_argument("--aeronaves", type=int, default=5000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    print(f"Codificação: {RespostaJSON.__name__}")
+    for resultado in asyncio.run(executar(args.aeronaves, args.repeticoes)):
+        print(resultado)
+
+if __name__ == "__main__":
+    main()
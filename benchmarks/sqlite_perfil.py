@@ -0,0 +1,80 @@
+# Compara o perfil padrão do SQLite com o perfil de desempenho (WAL + pragmas)
+# com leitores e um escritor concorrentes na tabela voo.
+#
+# Uso: python -m benchmarks.sqlite_perfil [--voos 50000] [--leitores 4] [--segundos 5]
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from threading import Event, Thread
+import argparse
+import logging
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from database import criar_engine
+from benchmarks.dados import STATUS, popular
+
+def _leitor(engine, parar: Event, latencias: list) -> None:
+    aleatorio = random.Random()
+    with engine.connect() as conexao:
+        while not parar.is_set():
+            inicio_janela = datetime(2025, 1, 1) + timedelta(days=aleatorio.randint(0, 360))
+            inicio = time.perf_counter()
+            conexao.execute(
+                text("SELECT id, origem, destino, status FROM voo WHERE hr_partida >= :inicio ORDER BY id LIMIT 50"),
+                {"inicio": inicio_janela},
+            ).all()
+            conexao.rollback()  # Encerra a transação de leitura para enxergar novas escritas
+            latencias.append(time.perf_counter() - inicio)
+
+def _escritor(engine, parar: Event, n_voos: int, latencias: list) -> None:
+    aleatorio = random.Random()
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        with engine.begin() as conexao:
+            conexao.execute(
+                text("UPDATE voo SET status = :status WHERE id = :id"),
+                {"status": aleatorio.choice(STATUS), "id": aleatorio.randint(1, n_voos)},
+            )
+        latencias.append(time.perf_counter() - inicio)
+
+def executar(perfil: str, n_voos: int, n_leitores: int, segundos: float) -> dict:
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine = criar_engine(f"sqlite:///{os.path.join(diretorio, 'bench.db')}", nome=f"bench-{perfil}", perfil=perfil)
+        popular(engine, n_voos=n_voos)
+
+        parar = Event()
+        leituras, escritas = [], []
+        threads = [Thread(target=_leitor, args=(engine, parar, leituras)) for _ in range(n_leitores)]
+        threads.append(Thread(target=_escritor, args=(engine, parar, n_voos, escritas)))
+        for thread in threads:
+            thread.start()
+        time.sleep(segundos)
+        parar.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        "perfil": perfil,
+        "leituras/s": round(len(leituras) / segundos),
+        "escritas/s": round(len(escritas) / segundos),
+        "leitura p95 (ms)": round(statistics.quantiles(leituras, n=20)[18] * 1000, 2) if len(leituras) > 1 else None,
+        "escrita p95 (ms)": round(statistics.quantiles(escritas, n=20)[18] * 1000, 2) if len(escritas) > 1 else None,
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do perfil de desempenho do SQLite")
+    parser.add_argument("--voos", type=int, default=50_000)
+    parser.add_argument("--leitores", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=5)
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    for perfil in ("padrao", "desempenho"):
+        print(executar(perfil, args.voos, args.leitores, args.segundos))
+
+if __name__ == "__main__":
+    main()
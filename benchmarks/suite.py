@@ -0,0 +1,315 @@
+# Suíte de carga das rotas de voos, aeronaves, cias e busca: latência p50/p95/p99, req/s e
+# consultas SQL por requisição, por rota.
+#
+# Por padrão a aplicação roda no próprio processo (cliente ASGI, sem rede), o que permite contar as
+# consultas de cada requisição. Com --http, a carga vai por HTTP de vários processos para um
+# servidor com N workers (cli.py servir) ou para um servidor já em execução (--url). O banco é uma
+# cópia de --banco ou um banco sintético gerado com as distribuições de benchmarks.dados.
+#
+# Uso:
+#   python -m benchmarks.suite --cenario misto --voos 100000 --segundos 20
+#   python -m benchmarks.suite --banco voos.db --cenario completo
+#   python -m benchmarks.suite --http --workers 4 --processos 2 --concorrencia 128
+#   python -m benchmarks.suite --gravar trafego.jsonl       # grava as requisições enviadas
+#   python -m benchmarks.suite --replay trafego.jsonl       # reproduz um tráfego gravado
+#   python -m benchmarks.suite --json atual.json --comparar base.json  # sai com 1 se houver regressão
+from contextvars import ContextVar
+from benchmarks.cenarios import CENARIOS, Cenario, Contexto, ler_trafego
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import httpx
+
+# Consultas SQL da requisição em andamento (só no modo em processo). O cliente ASGI executa a
+# aplicação na mesma tarefa e o threadpool do Starlette copia o contexto, então a contagem chega
+# até os endpoints síncronos
+_consultas: ContextVar[list | None] = ContextVar("consultas", default=None)
+
+def _contar_consulta(*args) -> None:
+    contador = _consultas.get()
+    if contador is not None:
+        contador[0] += 1
+
+async def _cliente(cliente: httpx.AsyncClient, proxima, inicio_medicao: float, fim: float,
+                   registros: list, gravadas: list | None, etags: dict | None) -> None:
+    while time.perf_counter() < fim:
+        requisicao = proxima()
+        if requisicao is None:
+            return
+        cabecalhos = {"content-type": requisicao.tipo} if requisicao.tipo else {}
+        if etags is not None and requisicao.metodo == "GET" and requisicao.caminho in etags:
+            cabecalhos["if-none-match"] = etags[requisicao.caminho]
+        contador = [0]
+        token = _consultas.set(contador)
+        inicio = time.perf_counter()
+        try:
+            resposta = await cliente.request(
+                requisicao.metodo, requisicao.caminho, headers=cabecalhos,
+                json=requisicao.corpo if requisicao.conteudo is None else None, content=requisicao.conteudo,
+            )
+            status = resposta.status_code
+        except httpx.TransportError:
+            resposta, status = None, 0
+        finally:
+            _consultas.reset(token)
+        latencia = time.perf_counter() - inicio
+
+        if resposta is not None:
+            if requisicao.ao_responder is not None:
+                try:
+                    requisicao.ao_responder(status, resposta.json())
+                except ValueError:
+                    pass
+            if etags is not None and "etag" in resposta.headers:
+                etags[requisicao.caminho] = resposta.headers["etag"]
+        if gravadas is not None:
+            gravadas.append(requisicao.como_json())
+        if inicio >= inicio_medicao:
+            registros.append((requisicao.metodo, requisicao.caminho.split("?")[0], status, latencia, contador[0]))
+
+def _fonte(args, contexto: Contexto | None, trafego: list | None, processo: int):
+    if trafego is None:
+        cenario = Cenario(args.cenario, contexto, None if args.semente is None else args.semente + processo)
+        return cenario.proxima
+    itens = iter(trafego)
+    return lambda: next(itens, None)
+
+async def _carga(cliente: httpx.AsyncClient, proxima, concorrencia: int, args, reproducao: bool) -> tuple[list, list | None, float]:
+    registros, gravadas = [], [] if args.gravar else None
+    inicio = time.perf_counter()
+    # Tráfego gravado roda até o fim do arquivo, sem aquecimento
+    inicio_medicao = inicio if reproducao else inicio + args.aquecimento
+    fim = math.inf if reproducao else inicio_medicao + args.segundos
+    await asyncio.gather(*(
+        _cliente(cliente, proxima, inicio_medicao, fim, registros, gravadas, {} if args.condicional else None)
+        for _ in range(concorrencia)
+    ))
+    return registros, gravadas, time.perf_counter() - inicio_medicao
+
+async def _em_processo(args, url_banco: str, trafego: list | None):
+    # A aplicação lê DATABASE_URL, DB_MODO e SQLITE_PERFIL na importação
+    os.environ.update(DATABASE_URL=url_banco, DB_MODO=args.modo, SQLITE_PERFIL=args.perfil)
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+    import main
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    # Avisos do pydantic ao serializar datas vindas do cache como texto: um por requisição
+    warnings.filterwarnings("ignore", "Pydantic serializer warnings", UserWarning)
+    event.listen(Engine, "before_cursor_execute", _contar_consulta)
+
+    contexto = Contexto(url_banco) if trafego is None else None
+    async with main.app.router.lifespan_context(main.app):
+        # Erros 500 da aplicação entram no relatório em vez de interromper a carga
+        transporte = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+            return await _carga(cliente, _fonte(args, contexto, trafego, 0), args.concorrencia, args, trafego is not None)
+
+# Um processo de carga HTTP (executado pelo multiprocessing)
+def _processo_http(parametros) -> tuple[list, list | None, float]:
+    args, url, url_banco, trafego, processo = parametros
+    contexto = Contexto(url_banco, processo, args.processos) if trafego is None else None
+    concorrencia = max(1, args.concorrencia // args.processos)
+
+    async def executar():
+        limites = httpx.Limits(max_connections=concorrencia)
+        async with httpx.AsyncClient(base_url=url, limits=limites, timeout=60) as cliente:
+            return await _carga(cliente, _fonte(args, contexto, trafego, processo), concorrencia, args, trafego is not None)
+    return asyncio.run(executar())
+
+def _via_http(args, url: str, url_banco: str, trafego: list | None):
+    # Tráfego gravado é dividido entre os processos, um item para cada por vez
+    partes = [None if trafego is None else trafego[processo::args.processos] for processo in range(args.processos)]
+    with multiprocessing.get_context("spawn").Pool(args.processos) as pool:
+        resultados = pool.map(_processo_http, [(args, url, url_banco, partes[processo], processo) for processo in range(args.processos)])
+    registros = [registro for parcial, _, _ in resultados for registro in parcial]
+    gravadas = None if not args.gravar else [linha for _, parcial, _ in resultados for linha in parcial]
+    return registros, gravadas, max(duracao for _, _, duracao in resultados)
+
+def _servidor(args, url_banco: str) -> tuple[subprocess.Popen, str]:
+    from benchmarks.async_vs_sync import aguardar_servidor
+
+    porta = args.porta
+    ambiente = dict(os.environ, DATABASE_URL=url_banco, DB_MODO=args.modo, SQLITE_PERFIL=args.perfil)
+    processo = subprocess.Popen(
+        [sys.executable, "cli.py", "servir", "--workers", str(args.workers), "--port", str(porta), "--log-level", "warning"],
+        env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        aguardar_servidor(url, processo)
+    except RuntimeError:
+        processo.terminate()
+        raise
+    return processo, url
+
+# Rótulo por rota ("GET /voos/{id}"), resolvido pelas rotas da própria aplicação
+def _rotulador():
+    from fastapi.routing import APIRoute
+    from starlette.routing import Match
+    import main
+
+    rotas = [rota for rota in main.app.routes if isinstance(rota, APIRoute)]
+    rotulos = {}
+
+    def rotular(metodo: str, caminho: str) -> str:
+        if (metodo, caminho) not in rotulos:
+            escopo = {"type": "http", "path": caminho, "method": metodo}
+            rota = next((rota for rota in rotas if rota.matches(escopo)[0] == Match.FULL), None)
+            rotulos[metodo, caminho] = f"{metodo} {rota.path if rota else caminho}"
+        return rotulos[metodo, caminho]
+    return rotular
+
+def _percentil(ordenados: list, percentil: float) -> float:
+    # Nearest-rank: o menor valor com ao menos `percentil`% das amostras até ele
+    return ordenados[max(0, math.ceil(percentil / 100 * len(ordenados)) - 1)]
+
+def _metricas(amostras: list, duracao: float, com_consultas: bool) -> dict:
+    latencias = sorted(latencia for _, latencia, _ in amostras)
+    return {
+        "requisicoes": len(amostras),
+        "req/s": round(len(amostras) / duracao, 1),
+        "p50 (ms)": round(_percentil(latencias, 50) * 1000, 2),
+        "p95 (ms)": round(_percentil(latencias, 95) * 1000, 2),
+        "p99 (ms)": round(_percentil(latencias, 99) * 1000, 2),
+        "consultas/req": round(sum(consultas for _, _, consultas in amostras) / len(amostras), 2) if com_consultas else None,
+        "4xx": sum(400 <= status < 500 for status, _, _ in amostras),
+        "5xx": sum(status >= 500 or status == 0 for status, _, _ in amostras),  # 0: erro de conexão
+    }
+
+def resumir(registros: list, duracao: float, com_consultas: bool) -> dict:
+    rotular = _rotulador()
+    grupos = {}
+    for metodo, caminho, status, latencia, consultas in registros:
+        grupos.setdefault(rotular(metodo, caminho), []).append((status, latencia, consultas))
+    resultados = {
+        rotulo: _metricas(amostras, duracao, com_consultas)
+        for rotulo, amostras in sorted(grupos.items(), key=lambda item: -len(item[1]))
+    }
+    if registros:
+        resultados["TOTAL"] = _metricas([registro[2:] for registro in registros], duracao, com_consultas)
+    return resultados
+
+def imprimir(resultados: dict) -> None:
+    colunas = ["requisicoes", "req/s", "p50 (ms)", "p95 (ms)", "p99 (ms)", "consultas/req", "4xx", "5xx"]
+    largura = max([len("rota"), *map(len, resultados)])
+    print(f"{'rota':<{largura}}  " + "  ".join(f"{coluna:>13}" for coluna in colunas))
+    for rotulo, metricas in resultados.items():
+        valores = ("—" if metricas[coluna] is None else str(metricas[coluna]) for coluna in colunas)
+        print(f"{rotulo:<{largura}}  " + "  ".join(f"{valor:>13}" for valor in valores))
+
+# Regressões em relação a um resultado anterior (--json): p95 acima da tolerância, mais consultas
+# por requisição ou vazão total abaixo da tolerância. Rotas com poucas amostras são ignoradas
+def comparar(resultados: dict, base: dict, tolerancia: float, minimo: int = 20) -> list[str]:
+    regressoes = []
+    for rotulo, atual in resultados.items():
+        anterior = base.get(rotulo)
+        if anterior is None or min(atual["requisicoes"], anterior["requisicoes"]) < minimo:
+            continue
+        if atual["p95 (ms)"] > anterior["p95 (ms)"] * (1 + tolerancia) and atual["p95 (ms)"] - anterior["p95 (ms)"] > 1:
+            regressoes.append(f"{rotulo}: p95 {anterior['p95 (ms)']} -> {atual['p95 (ms)']} ms")
+        if None not in (atual["consultas/req"], anterior["consultas/req"]) and \
+                atual["consultas/req"] > anterior["consultas/req"] * (1 + tolerancia) + 0.1:
+            regressoes.append(f"{rotulo}: consultas/req {anterior['consultas/req']} -> {atual['consultas/req']}")
+        if rotulo == "TOTAL" and atual["req/s"] < anterior["req/s"] * (1 - tolerancia):
+            regressoes.append(f"TOTAL: req/s {anterior['req/s']} -> {atual['req/s']}")
+    return regressoes
+
+def _preparar_banco(args, diretorio: str) -> str:
+    banco = os.path.join(diretorio, "bench.db")
+    if args.banco:
+        shutil.copy(args.banco, banco)
+    else:
+        from sqlalchemy import create_engine
+        from benchmarks.dados import popular_realista
+
+        engine = create_engine(f"sqlite:///{banco}")
+        popular_realista(engine, n_cias=args.cias, n_aeronaves=args.aeronaves, n_voos=args.voos, semente=args.semente or 42)
+        engine.dispose()
+    return f"sqlite:///{banco}"
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Suíte de carga por rota: latência, vazão e consultas por requisição")
+    parser.add_argument("--cenario", choices=CENARIOS, default="misto")
+    parser.add_argument("--replay", metavar="JSONL", help="Reproduz o tráfego gravado no arquivo em vez de um cenário")
+    parser.add_argument("--gravar", metavar="JSONL", help="Grava as requisições enviadas, para reprodução com --replay")
+    parser.add_argument("--banco", help="Banco SQLite usado como base (copiado); padrão: banco sintético")
+    parser.add_argument("--cias", type=int, default=8)
+    parser.add_argument("--aeronaves", type=int, default=300)
+    parser.add_argument("--voos", type=int, default=100_000)
+    parser.add_argument("--semente", type=int, help="Semente dos dados e dos sorteios (padrão: sorteios aleatórios)")
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--aquecimento", type=float, default=2, help="Segundos de carga antes da medição")
+    parser.add_argument("--concorrencia", type=int, default=32, help="Clientes simultâneos (somando todos os processos)")
+    parser.add_argument("--condicional", action="store_true", help="Reenvia o ETag recebido em If-None-Match")
+    parser.add_argument("--modo", choices=["sync", "async"], default=os.getenv("DB_MODO", "sync"))
+    parser.add_argument("--http", action="store_true", help="Carga por HTTP contra cli.py servir (ou --url)")
+    parser.add_argument("--url", help="Servidor já em execução (com o mesmo conteúdo de --banco)")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do servidor iniciado com --http")
+    parser.add_argument("--processos", type=int, default=1, help="Processos geradores de carga com --http")
+    parser.add_argument("--porta", type=int, default=8300)
+    parser.add_argument("--perfil", choices=["padrao", "desempenho"], default="desempenho", help="SQLITE_PERFIL da aplicação")
+    parser.add_argument("--json", metavar="ARQUIVO", help="Salva os resultados para comparações futuras")
+    parser.add_argument("--comparar", metavar="ARQUIVO", help="Compara com resultados salvos e sai com 1 se houver regressão")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Piora relativa tolerada na comparação")
+    args = parser.parse_args()
+    if args.url and not args.banco:
+        parser.error("--url requer --banco com os mesmos dados do servidor")
+    args.http = args.http or bool(args.url)
+    args.processos = max(1, args.processos)
+
+    trafego = None
+    if args.replay:
+        trafego, ignoradas = ler_trafego(args.replay)
+        if ignoradas:
+            print(f"{ignoradas} linha(s) de {args.replay} ignorada(s): não descrevem uma requisição HTTP", file=sys.stderr)
+        if not trafego:
+            parser.error(f"Nenhuma requisição para reproduzir em {args.replay}")
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        if args.url:
+            url_banco = f"sqlite:///{os.path.abspath(args.banco)}"
+            registros, gravadas, duracao = _via_http(args, args.url.rstrip("/"), url_banco, trafego)
+        else:
+            url_banco = _preparar_banco(args, diretorio)
+            if args.http:
+                servidor, url = _servidor(args, url_banco)
+                try:
+                    registros, gravadas, duracao = _via_http(args, url, url_banco, trafego)
+                finally:
+                    servidor.terminate()
+                    servidor.wait()
+            else:
+                registros, gravadas, duracao = asyncio.run(_em_processo(args, url_banco, trafego))
+        os.environ.setdefault("DATABASE_URL", url_banco)  # _rotulador importa a aplicação
+        resultados = resumir(registros, duracao, com_consultas=not args.http)
+
+    imprimir(resultados)
+    if args.gravar:
+        with open(args.gravar, "w", encoding="utf-8") as saida:
+            for linha in gravadas:
+                saida.write(json.dumps(linha, ensure_ascii=False) + "\n")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as saida:
+            parametros = {chave: valor for chave, valor in vars(args).items() if chave not in ("json", "comparar")}
+            json.dump({"parametros": parametros, "resultados": resultados}, saida, ensure_ascii=False, indent=2)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as entrada:
+            regressoes = comparar(resultados, json.load(entrada)["resultados"], args.tolerancia)
+        for regressao in regressoes:
+            print(f"REGRESSÃO {regressao}", file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Vazão da API com 1, 2, 4... workers (python cli.py servir --workers N).
+# Cada rodada sobe o servidor sobre uma cópia do mesmo banco sintético e recebe a mistura de
+# leituras e escritas de benchmarks.async_vs_sync com N clientes concorrentes. O gerador de carga
+# roda na mesma máquina: com muitos workers, reserve núcleos para ele (ou rode-o em outra máquina).
+#
+# Uso: python -m benchmarks.workers [--workers 1,2,4] [--voos 20000] [--concorrencia 64] [--segundos 10]
+import argparse
+import asyncio
+import logging
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from database import criar_engine
+from benchmarks.async_vs_sync import aguardar_servidor, carga
+from benchmarks.dados import popular
+
+def executar(workers: int, banco_base: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco = os.path.join(diretorio, "bench.db")
+        shutil.copy(banco_base, banco)
+        # WAL: com vários processos, leituras não esperam a escrita de outro worker
+        ambiente = dict(os.environ, DATABASE_URL=f"sqlite:///{banco}", SQLITE_PERFIL=args.perfil)
+        porta = 8200 + workers
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(
+            [sys.executable, "cli.py", "servir", "--workers", str(workers), "--port", str(porta), "--log-level", "warning"],
+            env=ambiente, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            url = f"http://127.0.0.1:{porta}"
+            aguardar_servidor(url, processo)
+            inicializacao = time.perf_counter() - inicio
+            latencias, erros = asyncio.run(carga(url, args.concorrencia, args.segundos, args.voos))
+        finally:
+            processo.terminate()
+            processo.wait()
+
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        "workers": workers,
+        "inicializacao (s)": round(inicializacao, 2),
+        "req/s": round(len(latencias) / args.segundos),
+        "p50 (ms)": round(quantis[49] * 1000, 2),
+        "p95 (ms)": round(quantis[94] * 1000, 2),
+        "p99 (ms)": round(quantis[98] * 1000, 2),
+        "erros 5xx": len(erros),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga: vazão por número de workers")
+    parser.add_argument("--workers", default="1,2,4", help="Números de workers, separados por vírgula")
+    parser.add_argument("--voos", type=int, default=20_000)
+    parser.add_argument("--concorrencia", type=int, default=64)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--perfil", choices=["padrao", "desempenho"], default="desempenho", help="SQLITE_PERFIL do servidor")
+    args = parser.parse_args()
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        banco_base = os.path.join(diretorio, "base.db")
+        engine = criar_engine(f"sqlite:///{banco_base}", nome="bench")
+        popular(engine, n_voos=args.voos)
+        engine.dispose()
+        for workers in (int(numero) for numero in args.workers.split(",")):
+            print(executar(workers, banco_base, args))
+
+if __name__ == "__main__":
+    main()
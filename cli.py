@@ -0,0 +1,87 @@
+# Linha de comando para importar/exportar as tabelas em CSV ou NDJSON sem passar pela API e
+# para subir a API com vários workers.
+#
+# Exemplos:
+#   python cli.py exportar voo --formato csv --saida voos.csv
+#   python cli.py importar voo voos.ndjson --formato ndjson
+#   python cli.py arquivar --dias 30
+#   python cli.py servir --workers 4 --port 8000
+import argparse
+import json
+import logging
+import os
+import sys
+
+from database import create_db_and_tables, engine
+from datetime import datetime, timedelta
+from services.particoes import ARQUIVO_DIAS, arquivar
+from services.transferencia import FORMATOS, MODELOS, exportar, importar_arquivo
+
+def _formato(caminho: str, formato: str | None) -> str:
+    return formato or ("ndjson" if caminho.endswith((".ndjson", ".jsonl")) else "csv")
+
+def comando_exportar(args) -> None:
+    formato = _formato(args.saida, args.formato)
+    saida = sys.stdout if args.saida == "-" else open(args.saida, "w", encoding="utf-8", newline="")
+    try:
+        for pedaco in exportar(engine, MODELOS[args.tabela], formato):
+            saida.write(pedaco)
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+def comando_importar(args) -> None:
+    formato = _formato(args.arquivo, args.formato)
+    entrada = sys.stdin if args.arquivo == "-" else open(args.arquivo, encoding="utf-8-sig", newline="")
+    try:
+        resumo = importar_arquivo(engine, MODELOS[args.tabela], formato, entrada)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+    print(json.dumps(resumo, ensure_ascii=False, indent=2))
+
+def comando_arquivar(args) -> None:
+    movidos = arquivar(engine, datetime.now() - timedelta(days=args.dias))
+    print(json.dumps({"arquivados": movidos}))
+
+def comando_servir(args) -> None:
+    # Importado aqui: os demais comandos não precisam do uvicorn
+    from servidor import servir
+    servir(args.host, args.port, args.workers, args.log_level)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ferramentas de linha de comando do sistema de voos")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    exportar_parser = subcomandos.add_parser("exportar", help="Exporta uma tabela em CSV ou NDJSON")
+    exportar_parser.add_argument("tabela", choices=MODELOS)
+    exportar_parser.add_argument("--formato", choices=FORMATOS, help="Padrão: pela extensão do arquivo de saída")
+    exportar_parser.add_argument("--saida", default="-", help="Arquivo de saída ('-' para stdout)")
+    exportar_parser.set_defaults(funcao=comando_exportar)
+
+    importar_parser = subcomandos.add_parser("importar", help="Importa um arquivo CSV ou NDJSON em lotes")
+    importar_parser.add_argument("tabela", choices=MODELOS)
+    importar_parser.add_argument("arquivo", help="Arquivo de entrada ('-' para stdin)")
+    importar_parser.add_argument("--formato", choices=FORMATOS, help="Padrão: pela extensão do arquivo")
+    importar_parser.set_defaults(funcao=comando_importar)
+
+    arquivar_parser = subcomandos.add_parser("arquivar", help="Move voos concluídos para as partições mensais de arquivo")
+    arquivar_parser.add_argument("--dias", type=int, default=ARQUIVO_DIAS, help="Arquiva voos com chegada há mais de N dias")
+    arquivar_parser.set_defaults(funcao=comando_arquivar)
+
+    servir_parser = subcomandos.add_parser("servir", help="Sobe a API com N workers (esquema preparado uma única vez)")
+    servir_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    servir_parser.add_argument("--host", default="127.0.0.1")
+    servir_parser.add_argument("--port", type=int, default=8000)
+    servir_parser.add_argument("--log-level", default="info", choices=["critical", "error", "warning", "info", "debug"])
+    servir_parser.set_defaults(funcao=comando_servir)
+
+    args = parser.parse_args()
+    # O log de SQL em nível INFO deixaria a transferência de milhões de linhas muito lenta
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    create_db_and_tables()
+    os.environ["DB_ESQUEMA_PRONTO"] = "1"  # servir: nem o lançador nem os workers repetem o DDL
+    args.funcao(args)
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
 from sqlmodel import create_engine, Session, SQLModel
+from sqlalchemy import event
+from sqlalchemy.engine import URL, Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
 from dotenv import load_dotenv
+from migracoes import aplicar_migracoes
+from services import metricas
+from threading import Lock
+from fastapi import Request
+from typing import AsyncIterator, Iterator
+import itertools
 import logging
 import os
+import time
 
 # Carregar variáveis do arquivo .env
 load_dotenv()
@@ -10,12 +21,213 @@ load_dotenv()
 logging.basicConfig()
 logging.getLogger("sqlalchemy.engine").setLevel(logging.INFO)
 
+# Configuração do pool de conexões (todas opcionais, via variáveis de ambiente)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))  # Conexões mantidas abertas no pool
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))  # Conexões extras permitidas em picos
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # Segundos esperando uma conexão livre
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # Segundos até reciclar uma conexão (-1 desativa)
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "false").lower() in ("1", "true", "sim")  # Testa a conexão no checkout
+
+# Modo de acesso ao banco: "sync" (threadpool do FastAPI) ou "async" (AsyncEngine + rotas async)
+DB_MODO = os.getenv("DB_MODO", "sync")
+
+# Réplicas de leitura (opcional): URLs separadas por vírgula. As rotas GET leem das réplicas
+# (alternando entre elas) e as escritas vão para o primário (DATABASE_URL)
+DATABASE_URL_REPLICAS = [url.strip() for url in os.getenv("DATABASE_URL_REPLICAS", "").split(",") if url.strip()]
+METODOS_LEITURA = ("GET", "HEAD")
+
+# Perfil de desempenho do SQLite (opt-in): SQLITE_PERFIL=desempenho
+SQLITE_PERFIL = os.getenv("SQLITE_PERFIL", "padrao")
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # Negativo = KiB (64 MiB)
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # Bytes mapeados em memória
+SQLITE_BUSY_TIMEOUT = int(os.getenv("SQLITE_BUSY_TIMEOUT", "5000"))  # Milissegundos esperando o lock de escrita
+
+# Estatísticas de uso do pool, para dimensioná-lo sob carga
+class EstatisticasPool:
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.conexoes_criadas = 0
+        self.invalidacoes = 0
+        self.espera_total = 0.0
+        self.espera_maxima = 0.0
+
+    def registrar_espera(self, segundos: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.espera_total += segundos
+            self.espera_maxima = max(self.espera_maxima, segundos)
+
+    def incrementar(self, contador: str) -> None:
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + 1)
+
+    def resumo(self, engine: Engine) -> dict:
+        pool = engine.pool
+        with self._lock:
+            return {
+                "pool": type(pool).__name__,
+                # size/checkedout/overflow só existem nos pools com fila (QueuePool)
+                "tamanho": pool.size() if hasattr(pool, "size") else None,
+                "em_uso": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "conexoes_criadas": self.conexoes_criadas,
+                "invalidacoes": self.invalidacoes,
+                "espera_media_ms": round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "espera_maxima_ms": round(self.espera_maxima * 1000, 3),
+            }
+
+_estatisticas: dict[str, tuple[Engine, EstatisticasPool]] = {}
+
+def _instrumentar_pool(engine: Engine, estatisticas: EstatisticasPool) -> None:
+    # Mede o tempo de checkout (inclui a espera por uma conexão livre)
+    conectar = engine.pool.connect
+
+    def connect():
+        inicio = time.perf_counter()
+        try:
+            return conectar()
+        finally:
+            espera = time.perf_counter() - inicio
+            estatisticas.registrar_espera(espera)
+            metricas.registrar_espera_pool(espera)
+
+    engine.pool.connect = connect
+
+# Pragmas aplicados a cada nova conexão no perfil de desempenho: WAL permite leituras
+# concorrentes com a escrita, synchronous=NORMAL evita um fsync por commit (seguro com WAL)
+def _aplicar_perfil_desempenho(conexao_dbapi, registro_conexao) -> None:
+    cursor = conexao_dbapi.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}")
+    cursor.close()
+
+# Driver assíncrono equivalente ao da DATABASE_URL (aiosqlite para SQLite, asyncpg para Postgres)
+def url_assincrona(url: str) -> URL:
+    url_banco = make_url(url)
+    if url_banco.get_backend_name() == "sqlite":
+        return url_banco.set(drivername="sqlite+aiosqlite")
+    if url_banco.get_backend_name() == "postgresql":
+        return url_banco.set(drivername="postgresql+asyncpg")
+    return url_banco
+
+def criar_engine(url: str, nome: str = "principal", perfil: str = SQLITE_PERFIL, assincrona: bool = False):
+    if perfil not in ("padrao", "desempenho"):
+        raise ValueError(f"Perfil SQLite desconhecido: {perfil!r} (use 'padrao' ou 'desempenho')")
+
+    url_banco = url_assincrona(url) if assincrona else make_url(url)
+    opcoes = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    opcoes_fila = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+
+    if url_banco.get_backend_name() == "sqlite":
+        # Conexões do pool são usadas por threads diferentes do threadpool do FastAPI
+        opcoes["connect_args"] = {"check_same_thread": False}
+        if url_banco.database in (None, "", ":memory:"):
+            # Banco em memória: uma única conexão compartilhada, senão cada conexão veria um banco vazio
+            opcoes["poolclass"] = StaticPool
+        else:
+            # O aiosqlite usaria NullPool (uma conexão nova por checkout) se o pool não fosse explícito
+            opcoes.update(opcoes_fila, poolclass=AsyncAdaptedQueuePool if assincrona else QueuePool)
+    else:
+        opcoes.update(opcoes_fila)
+
+    if assincrona:
+        # Importado aqui: o modo assíncrono depende dos extras opcionais (aiosqlite/asyncpg)
+        from sqlalchemy.ext.asyncio import create_async_engine
+        nova_engine = create_async_engine(url_banco, **opcoes)
+        engine_sync = nova_engine.sync_engine  # Eventos e pool ficam na engine síncrona interna
+    else:
+        nova_engine = engine_sync = create_engine(url_banco, **opcoes)
+
+    if url_banco.get_backend_name() == "sqlite" and perfil == "desempenho":
+        event.listen(engine_sync, "connect", _aplicar_perfil_desempenho)
+
+    estatisticas = EstatisticasPool()
+    _instrumentar_pool(engine_sync, estatisticas)
+    event.listen(engine_sync, "checkin", lambda *args: estatisticas.incrementar("checkins"))
+    event.listen(engine_sync, "connect", lambda *args: estatisticas.incrementar("conexoes_criadas"))
+    event.listen(engine_sync, "invalidate", lambda *args: estatisticas.incrementar("invalidacoes"))
+    # engine.dispose() recria o pool; a medição de espera precisa ser reaplicada
+    event.listen(engine_sync, "engine_disposed", lambda conexao: _instrumentar_pool(engine_sync, estatisticas))
+    _estatisticas[nome] = (engine_sync, estatisticas)
+    # Tempo e número de comandos SQL da requisição corrente (GET /metrics)
+    if metricas.METRICAS:
+        event.listen(engine_sync, "before_cursor_execute", metricas.antes_da_consulta)
+        event.listen(engine_sync, "after_cursor_execute", metricas.depois_da_consulta)
+
+    return nova_engine
+
+def estatisticas_pool() -> dict:
+    return {nome: estatisticas.resumo(engine) for nome, (engine, estatisticas) in _estatisticas.items()}
+
 # Configuração do banco de dados
-engine = create_engine(os.getenv("DATABASE_URL"))
+engine = criar_engine(os.getenv("DATABASE_URL"))
+
+# No modo assíncrono a engine síncrona continua sendo usada para DDL e streaming
+if DB_MODO not in ("sync", "async"):
+    raise ValueError(f"DB_MODO desconhecido: {DB_MODO!r} (use 'sync' ou 'async')")
+async_engine = criar_engine(os.getenv("DATABASE_URL"), nome="async", assincrona=True) if DB_MODO == "async" else None
+
+replicas = [criar_engine(url, nome=f"replica{numero}") for numero, url in enumerate(DATABASE_URL_REPLICAS, 1)]
+async_replicas = [
+    criar_engine(url, nome=f"async_replica{numero}", assincrona=True)
+    for numero, url in enumerate(DATABASE_URL_REPLICAS, 1)
+] if DB_MODO == "async" else []
+_proxima_replica = itertools.count()
+
+# Engine para leituras: as réplicas em rodízio ou, sem réplicas, o próprio primário
+def engine_leitura(assincrona: bool = False):
+    opcoes = async_replicas if assincrona else replicas
+    if not opcoes:
+        return async_engine if assincrona else engine
+    return opcoes[next(_proxima_replica) % len(opcoes)]
+
+# Fecha as conexões de todos os pools (ex.: antes do fork dos workers, que não podem compartilhá-las)
+def descartar_conexoes() -> None:
+    for engine_sync, _ in _estatisticas.values():
+        engine_sync.dispose()
 
 # Criar a(s) tabela(s) no banco de dados
 # Inicializa o banco de dados
 def create_db_and_tables() -> None:
     SQLModel.metadata.create_all(engine)
-def get_session() -> Session:
-    return Session(engine)
+    # Bancos criados por versões anteriores recebem os índices que faltam
+    aplicar_migracoes(engine)
+
+# DB_ESQUEMA_PRONTO=1: o esquema já foi preparado antes de subir os workers (cli.py servir), que
+# não repetem o DDL na inicialização
+def esquema_pronto() -> bool:
+    return os.getenv("DB_ESQUEMA_PRONTO", "").lower() in ("1", "true", "sim")
+
+# SERVIDOR_WORKERS: número de processos que servem a aplicação, definido por cli.py servir (com
+# outro lançador, defina-o no ambiente). Com mais de um, os estados mantidos em memória (versões das
+# tabelas, cache em memória, agenda das aeronaves) não veem as escritas dos outros processos e são
+# substituídos pelo banco ou desativados
+def varios_processos() -> bool:
+    return int(os.getenv("SERVIDOR_WORKERS", "1")) > 1
+
+# Sessão por requisição: sempre fechada ao final, com rollback do que não foi commitado.
+# Requisições GET/HEAD usam uma réplica de leitura, se configurada
+def get_session(request: Request) -> Iterator[Session]:
+    with Session(engine_leitura() if request.method in METODOS_LEITURA else engine) as session:
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+
+# Sessão assíncrona por requisição (modo DB_MODO=async)
+async def get_async_session(request: Request) -> AsyncIterator[AsyncSession]:
+    async with AsyncSession(engine_leitura(assincrona=True) if request.method in METODOS_LEITURA else async_engine) as session:
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
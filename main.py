@@ -1,18 +1,45 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
-from database import create_db_and_tables
-from routes import aeronave, voo, cia
+from database import DB_MODO, async_engine, async_replicas, create_db_and_tables, engine, esquema_pronto
+from routes import aeronave, busca, voo, cia, monitoramento
+from routes.assincrono import converter_router
+from services import conexoes, disponibilidade, metricas
+from services.contadores import reconciliar_periodicamente
+from services.feed import retransmitir_redis
+from services.fila_status import fila_status
+from services.particoes import arquivar_periodicamente
+import asyncio
 
 # Configurações de inicialização
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
+    # Com vários workers o esquema é preparado uma única vez, antes de iniciá-los (cli.py servir)
+    if not esquema_pronto():
+        create_db_and_tables()
+    tarefas = [
+        asyncio.create_task(reconciliar_periodicamente(engine)),
+        asyncio.create_task(arquivar_periodicamente(engine)),
+        asyncio.create_task(retransmitir_redis()),
+        asyncio.create_task(disponibilidade.recarregar_periodicamente(engine)),
+        asyncio.create_task(conexoes.recarregar_periodicamente(engine)),
+    ]
+    gravacao_status = asyncio.create_task(fila_status.gravar_periodicamente(engine))
     yield
+    for tarefa in tarefas:
+        tarefa.cancel()
+    # Status aceitos pela fila de escrita diferida são gravados antes de fechar as conexões
+    await fila_status.encerrar(gravacao_status)
+    for engine_async in (async_engine, *async_replicas):
+        if engine_async is not None:
+            await engine_async.dispose()
 
 # Inicializa o aplicativo FastAPI
 app = FastAPI(lifespan=lifespan)
+if metricas.METRICAS:
+    app.add_middleware(metricas.MiddlewareMetricas)
 
-# Rotas para Endpoints
-app.include_router(aeronave.router)
-app.include_router(voo.router)
-app.include_router(cia.router)
+# Rotas para Endpoints (no modo assíncrono, as versões async dos mesmos endpoints)
+for modulo in (aeronave, voo, cia, busca):
+    app.include_router(converter_router(modulo.router) if DB_MODO == "async" else modulo.router)
+app.include_router(monitoramento.router)
+app.include_router(monitoramento.router_metricas)
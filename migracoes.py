@@ -0,0 +1,150 @@
+# Migrações incrementais para bancos já existentes (ex.: voos.db criado antes dos índices).
+# create_all() só cria tabelas ausentes; colunas e índices novos em tabelas existentes são criados aqui.
+from sqlalchemy import and_, func, inspect, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn, CreateTable
+from sqlmodel import SQLModel
+from models.voo import Voo
+from services.busca import criar_indices_busca
+from services.particoes import PADRAO_ARQUIVO
+from services.versoes import criar_tabela_versoes
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Consultas representativas dos endpoints e o índice que cada uma deve usar (SQLite)
+CONSULTAS_INDEXADAS = {
+    "voos por companhia": ("SELECT id FROM voo WHERE cia_id = ?", (1,), "ix_voo_cia_id"),
+    "voos por aeronave": ("SELECT id FROM voo WHERE aeronave_id = ?", (1,), "ix_voo_aeronave_id"),
+    "voos por partida (paginação)": (
+        "SELECT * FROM voo WHERE (hr_partida, id) > (?, ?) ORDER BY hr_partida, id LIMIT 10",
+        ("2025-01-01 00:00:00.000000", 0),
+        "ix_voo_hr_partida_id",
+    ),
+    "voos por chegada (paginação)": (
+        "SELECT * FROM voo WHERE (hr_chegada, id) > (?, ?) ORDER BY hr_chegada, id LIMIT 10",
+        ("2025-01-01 00:00:00.000000", 0),
+        "ix_voo_hr_chegada_id",
+    ),
+    "companhia por código IATA": ("SELECT * FROM cia WHERE cod_iata = ?", ("G3",), "ix_cia_cod_iata"),
+    "aeronaves por companhia": ("SELECT id FROM aeronave WHERE cia_id = ?", (1,), "ix_aeronave_cia_id"),
+    "contagem por modelo": ("SELECT modelo, count(*) FROM aeronave GROUP BY modelo", (), "ix_aeronave_modelo"),
+    "contagem por companhia": ("SELECT nome, count(*) FROM cia GROUP BY nome", (), "ix_cia_nome"),
+    "busca por origem/destino": (
+        "SELECT id FROM voo WHERE id IN (SELECT rowid FROM busca_voo WHERE busca_voo MATCH ?)",
+        ('"paulo"',),
+        "busca_voo",
+    ),
+}
+
+# Colunas novas (ex.: versao) com ALTER TABLE ADD COLUMN, que exige que a coluna aceite NULL ou
+# tenha server_default. As partições de arquivo dos voos recebem as mesmas colunas da tabela voo
+def criar_colunas_ausentes(engine: Engine) -> list[str]:
+    criadas = []
+    with engine.begin() as conexao:
+        inspetor = inspect(conexao)
+        nomes = inspetor.get_table_names()
+        arquivos = [nome for nome in nomes if PADRAO_ARQUIVO.match(nome)]
+        for tabela in SQLModel.metadata.sorted_tables:
+            for nome in [tabela.name, *(arquivos if tabela.name == "voo" else [])]:
+                if nome not in nomes:
+                    continue
+                existentes = {coluna["name"] for coluna in inspetor.get_columns(nome)}
+                for coluna in tabela.columns:
+                    if coluna.name not in existentes:
+                        definicao = CreateColumn(coluna).compile(dialect=conexao.dialect)
+                        conexao.exec_driver_sql(
+                            f"ALTER TABLE {conexao.dialect.identifier_preparer.quote(nome)} ADD COLUMN {definicao}"
+                        )
+                        criadas.append(f"{nome}.{coluna.name}")
+    for nome in criadas:
+        logger.info("Coluna criada: %s", nome)
+    return criadas
+
+def criar_indices_ausentes(engine: Engine) -> list[str]:
+    criados = []
+    with engine.begin() as conexao:
+        inspetor = inspect(conexao)
+        for tabela in SQLModel.metadata.sorted_tables:
+            if not inspetor.has_table(tabela.name):
+                continue
+            existentes = {indice["name"] for indice in inspetor.get_indexes(tabela.name)}
+            for indice in tabela.indexes:
+                if indice.name in existentes:
+                    continue
+                duplicados = _valores_duplicados(conexao, indice) if indice.unique else []
+                if duplicados:
+                    # Criá-lo falharia (IntegrityError) em toda inicialização: o banco continua
+                    # utilizável sem ele até que os duplicados sejam corrigidos
+                    logger.warning(
+                        "Índice único %s não criado: valores duplicados em %s(%s): %s",
+                        indice.name, tabela.name, ", ".join(coluna.name for coluna in indice.columns),
+                        "; ".join(", ".join(map(repr, valores)) for valores in duplicados),
+                    )
+                    continue
+                indice.create(conexao)
+                criados.append(indice.name)
+    for nome in criados:
+        logger.info("Índice criado: %s", nome)
+    return criados
+
+# Valores repetidos das colunas de um índice único (até `limite`, para o log)
+def _valores_duplicados(conexao, indice, limite: int = 20) -> list[tuple]:
+    colunas = list(indice.columns)
+    consulta = (
+        select(*colunas)
+        .where(and_(*(coluna.is_not(None) for coluna in colunas)))
+        .group_by(*colunas)
+        .having(func.count() > 1)
+        .limit(limite)
+    )
+    return [tuple(linha) for linha in conexao.execute(consulta)]
+
+# SQLite: a tabela voo de bancos antigos, sem AUTOINCREMENT, é recriada com ele (o SQLite não
+# altera a chave de uma tabela existente). Os índices e o índice de busca da tabela antiga são
+# descartados com ela e recriados em seguida por aplicar_migracoes. A sequência começa no maior
+# id já usado, inclusive nas partições de arquivo
+def criar_autoincremento_voo(engine: Engine) -> bool:
+    if engine.dialect.name != "sqlite":
+        return False  # Postgres: a sequência do id já é monotônica
+    with engine.begin() as conexao:
+        ddl = conexao.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'voo'").scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            return False
+        criar = str(CreateTable(Voo.__table__).compile(dialect=conexao.dialect))
+        conexao.exec_driver_sql(criar.replace("CREATE TABLE voo ", "CREATE TABLE voo_migracao ", 1))
+        colunas = ", ".join(coluna.name for coluna in Voo.__table__.columns)
+        conexao.exec_driver_sql(f"INSERT INTO voo_migracao ({colunas}) SELECT {colunas} FROM voo")
+        if inspect(conexao).has_table("busca_voo"):
+            conexao.exec_driver_sql("DROP TABLE busca_voo")
+        conexao.exec_driver_sql("DROP TABLE voo")
+        conexao.exec_driver_sql("ALTER TABLE voo_migracao RENAME TO voo")
+        tabelas = ["voo", *(nome for nome in inspect(conexao).get_table_names() if PADRAO_ARQUIVO.match(nome))]
+        maior_id = max(conexao.exec_driver_sql(f"SELECT coalesce(max(id), 0) FROM {nome}").scalar() for nome in tabelas)
+        conexao.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = 'voo'")
+        conexao.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES ('voo', ?)", (maior_id,))
+    logger.info("Tabela voo recriada com AUTOINCREMENT (próximo id: %d)", maior_id + 1)
+    return True
+
+def aplicar_migracoes(engine: Engine) -> None:
+    criar_colunas_ausentes(engine)
+    criar_autoincremento_voo(engine)
+    criar_indices_ausentes(engine)
+    # Índices de busca textual (FTS5 trigram no SQLite, pg_trgm no Postgres)
+    criar_indices_busca(engine)
+    # Versões das tabelas compartilhadas entre workers (ETag)
+    criar_tabela_versoes(engine)
+
+# Executa EXPLAIN QUERY PLAN nas consultas representativas (apenas SQLite)
+def verificar_planos(engine: Engine) -> dict[str, tuple[bool, str]]:
+    if engine.dialect.name != "sqlite":
+        return {}
+
+    resultado = {}
+    with engine.connect() as conexao:
+        for nome, (sql, parametros, indice) in CONSULTAS_INDEXADAS.items():
+            plano = " | ".join(
+                linha[-1] for linha in conexao.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parametros)
+            )
+            resultado[nome] = (indice in plano, plano)
+    return resultado
@@ -8,12 +8,14 @@ if TYPE_CHECKING:
 
 class AeronaveBase(SQLModel):
     id: int | None = Field(default=None, primary_key=True)
-    modelo: str
+    modelo: str = Field(index=True)
     capacidade: int
     last_check: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))  # Corrigido para usar datetime.now
     next_check: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))  # Corrigido para usar datetime.now
 
 class Aeronave(AeronaveBase, table=True):
-    cia_id: int = Field(foreign_key="cia.id")
+    cia_id: int = Field(foreign_key="cia.id", index=True)
     cia: "Cia" = Relationship(back_populates="aeronaves")  # Relacionamento com Cia
     voos: List["Voo"] = Relationship(back_populates="aeronave")  # Relacionamento com Voo
+    # Incrementada a cada alteração da linha (controle de concorrência otimista, services.concorrencia)
+    versao: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
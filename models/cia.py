@@ -8,11 +8,13 @@ if TYPE_CHECKING:
 
 class CiaBase(SQLModel):
     id: int | None = Field(default=None, primary_key=True)
-    nome: str
-    cod_iata: str
+    nome: str = Field(index=True)
+    cod_iata: str = Field(unique=True, index=True)
 
 class Cia(CiaBase, table=True):
     # Relacionamento com aeronaves
     aeronaves: List["Aeronave"] = Relationship(back_populates="cia")
     # Relacionamento com voos
     voos: List["Voo"] = Relationship(back_populates="cia")  # Relacionamento com voos
+    # Incrementada a cada alteração da linha (controle de concorrência otimista, services.concorrencia)
+    versao: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import datetime
 from typing import TYPE_CHECKING, List
 
@@ -16,7 +17,18 @@ class VooBase(SQLModel):
     status: str
 
 class Voo(VooBase, table=True):
-    aeronave_id: int = Field(foreign_key="aeronave.id")
+    # Índices compostos para filtros/ordenação por horário e paginação por (horário, id).
+    # AUTOINCREMENT no SQLite: ids nunca são reutilizados, nem os de voos movidos para as partições
+    # de arquivo (services.particoes); sem ele o próximo id seria max(id) + 1 da tabela voo
+    __table_args__ = (
+        Index("ix_voo_hr_partida_id", "hr_partida", "id"),
+        Index("ix_voo_hr_chegada_id", "hr_chegada", "id"),
+        {"sqlite_autoincrement": True},
+    )
+
+    aeronave_id: int = Field(foreign_key="aeronave.id", index=True)
     aeronave: "Aeronave" = Relationship(back_populates="voos")
-    cia_id: int = Field(foreign_key="cia.id")
+    cia_id: int = Field(foreign_key="cia.id", index=True)
     cia: "Cia" = Relationship(back_populates="voos")  # Relacionamento com Cia
+    # Incrementada a cada alteração da linha (controle de concorrência otimista, services.concorrencia)
+    versao: int = Field(default=1, sa_column_kwargs={"server_default": "1"})
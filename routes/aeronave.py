@@ -1,12 +1,19 @@
 from datetime import datetime
-from sqlalchemy import func
-from sqlalchemy.orm import joinedload  # Import necessário para o joinedload
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlmodel import Session, select
 from models.aeronave import Aeronave
 from models.cia import Cia
 from database import get_session
-from models.voo import Voo
+from services.contadores import contadores
+from services.disponibilidade import disponibilidade
+from services.manutencao import planejar
+from services.lote import excluir_em_lote, inserir_em_lote, atualizar_em_lote, ler_itens_lote
+from services.busca import filtro_texto
+from services.concorrencia import atualizar_parcial, confirmar, modelo_parcial
+from services.cache import lembrar
+from services.versoes import condicional
+from services.serializacao import RespostaJSON, colunas, como_dicts, resposta_json
+from services.paginacao import Paginacao, paginar
 
 router = APIRouter(
     prefix="/aeronaves",  # Prefixo para todas as rotas
@@ -29,24 +36,42 @@ def create_aeronave(aeronave_data: Aeronave, session: Session = Depends(get_sess
     
     return aeronave_data
 
+# Operações em lote (array JSON ou NDJSON), gravadas em blocos com erros por item
+REFERENCIAS_AERONAVE = {"cia_id": Cia}
+
+@router.post("/bulk", response_model=dict)
+def create_aeronaves_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return inserir_em_lote(session, Aeronave, itens, REFERENCIAS_AERONAVE)
+
+@router.patch("/bulk", response_model=dict)
+def update_aeronaves_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return atualizar_em_lote(session, Aeronave, itens, REFERENCIAS_AERONAVE)
+
+@router.delete("/bulk", response_model=dict)
+def delete_aeronaves_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return excluir_em_lote(session, Aeronave, itens)
+
 # Read (sem filtros)
-@router.get("/listar", response_model=list[Aeronave])
+@router.get("/listar", response_model=list[Aeronave], response_class=RespostaJSON, dependencies=[Depends(condicional("aeronave"))])
 def read_aeronaves(
-    offset: int = 0,
-    limit: int = Query(default=10, le=100),  
+    paginacao: Paginacao = Depends(),
+    response: Response = None,
     session: Session = Depends(get_session)):
-    return session.exec(select(Aeronave).offset(offset).limit(limit)).all()
+    aeronaves = paginar(session, select(*colunas(Aeronave)), [Aeronave.id], paginacao, response)
+    return resposta_json(como_dicts(aeronaves), response)
 
 # Read (com filtros)
-@router.get("/", response_model=list[Aeronave])
+@router.get("/", response_model=list[Aeronave], response_class=RespostaJSON, dependencies=[Depends(condicional("aeronave"))])
 def read_aeronaves_filtro(
     id: int = Query(None, description="Buscar por ID"),
     modelo: str = Query(None, description="Filtrar por modelo da aeronave"),
     capacidade: int = Query(None, description="Filtrar por capacidade da aeronave"),
     cia_id: int = Query(None, description="Filtrar por companhia aérea ID"),
+    paginacao: Paginacao = Depends(),
+    response: Response = None,
     session: Session = Depends(get_session)
 ):
-    statement = select(Aeronave)
+    statement = select(*colunas(Aeronave))
 
     # Filtro por ID da aeronave
     if id is not None:
@@ -54,7 +79,7 @@ def read_aeronaves_filtro(
 
     # Filtro por modelo da aeronave
     if modelo:
-        statement = statement.where(Aeronave.modelo.ilike(f"%{modelo}%"))
+        statement = statement.where(filtro_texto([Aeronave.modelo], modelo))
 
     # Filtro por capacidade
     if capacidade is not None:
@@ -64,14 +89,14 @@ def read_aeronaves_filtro(
     if cia_id is not None:
         statement = statement.where(Aeronave.cia_id == cia_id)
 
-    # Execução da consulta
-    aeronaves = session.exec(statement).all()
+    # Execução da consulta paginada
+    aeronaves = paginar(session, statement, [Aeronave.id], paginacao, response)
 
-    # Verifica se encontrou alguma aeronave
-    if not aeronaves:
+    # Verifica se encontrou alguma aeronave (uma página seguinte vazia não é erro)
+    if not aeronaves and not paginacao.cursor:
         raise HTTPException(status_code=404, detail="Aeronave não encontrada")
 
-    return aeronaves
+    return resposta_json(como_dicts(aeronaves), response)
 
 # Update
 @router.put("/{id}", response_model=Aeronave)
@@ -81,6 +106,12 @@ def update_aeronave(id: int, aeronave_data: Aeronave, session: Session = Depends
     if not aeronave:
         raise HTTPException(status_code=404, detail="Aeronave não encontrada")
 
+    # Converter campos datetime, se forem strings
+    if isinstance(aeronave_data.last_check, str):
+        aeronave_data.last_check = datetime.fromisoformat(aeronave_data.last_check.replace("Z", "+00:00"))
+    if isinstance(aeronave_data.next_check, str):
+        aeronave_data.next_check = datetime.fromisoformat(aeronave_data.next_check.replace("Z", "+00:00"))
+
     # Atualiza os dados da aeronave
     aeronave.modelo = aeronave_data.modelo
     aeronave.capacidade = aeronave_data.capacidade
@@ -89,11 +120,16 @@ def update_aeronave(id: int, aeronave_data: Aeronave, session: Session = Depends
     aeronave.cia_id = aeronave_data.cia_id
 
     # Commit para salvar as alterações
-    session.commit()
+    confirmar(session, "Aeronave não encontrada")
     session.refresh(aeronave)  # Atualiza o objeto com as alterações
 
     return aeronave
 
+# Update parcial: só os campos enviados, num único UPDATE com a versão esperada (409 se mudou)
+@router.patch("/{id}", response_model=Aeronave)
+def patch_aeronave(id: int, campos: modelo_parcial(Aeronave), session: Session = Depends(get_session)):
+    return atualizar_parcial(session, Aeronave, id, campos, "Aeronave não encontrada", REFERENCIAS_AERONAVE)
+
 # Delete
 @router.delete("/{aeronave_id}", response_model=Aeronave)
 def delete_aeronave(aeronave_id: int, session: Session = Depends(get_session)):
@@ -108,45 +144,71 @@ def delete_aeronave(aeronave_id: int, session: Session = Depends(get_session)):
     session.commit()
     return db_aeronave
 
-@router.get("/contagem-aeronaves-por-voos", response_model=dict)
+@router.get("/contagem-aeronaves-por-voos", response_model=dict, dependencies=[Depends(condicional("aeronave", "voo"))])
 def contar_aeronaves_por_voos(session: Session = Depends(get_session)):
-    statement = select(Aeronave.modelo, func.count(Voo.id).label("total_voos"))
-    statement = statement.join(Voo, Voo.aeronave_id == Aeronave.id)  # Faz o join entre Voo e Aeronave
-    statement = statement.group_by(Aeronave.modelo)  # Agrupa pela aeronave (modelo)
-
-    # Executa a consulta e retorna os resultados
-    resultados = session.exec(statement).all()
-    
-    # Retorna como um dicionário com o modelo da aeronave e a contagem de voos
-    return {result[0]: result[1] for result in resultados}
+    # Contagem de voos por modelo, mantida pelos contadores materializados (services.contadores)
+    return contadores.voos_por_modelo(session)
 
 # Informações completas das aeronaves
-@router.get("/aeronaves-completas", response_model=list[dict])
-def aeronaves_completas(session: Session = Depends(get_session)):
-    statement = select(Aeronave).options(joinedload(Aeronave.cia))  # Carrega também a cia associada
-    resultados = session.exec(statement).unique().all()  # Aplica unique() para garantir resultados únicos
-
-    aeronaves_completas = []
-    for aeronave in resultados:
-        aeronaves_completas.append({
-            "id": aeronave.id,
-            "modelo": aeronave.modelo,
-            "capacidade": aeronave.capacidade,
-            "last_check": aeronave.last_check,
-            "next_check": aeronave.next_check,
-            "cia": {
-                "id": aeronave.cia.id,
-                "nome": aeronave.cia.nome,
-                "cod_iata": aeronave.cia.cod_iata,
-            }
-        })
-
-    return aeronaves_completas
-
-# Buscar Aeronave pelo ID
-@router.get("/{aeronave_id}", response_model=Aeronave)
-def get_aeronave(aeronave_id: int, session: Session = Depends(get_session)):
+@router.get("/aeronaves-completas", response_model=list[dict], response_class=RespostaJSON, dependencies=[Depends(condicional("aeronave", "cia"))])
+def aeronaves_completas(response: Response, session: Session = Depends(get_session)):
+    # Apenas as colunas usadas, com a cia no mesmo JOIN (sem instâncias do ORM)
+    statement = select(
+        Aeronave.id, Aeronave.modelo, Aeronave.capacidade, Aeronave.last_check, Aeronave.next_check,
+        Cia.id.label("cia_id"), Cia.nome, Cia.cod_iata,
+    ).join(Cia, Aeronave.cia_id == Cia.id)
+
+    aeronaves_completas = [
+        {
+            "id": linha.id,
+            "modelo": linha.modelo,
+            "capacidade": linha.capacidade,
+            "last_check": linha.last_check,
+            "next_check": linha.next_check,
+            "cia": {"id": linha.cia_id, "nome": linha.nome, "cod_iata": linha.cod_iata},
+        }
+        for linha in session.exec(statement)
+    ]
+
+    return resposta_json(aeronaves_completas, response)
+
+# Aeronaves sem voos no intervalo (índice de intervalos por aeronave, services.disponibilidade)
+@router.get("/disponiveis", response_model=list[Aeronave], response_class=RespostaJSON, dependencies=[Depends(condicional("aeronave", "voo"))])
+def aeronaves_disponiveis(
+    inicio: datetime = Query(..., description="Início do intervalo (ISO 8601)"),
+    fim: datetime = Query(..., description="Fim do intervalo (ISO 8601)"),
+    cia_id: int = Query(None, description="Apenas aeronaves desta companhia aérea"),
+    response: Response = None,
+    session: Session = Depends(get_session),
+):
+    if fim <= inicio:
+        raise HTTPException(status_code=400, detail="O fim do intervalo deve ser posterior ao início")
+
+    livres = disponibilidade.livres(session, inicio, fim, cia_id)
+    aeronaves = session.exec(select(*colunas(Aeronave)).where(Aeronave.id.in_(livres)).order_by(Aeronave.id)) if livres else []
+    return resposta_json(como_dicts(aeronaves), response)
+
+# Aeronaves com check nos próximos `dias` dias e voos em conflito com a manutenção (services.manutencao)
+@router.get("/manutencao", response_model=dict, response_class=RespostaJSON, dependencies=[Depends(condicional("aeronave", "voo", "cia", relogio="referencia"))])
+def planejar_manutencao(
+    dias: int = Query(30, ge=0, description="Horizonte do planejamento em dias"),
+    duracao_horas: float = Query(24, gt=0, description="Duração da janela de manutenção em horas"),
+    referencia: datetime = Query(None, description="Data de referência (padrão: agora)"),
+    cia_id: int = Query(None, description="Apenas aeronaves desta companhia aérea"),
+    response: Response = None,
+    session: Session = Depends(get_session),
+):
+    return resposta_json(planejar(session, dias, duracao_horas, referencia, cia_id), response)
+
+# Buscar Aeronave pelo ID. O cache guarda o registro já em JSON (datas como texto): ele é enviado
+# como está, sem passar pelo modelo da tabela, que não converteria as datas de volta
+@router.get("/{aeronave_id}", response_model=Aeronave, response_class=RespostaJSON, dependencies=[Depends(condicional("aeronave"))])
+def get_aeronave(aeronave_id: int, response: Response = None, session: Session = Depends(get_session)):
+    return resposta_json(lembrar(f"aeronave:{aeronave_id}", lambda: _buscar_aeronave(session, aeronave_id)), response)
+
+def _buscar_aeronave(session: Session, aeronave_id: int) -> dict:
     aeronave = session.get(Aeronave, aeronave_id)
     if not aeronave:
         raise HTTPException(status_code=404, detail="Aeronave não encontrada")
-    return aeronave
+    campos = aeronave.model_dump(mode="json")
+    return {campo: campos[campo] for campo in Aeronave.model_fields if campo in campos}  # Na ordem do modelo
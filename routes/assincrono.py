@@ -0,0 +1,62 @@
+# Versões assíncronas das rotas (DB_MODO=async).
+#
+# Cada endpoint síncrono que recebe a sessão via Depends(get_session) ganha uma versão
+# "async def" que recebe uma AsyncSession e executa o mesmo corpo com AsyncSession.run_sync:
+# o I/O do banco passa pelo driver assíncrono (aiosqlite/asyncpg) no event loop, sem ocupar
+# o threadpool. Assim as regras de negócio ficam escritas uma única vez, nos routers síncronos.
+from fastapi import APIRouter, Depends
+from fastapi.routing import APIRoute
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_async_session, get_session
+import functools
+import inspect
+
+def converter_router(router: APIRouter) -> APIRouter:
+    novo_router = APIRouter()
+    for rota in router.routes:
+        if not isinstance(rota, APIRoute):
+            # Rotas sem sessão (ex.: websockets) são reaproveitadas sem alteração
+            novo_router.routes.append(rota)
+            continue
+
+        novo_router.add_api_route(
+            rota.path,
+            _endpoint_assincrono(rota.endpoint),
+            methods=list(rota.methods),
+            response_model=rota.response_model,
+            status_code=rota.status_code,
+            tags=rota.tags,
+            dependencies=rota.dependencies,
+            summary=rota.summary,
+            description=rota.description,
+            responses=rota.responses,
+            name=rota.name,
+            response_class=rota.response_class,
+            include_in_schema=rota.include_in_schema,
+        )
+    return novo_router
+
+def _endpoint_assincrono(endpoint):
+    assinatura = inspect.signature(endpoint)
+    parametro_sessao = next(
+        (
+            parametro.name for parametro in assinatura.parameters.values()
+            if getattr(parametro.default, "dependency", None) is get_session
+        ),
+        None,
+    )
+    # Endpoints que não usam a sessão da requisição (ex.: streaming) continuam síncronos
+    if parametro_sessao is None or inspect.iscoroutinefunction(endpoint):
+        return endpoint
+
+    @functools.wraps(endpoint)
+    async def endpoint_async(**kwargs):
+        session: AsyncSession = kwargs.pop(parametro_sessao)
+        return await session.run_sync(lambda sessao_sync: endpoint(**kwargs, **{parametro_sessao: sessao_sync}))
+
+    endpoint_async.__signature__ = assinatura.replace(parameters=[
+        parametro.replace(annotation=AsyncSession, default=Depends(get_async_session))
+        if parametro.name == parametro_sessao else parametro
+        for parametro in assinatura.parameters.values()
+    ])
+    return endpoint_async
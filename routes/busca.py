@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import Session
+from database import get_session
+from services.busca import INDICES, buscar
+from services.serializacao import RespostaJSON, resposta_json
+from services.versoes import condicional
+
+router = APIRouter(
+    prefix="/busca",  # Prefixo para todas as rotas
+    tags=["Busca"],  # Tag para documentação automática
+)
+
+# Busca ranqueada em voos (origem/destino), companhias (nome) e modelos de aeronave,
+# com prioridade para prefixos e tolerância a erros de digitação
+@router.get("/", response_model=list[dict], response_class=RespostaJSON, dependencies=[Depends(condicional("voo", "cia", "aeronave"))])
+def buscar_texto(
+    q: str = Query(..., min_length=1, description="Texto buscado"),
+    tipo: str = Query(None, description="Restringe a busca: 'voo', 'cia' ou 'aeronave'"),
+    limit: int = Query(default=20, ge=1, le=100, description="Quantidade máxima de resultados"),
+    response: Response = None,
+    session: Session = Depends(get_session),
+):
+    if tipo is not None and tipo not in INDICES:
+        raise HTTPException(status_code=400, detail="Tipo inválido: use 'voo', 'cia' ou 'aeronave'")
+
+    resultados = [
+        {"tipo": tabela, "score": score, **linha}
+        for tabela in ([tipo] if tipo else INDICES)
+        for linha, score in buscar(session, tabela, q, limit)
+    ]
+    resultados.sort(key=lambda resultado: -resultado["score"])
+    return resposta_json(resultados[:limit], response)
@@ -1,11 +1,19 @@
-from sqlalchemy import func, or_
-from sqlalchemy.orm import joinedload  # Import necessário para o joinedload
-from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
 from sqlmodel import Session, select
 from models.aeronave import Aeronave
 from models.cia import Cia  # Importe o modelo Voo
 from database import get_session
 from models.voo import Voo
+from services.contadores import contadores
+from services.lote import excluir_em_lote, inserir_em_lote, atualizar_em_lote, ler_itens_lote
+from services.busca import filtro_texto
+from services.concorrencia import atualizar_parcial, modelo_parcial
+from services.cache import lembrar
+from services.versoes import condicional
+from services.serializacao import RespostaJSON, colunas, como_dicts, resposta_json
+from services.paginacao import CABECALHO_CURSOR, Paginacao, paginar
 
 router = APIRouter(
     prefix="/cias",  # Prefixo para todas as rotas
@@ -16,28 +24,51 @@ router = APIRouter(
 @router.post("/", response_model=Cia)
 def create_cia(cia: Cia, session: Session = Depends(get_session)):
     session.add(cia)  # Adiciona a instância do voo
-    session.commit()
+    _commit_cia(session)
     session.refresh(cia)  # Atualiza a instância com os dados do banco
     return cia
 
+# Operações em lote (array JSON ou NDJSON), gravadas em blocos com erros por item
+@router.post("/bulk", response_model=dict)
+def create_cias_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return inserir_em_lote(session, Cia, itens)
+
+@router.patch("/bulk", response_model=dict)
+def update_cias_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return atualizar_em_lote(session, Cia, itens)
+
+@router.delete("/bulk", response_model=dict)
+def delete_cias_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return excluir_em_lote(session, Cia, itens)
+
 # Read (sem filtros)
-@router.get("/listar", response_model=list[Cia])
+@router.get("/listar", response_model=list[Cia], response_class=RespostaJSON, dependencies=[Depends(condicional("cia"))])
 def read_cia(
-    offset: int = 0,
-    limit: int = Query(default=10, le=100),  
+    paginacao: Paginacao = Depends(),
+    response: Response = None,
     session: Session = Depends(get_session)):
-    return session.exec(select(Cia).offset(offset).limit(limit)).all()
+    # Páginas em cache junto com o cursor da página seguinte
+    def consultar():
+        cias = paginar(session, select(*colunas(Cia)), [Cia.id], paginacao, response)
+        return {"itens": como_dicts(cias), "cursor": response.headers.get(CABECALHO_CURSOR)}
+
+    pagina = lembrar(f"cia:listar:{paginacao.cursor or ''}:{paginacao.limit}", consultar)
+    if pagina["cursor"]:
+        response.headers[CABECALHO_CURSOR] = pagina["cursor"]
+    return resposta_json(pagina["itens"], response)
 
 # Read (com filtros)
-@router.get("/", response_model=list[Cia])
+@router.get("/", response_model=list[Cia], response_class=RespostaJSON, dependencies=[Depends(condicional("cia"))])
 def read_cias(
     id: int = Query(None, description="Buscar por ID"),
     cod_iata: str = Query(None, description="Filtrar por código iata"),
     busca_texto: str = Query(None, description="Filtrar por nome da companhia aérea (parcial)"),
     ordenacao: str = Query(None, description="Campo para ordenação: 'nome'"),
+    paginacao: Paginacao = Depends(),
+    response: Response = None,
     session: Session = Depends(get_session)
 ):
-    statement = select(Cia)
+    statement = select(*colunas(Cia))
 
     # Filtro por ID da companhia aérea
     if id is not None:
@@ -49,21 +80,28 @@ def read_cias(
 
     # Filtro por nome da companhia aérea (parcial)
     if busca_texto:
-        statement = statement.where(Cia.nome.ilike(f"%{busca_texto}%"))
-
-    # Ordenação
-    if ordenacao:
-        if ordenacao == "nome":
-            statement = statement.order_by(Cia.nome)
-    
-    # Execução da consulta
-    cias = session.exec(statement).all()
-
-    # Verifica se encontrou alguma companhia
-    if not cias:
+        statement = statement.where(filtro_texto([Cia.nome], busca_texto))
+
+    # Ordenação (o id desempata e torna a chave de paginação única)
+    chaves = [Cia.id]
+    if ordenacao == "nome":
+        chaves = [Cia.nome, Cia.id]
+
+    # Execução da consulta paginada; a busca apenas pelo código IATA (a mais frequente
+    # nos painéis, com no máximo um resultado) é servida pelo cache
+    if cod_iata and id is None and not busca_texto and not paginacao.cursor:
+        cias = lembrar(
+            f"cia:iata:{cod_iata}",
+            lambda: como_dicts(paginar(session, statement, chaves, paginacao, response)) or None,
+        )
+    else:
+        cias = como_dicts(paginar(session, statement, chaves, paginacao, response))
+
+    # Verifica se encontrou alguma companhia (uma página seguinte vazia não é erro)
+    if not cias and not paginacao.cursor:
         raise HTTPException(status_code=404, detail="Companhia aérea não encontrada")
 
-    return cias
+    return resposta_json(cias, response)
 
 # Update
 @router.put("/{id}", response_model=Cia)
@@ -78,11 +116,28 @@ def update_cia(id: int, cia_data: Cia, session: Session = Depends(get_session)):
     cia.cod_iata = cia_data.cod_iata
 
     # Commit para salvar as alterações
-    session.commit()
+    _commit_cia(session)
     session.refresh(cia)  # Atualiza o objeto com as alterações
 
     return cia
 
+# Update parcial: só os campos enviados, num único UPDATE com a versão esperada (409 se mudou;
+# também 409 se o código IATA já pertence a outra cia)
+@router.patch("/{id}", response_model=Cia)
+def patch_cia(id: int, campos: modelo_parcial(Cia), session: Session = Depends(get_session)):
+    return atualizar_parcial(session, Cia, id, campos, "Cia não encontrada")
+
+# O código IATA é único (índice ix_cia_cod_iata); a cia pode ter sido excluída por outra requisição
+def _commit_cia(session: Session) -> None:
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=409, detail="Código IATA já cadastrado")
+    except StaleDataError:
+        session.rollback()
+        raise HTTPException(status_code=404, detail="Cia não encontrada")
+
 # Delete
 @router.delete("/{cia_id}", response_model=Cia)
 def delete_cia(cia_id: int, session: Session = Depends(get_session)):
@@ -98,53 +153,42 @@ def delete_cia(cia_id: int, session: Session = Depends(get_session)):
     return db_cia
 
 # Consultas de contagem por modelo de aeronave
-@router.get("/contagem-por-modelo", response_model=list[dict])
+@router.get("/contagem-por-modelo", response_model=list[dict], dependencies=[Depends(condicional("cia", "aeronave"))])
 def contar_aeronaves_por_modelo(session: Session = Depends(get_session)):
-    # Query para contar aeronaves agrupadas por modelo e companhia aérea
-    statement = (
-        select(Cia.nome, Aeronave.modelo, func.count(Aeronave.id).label("total_aeronaves"))
-        .join(Aeronave, Aeronave.cia_id == Cia.id)  # Realiza o JOIN entre Cia e Aeronave
-        .group_by(Cia.nome, Aeronave.modelo)  # Agrupa por companhia e modelo
-    )
-    resultados = session.exec(statement).all()
-
-    # Formata o retorno como uma lista de dicionários
-    return [
-        {"cia": result[0], "modelo": result[1], "total_aeronaves": result[2]}
-        for result in resultados
-    ]
+    # Aeronaves agrupadas por companhia e modelo, mantidas pelos contadores materializados
+    return contadores.aeronaves_por_cia_e_modelo(session)
 
 # Informações completas das companhias aéreas
-@router.get("/cias-completa", response_model=list[dict])
-def cias_completas(session: Session = Depends(get_session)):
-    statement = select(Cia).options(joinedload(Cia.aeronaves))
-    resultados = session.exec(statement).unique().all()  # Aplica unique() para garantir resultados únicos
-
-    cias_completas = []
-    for cia in resultados:
-        cias_completas.append({
-            "id": cia.id,
-            "nome": cia.nome,
-            "cod_iata": cia.cod_iata,
-            "aeronaves": [
-                {
-                    "id": aeronave.id,
-                    "modelo": aeronave.modelo,
-                    "capacidade": aeronave.capacidade,
-                    "last_check": aeronave.last_check,
-                    "next_check": aeronave.next_check,
-                }
-                for aeronave in cia.aeronaves
-            ]
+@router.get("/cias-completa", response_model=list[dict], response_class=RespostaJSON, dependencies=[Depends(condicional("cia", "aeronave"))])
+def cias_completas(response: Response, session: Session = Depends(get_session)):
+    # Duas consultas só com as colunas usadas: aeronaves agrupadas por cia e depois as cias
+    aeronaves_por_cia = {}
+    for linha in session.exec(select(
+        Aeronave.id, Aeronave.modelo, Aeronave.capacidade, Aeronave.last_check, Aeronave.next_check, Aeronave.cia_id,
+    ).order_by(Aeronave.id)):
+        aeronaves_por_cia.setdefault(linha.cia_id, []).append({
+            "id": linha.id,
+            "modelo": linha.modelo,
+            "capacidade": linha.capacidade,
+            "last_check": linha.last_check,
+            "next_check": linha.next_check,
         })
 
-    return cias_completas
+    cias_completas = [
+        {"id": linha.id, "nome": linha.nome, "cod_iata": linha.cod_iata, "aeronaves": aeronaves_por_cia.get(linha.id, [])}
+        for linha in session.exec(select(Cia.id, Cia.nome, Cia.cod_iata).order_by(Cia.id))
+    ]
+
+    return resposta_json(cias_completas, response)
 
 
 # Buscar Companhia Aérea pelo ID
-@router.get("/{cia_id}", response_model=Cia)
+@router.get("/{cia_id}", response_model=Cia, dependencies=[Depends(condicional("cia"))])
 def get_cia(cia_id: int, session: Session = Depends(get_session)):
+    return lembrar(f"cia:{cia_id}", lambda: _buscar_cia(session, cia_id))
+
+def _buscar_cia(session: Session, cia_id: int) -> dict:
     cia = session.get(Cia, cia_id)
     if not cia:
         raise HTTPException(status_code=404, detail="Cia não encontrada")
-    return cia
+    return cia.model_dump(mode="json")
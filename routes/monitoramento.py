@@ -0,0 +1,76 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from database import engine, estatisticas_pool
+from services import cache, metricas
+from services.conexoes import rede
+from services.contadores import contadores, reconciliar
+from services.disponibilidade import disponibilidade
+from services.feed import feed
+from services.fila_status import fila_status
+from services.particoes import particoes
+from services.versoes import versoes
+
+router = APIRouter(
+    prefix="/monitoramento",  # Prefixo para todas as rotas
+    tags=["Monitoramento"],  # Tag para documentação automática
+)
+
+# /metrics fica fora do prefixo: é o caminho que o Prometheus consulta por padrão
+router_metricas = APIRouter(tags=["Monitoramento"])
+
+# Métricas por rota (latência, tempo no banco, comandos SQL, espera do pool, tamanho das respostas)
+# e do pool de conexões, no formato texto do Prometheus
+@router_metricas.get("/metrics", response_class=PlainTextResponse)
+def exportar_metricas():
+    linhas = metricas.metricas.exportar() + metricas.exportar_pool(estatisticas_pool())
+    return PlainTextResponse("\n".join(linhas) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Estatísticas do pool de conexões (checkouts, espera, conexões em uso)
+@router.get("/pool", response_model=dict)
+def pool_conexoes():
+    return estatisticas_pool()
+
+# Contadores do cache de leitura (acertos, falhas, despejos, invalidações)
+@router.get("/cache", response_model=dict)
+def estatisticas_cache():
+    return cache.estatisticas()
+
+# Estado dos contadores materializados dos endpoints de contagem
+@router.get("/contadores", response_model=dict)
+def estado_contadores():
+    return contadores.resumo()
+
+# Versões das tabelas usadas nos ETags das respostas GET
+@router.get("/versoes", response_model=dict)
+def versoes_tabelas():
+    return versoes.resumo()
+
+# Partições mensais de arquivo dos voos
+@router.get("/particoes", response_model=list[str])
+def particoes_voos():
+    return [tabela.name for tabela in particoes().values()]
+
+# Índice de intervalos usado na alocação de aeronaves
+@router.get("/disponibilidade", response_model=dict)
+def estado_disponibilidade():
+    return disponibilidade.resumo()
+
+# Grafo de voos usado na busca de conexões
+@router.get("/conexoes", response_model=dict)
+def estado_conexoes():
+    return rede.resumo()
+
+# Conexões inscritas no feed de alterações dos voos (/voos/stream)
+@router.get("/feed", response_model=dict)
+def estado_feed():
+    return feed.resumo()
+
+# Fila de escrita diferida dos status dos voos (PUT /voos/{id}/status, POST /voos/status)
+@router.get("/fila-status", response_model=dict)
+def estado_fila_status():
+    return fila_status.resumo()
+
+# Reconciliação imediata (ex.: após cargas feitas direto no banco)
+@router.post("/contadores/reconciliar", response_model=dict)
+def reconciliar_contadores():
+    return {"divergencias": reconciliar(engine), **contadores.resumo()}
@@ -1,12 +1,29 @@
-from sqlalchemy.orm import joinedload  # Import necessário para o joinedload
-from sqlalchemy import func, or_, literal_column
-from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import aliased
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select
 from models.voo import Voo
 from models.aeronave import Aeronave
 from models.cia import Cia
-from database import get_session
-from datetime import datetime
+from database import engine, engine_leitura, get_session
+from services.busca import filtro_texto
+from services.concorrencia import atualizar_parcial, confirmar, modelo_parcial
+from services.conexoes import CONEXOES_HORIZONTE, CONEXOES_TEMPO_MINIMO, rede
+from services.contadores import contadores
+from services.disponibilidade import disponibilidade
+from services.feed import FEED_HEARTBEAT, Assinante, codificar, feed
+from services.fila_status import StatusVoo, fila_cheia, fila_status
+from services.lote import excluir_em_lote, inserir_em_lote, atualizar_em_lote, ler_itens_lote
+from services.versoes import condicional
+from services.serializacao import RespostaJSON, colunas, como_dicts, resposta_json
+from services.particoes import consultar_particoes, tabelas_voo
+from services.paginacao import Paginacao, paginar
+from services.transferencia import FORMATOS, Importador, LeitorLinhas, exportar
+from datetime import datetime, timedelta
+import asyncio
+import codecs
+import json
 
 router = APIRouter(
     prefix="/voos",  # Prefixo para todas as rotas
@@ -21,12 +38,29 @@ def create_voo(voo_data: Voo, session: Session = Depends(get_session)):
         voo_data.hr_partida = datetime.fromisoformat(voo_data.hr_partida.replace("Z", "+00:00"))
     if isinstance(voo_data.hr_chegada, str):
         voo_data.hr_chegada = datetime.fromisoformat(voo_data.hr_chegada.replace("Z", "+00:00"))
-    
-    session.add(voo_data)
-    session.commit()
+
+    # 409 se a aeronave já tem voo no horário (services.disponibilidade)
+    with disponibilidade.reservar_voo(session, voo_data.model_dump()):
+        session.add(voo_data)
+        session.commit()
     session.refresh(voo_data)
     return voo_data
 
+# Operações em lote (array JSON ou NDJSON), gravadas em blocos com erros por item
+REFERENCIAS_VOO = {"cia_id": Cia, "aeronave_id": Aeronave}
+
+@router.post("/bulk", response_model=dict)
+def create_voos_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return inserir_em_lote(session, Voo, itens, REFERENCIAS_VOO, reservar=disponibilidade.reservar)
+
+@router.patch("/bulk", response_model=dict)
+def update_voos_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return atualizar_em_lote(session, Voo, itens, REFERENCIAS_VOO, reservar=disponibilidade.reservar)
+
+@router.delete("/bulk", response_model=dict)
+def delete_voos_lote(itens: list = Depends(ler_itens_lote), session: Session = Depends(get_session)):
+    return excluir_em_lote(session, Voo, itens)
+
 @router.put("/{id}", response_model=Voo)
 def update_voo(id: int, voo_data: Voo, session: Session = Depends(get_session)):
     # Busca o voo pelo ID
@@ -40,23 +74,92 @@ def update_voo(id: int, voo_data: Voo, session: Session = Depends(get_session)):
     if isinstance(voo_data.hr_chegada, str):
         voo_data.hr_chegada = datetime.fromisoformat(voo_data.hr_chegada)
 
-    # Atualiza os dados do voo
-    voo.numero_voo = voo_data.numero_voo
-    voo.origem = voo_data.origem
-    voo.destino = voo_data.destino
-    voo.hr_partida = voo_data.hr_partida
-    voo.hr_chegada = voo_data.hr_chegada
-    voo.status = voo_data.status
-    voo.aeronave_id = voo_data.aeronave_id
-    voo.cia_id = voo_data.cia_id
-
-    # Commit para salvar as alterações
-    session.commit()
+    # Reserva o horário na aeronave antes de alterar o voo (409 se ela já tem outro voo no horário)
+    with disponibilidade.reservar_voo(session, {**voo_data.model_dump(), "id": id}):
+        # Atualiza os dados do voo
+        voo.numero_voo = voo_data.numero_voo
+        voo.origem = voo_data.origem
+        voo.destino = voo_data.destino
+        voo.hr_partida = voo_data.hr_partida
+        voo.hr_chegada = voo_data.hr_chegada
+        voo.status = voo_data.status
+        voo.aeronave_id = voo_data.aeronave_id
+        voo.cia_id = voo_data.cia_id
+
+        # Commit para salvar as alterações
+        confirmar(session, "Voo não encontrado")
     session.refresh(voo)  # Atualiza o objeto com as alterações
 
     return voo
+
+# Update parcial: só os campos enviados, num único UPDATE com a versão esperada (409 se mudou)
+@router.patch("/{id}", response_model=Voo)
+def patch_voo(id: int, campos: modelo_parcial(Voo), session: Session = Depends(get_session)):
+    return atualizar_parcial(
+        session, Voo, id, campos, "Voo não encontrado", REFERENCIAS_VOO, reservar=disponibilidade.reservar_alteracao,
+    )
+
+# Alterações de status em rajadas: aceitas numa fila e gravadas em lotes (services.fila_status).
+# Respondem 202 sem acessar o banco; voos inexistentes são descartados na gravação
+@router.put("/{id}/status", response_model=dict, status_code=202)
+async def enfileirar_status_voo(id: int, alteracao: StatusVoo):
+    aceitos, conflitos = await fila_status.enfileirar([(id, alteracao.status)])
+    if conflitos:
+        raise HTTPException(status_code=409, detail=conflitos[0])
+    if not aceitos:
+        raise fila_cheia()
+    return {"id": id, "status": alteracao.status, "durabilidade": fila_status.durabilidade}
+
+@router.post("/status", response_model=dict, status_code=202)
+async def enfileirar_status_voos(itens: list = Depends(ler_itens_lote)):
+    return await fila_status.enfileirar_lote(itens)
+
+# Exportação da tabela de voos em streaming (CSV ou NDJSON)
+@router.get("/export", response_class=StreamingResponse)
+def exportar_voos(
+    formato: str = Query("csv", description="Formato do arquivo: 'csv' ou 'ndjson'"),
+    cabecalhos: dict = Depends(condicional("voo")),
+):
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato inválido: use 'csv' ou 'ndjson'")
+
+    return StreamingResponse(
+        exportar(engine_leitura(), Voo, formato),
+        media_type="text/csv" if formato == "csv" else "application/x-ndjson",
+        headers={**cabecalhos, "Content-Disposition": f'attachment; filename="voos.{formato}"'},
+    )
+
+# Importação em streaming: o corpo é lido aos pedaços e gravado em lotes
+@router.post("/import", response_model=dict)
+async def importar_voos(
+    request: Request,
+    formato: str = Query(None, description="Formato do corpo: 'csv' ou 'ndjson' (padrão: pelo Content-Type)"),
+):
+    formato = formato or ("ndjson" if "ndjson" in request.headers.get("content-type", "") else "csv")
+    if formato not in FORMATOS:
+        raise HTTPException(status_code=400, detail="Formato inválido: use 'csv' ou 'ndjson'")
+
+    leitor = LeitorLinhas(formato)
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")()
+    session = Session(engine)
+    try:
+        # O acesso ao banco é síncrono: roda no threadpool para não bloquear o event loop
+        importador = await run_in_threadpool(Importador, session, Voo)
+        pendente = ""
+        async for pedaco in request.stream():
+            pendente += decodificador.decode(pedaco)
+            *linhas, pendente = pendente.split("\n")
+            if linhas:
+                await run_in_threadpool(importador.adicionar, leitor.ler(linhas))
+        pendente += decodificador.decode(b"", final=True)
+        await run_in_threadpool(importador.adicionar, leitor.ler([pendente], final=True))
+        await run_in_threadpool(importador.gravar)
+        return importador.resumo()
+    finally:
+        await run_in_threadpool(session.close)
+
 # Delete (DELETE)
-@router.delete("/{id}", response_model=str)
+@router.delete("/{id}", response_model=dict)
 def delete_voo(id: int, session: Session = Depends(get_session)):
     voo = session.get(Voo, id)
     if not voo:
@@ -68,7 +171,7 @@ def delete_voo(id: int, session: Session = Depends(get_session)):
     return {"message": "Voo excluído com sucesso"}
 
 # Consultas
-@router.get("/", response_model=list[Voo])
+@router.get("/", response_model=list[Voo], response_class=RespostaJSON, dependencies=[Depends(condicional("voo", "cia"))])
 def read_voos(
     id: int = Query(None, description="Buscar por ID"),
     data_inicio: str = Query(None, description="Data de início para filtrar os voos (formato YYYY-MM-DD)"),
@@ -76,97 +179,250 @@ def read_voos(
     companhia_nome: str = Query(None, description="Filtrar por cia"),
     busca_texto: str = Query(None, description="Filtrar por origem ou destino"),
     ordenacao: str = Query(None, description="Campo para ordenação: 'hr_partida' ou 'hr_chegada'"),
+    paginacao: Paginacao = Depends(),
+    response: Response = None,
     session: Session = Depends(get_session)
 ):
-    statement = select(Voo)
-
-    # Filtro por ID do voo
-    if id:
-        statement = statement.where(Voo.id == id)
-
-    # Filtro por data de início
-    if data_inicio:
-        data_inicio_dt = datetime.strptime(data_inicio, "%Y-%m-%d")
-        statement = statement.where(Voo.hr_partida >= data_inicio_dt)
-
-    # Filtro por data de fim
-    if data_fim:
-        data_fim_dt = datetime.strptime(data_fim, "%Y-%m-%d")
-        statement = statement.where(Voo.hr_partida <= data_fim_dt)
-
-    # Filtro por companhia aérea
-    if companhia_nome:
-        statement = statement.join(Cia).where(Cia.nome.ilike(f"%{companhia_nome}%"))
-
-    # Busca por texto parcial nos campos 'origem' ou 'destino'
-    if busca_texto:
-        statement = statement.where(
-            or_(
-                Voo.origem.ilike(f"%{busca_texto}%"),
-                Voo.destino.ilike(f"%{busca_texto}%")
-            )
-        )
+    data_inicio_dt = datetime.strptime(data_inicio, "%Y-%m-%d") if data_inicio else None
+    data_fim_dt = datetime.strptime(data_fim, "%Y-%m-%d") if data_fim else None
+
+    # Filtros aplicados a cada partição consultada (services.particoes)
+    def consultar(tabela):
+        statement = select(*tabela.columns)
+
+        # Filtro por ID do voo
+        if id:
+            statement = statement.where(tabela.c.id == id)
+
+        # Filtro por data de início
+        if data_inicio_dt:
+            statement = statement.where(tabela.c.hr_partida >= data_inicio_dt)
+
+        # Filtro por data de fim
+        if data_fim_dt:
+            statement = statement.where(tabela.c.hr_partida <= data_fim_dt)
 
-    # Ordenação
-    if ordenacao:
-        if ordenacao == "hr_partida":
-            statement = statement.order_by(Voo.hr_partida)
-        elif ordenacao == "hr_chegada":
-            statement = statement.order_by(Voo.hr_chegada)
-    
-    # Execução da consulta e retorno dos voos
-    voos = session.exec(statement).all()
-    return voos
-
-@router.get("/contagem-por-companhia", response_model=dict)
+        # Filtro por companhia aérea
+        if companhia_nome:
+            statement = statement.join(Cia, tabela.c.cia_id == Cia.id).where(filtro_texto([Cia.nome], companhia_nome))
+
+        # Busca por texto parcial nos campos 'origem' ou 'destino' (índice de busca, services.busca)
+        if busca_texto:
+            statement = statement.where(filtro_texto([tabela.c.origem, tabela.c.destino], busca_texto))
+        return statement
+
+    # Apenas a partição quente e as de arquivo que se sobrepõem ao período pedido
+    statement, colunas_voo = consultar_particoes(consultar, data_inicio_dt, data_fim_dt)
+
+    # Ordenação (o id desempata e torna a chave de paginação única)
+    chaves = [colunas_voo.id]
+    if ordenacao == "hr_partida":
+        chaves = [colunas_voo.hr_partida, colunas_voo.id]
+    elif ordenacao == "hr_chegada":
+        chaves = [colunas_voo.hr_chegada, colunas_voo.id]
+
+    # Execução da consulta paginada e retorno dos voos (colunas codificadas direto, sem o ORM)
+    voos = paginar(session, statement, chaves, paginacao, response)
+    # Status ainda na fila de escrita diferida prevalecem sobre os gravados
+    return resposta_json(fila_status.sobrepor(como_dicts(voos)), response)
+
+# Servida pelos contadores materializados (services.contadores)
+@router.get("/contagem-por-companhia", response_model=dict, dependencies=[Depends(condicional("voo", "cia"))])
 def contar_voos_por_companhia(session: Session = Depends(get_session)):
-    statement = select(Cia.nome, func.count(Voo.id).label("total_voos")).join(Voo).group_by(Cia.nome)
-    resultados = session.exec(statement).all()
-    return {result[0]: result[1] for result in resultados}
-
-@router.get("/voos-completo", response_model=list[dict])
-def voos_completo(session: Session = Depends(get_session)):
-    statement = (
-        select(Voo)
-        .select_from(Voo)
-        .join(Cia, Voo.cia_id == Cia.id)  # Join explícito entre Voo e Cia
-        .join(Aeronave, Voo.aeronave_id == Aeronave.id)  # Join explícito entre Voo e Aeronave
+    return contadores.voos_por_companhia(session)
+
+# Menor chegada de `origem` a `destino` com conexões (grafo de voos em memória, services.conexoes)
+@router.get("/conexoes", response_model=dict, response_class=RespostaJSON, dependencies=[Depends(condicional("voo", relogio="partida_apos"))])
+def buscar_conexoes(
+    origem: str = Query(..., description="Aeroporto de origem, como gravado nos voos"),
+    destino: str = Query(..., description="Aeroporto de destino, como gravado nos voos"),
+    partida_apos: datetime = Query(None, description="Partida a partir de (padrão: agora)"),
+    conexao_minima: float = Query(CONEXOES_TEMPO_MINIMO, ge=0, description="Minutos mínimos entre dois voos"),
+    horizonte: float = Query(CONEXOES_HORIZONTE, gt=0, le=24 * 30, description="Horas de busca após a partida"),
+    response: Response = None,
+    session: Session = Depends(get_session),
+):
+    partida_apos = partida_apos or datetime.now()
+    viagem = rede.buscar(
+        session, origem, destino, partida_apos, timedelta(minutes=conexao_minima), timedelta(hours=horizonte),
     )
-    resultados = session.exec(statement).all()
-    
-    # Formatação do retorno para incluir todos os dados de Cia e Aeronave
-    voos_completos = []
-    for voo in resultados:
-        voos_completos.append({
-            "id": voo.id,
-            "numero_voo": voo.numero_voo,
-            "origem": voo.origem,
-            "destino": voo.destino,
-            "hr_partida": voo.hr_partida,
-            "hr_chegada": voo.hr_chegada,
-            "status": voo.status,
-            "cia": {
-                "id": voo.cia.id,
-                "nome": voo.cia.nome,
-                "cod_iata": voo.cia.cod_iata,
-                "aeronaves": [
-                    {"id": aeronave.id, "modelo": aeronave.modelo, "capacidade": aeronave.capacidade}
-                    for aeronave in voo.cia.aeronaves
-                ]
-            },
-            "aeronave": {
-                "id": voo.aeronave.id,
-                "modelo": voo.aeronave.modelo,
-                "capacidade": voo.aeronave.capacidade,
-                "last_check": voo.aeronave.last_check,
-                "next_check": voo.aeronave.next_check,
-                "cia": {
-                    "id": voo.aeronave.cia.id,
-                    "nome": voo.aeronave.cia.nome,
-                    "cod_iata": voo.aeronave.cia.cod_iata
+    if viagem is None:
+        raise HTTPException(status_code=404, detail="Nenhuma viagem encontrada no horizonte de busca")
+
+    # Detalhes dos voos da viagem, na ordem dos trechos
+    voos = {linha.id: dict(linha._mapping) for linha in session.exec(select(*colunas(Voo)).where(Voo.id.in_(viagem)))}
+    trechos = [voos[voo_id] for voo_id in viagem]
+    return resposta_json({
+        "origem": trechos[0]["origem"],
+        "destino": trechos[-1]["destino"],
+        "partida": trechos[0]["hr_partida"],
+        "chegada": trechos[-1]["hr_chegada"],
+        "duracao_minutos": round((trechos[-1]["hr_chegada"] - trechos[0]["hr_partida"]).total_seconds() / 60),
+        "conexoes": len(trechos) - 1,
+        "voos": trechos,
+    }, response)
+
+# Feed de alterações em tempo real (services.feed), em vez de consultar GET /voos repetidamente.
+# Server-Sent Events: um evento por alteração ("insert", "update" ou "delete"), com o voo completo,
+# os valores anteriores e os campos alterados; "perdidos" avisa que a conexão ficou para trás.
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_voos(
+    cia_id: int = Query(None, description="Apenas voos desta companhia"),
+    origem: str = Query(None, description="Apenas voos com esta origem"),
+    destino: str = Query(None, description="Apenas voos com este destino"),
+):
+    return StreamingResponse(
+        _gerar_eventos(Assinante(cia_id, origem, destino)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},  # Sem buffer em proxies (nginx)
+    )
+
+async def _gerar_eventos(assinante: Assinante):
+    feed.inscrever(assinante)
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            evento = await assinante.proximo(FEED_HEARTBEAT)
+            if evento is None:
+                yield ": keep-alive\n\n"  # Comentário SSE: mantém a conexão aberta em proxies
+            elif evento.get("tipo") == "perdidos":
+                yield f"event: perdidos\ndata: {codificar(evento)}\n\n"
+            else:
+                yield f"id: {evento['seq']}\nevent: {evento['operacao']}\ndata: {codificar(evento)}\n\n"
+    finally:
+        # Executado também quando o cliente desconecta (o gerador é cancelado)
+        feed.cancelar(assinante)
+
+# Mesmo feed por WebSocket: uma mensagem JSON por evento
+@router.websocket("/stream")
+async def stream_voos_websocket(
+    websocket: WebSocket,
+    cia_id: int = Query(None),
+    origem: str = Query(None),
+    destino: str = Query(None),
+):
+    await websocket.accept()
+    assinante = Assinante(cia_id, origem, destino)
+    feed.inscrever(assinante)
+    desconexao = asyncio.create_task(_aguardar_desconexao(websocket))
+    try:
+        while True:
+            proximo = asyncio.create_task(assinante.proximo(FEED_HEARTBEAT))
+            await asyncio.wait({proximo, desconexao}, return_when=asyncio.FIRST_COMPLETED)
+            if not proximo.done():
+                proximo.cancel()
+                break
+            evento = proximo.result()
+            if evento is not None:  # O keep-alive do WebSocket é feito pelo servidor (ping)
+                await websocket.send_text(codificar(evento))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        desconexao.cancel()
+        feed.cancelar(assinante)
+
+# Mensagens enviadas pelo cliente são ignoradas; a leitura serve para perceber a desconexão
+async def _aguardar_desconexao(websocket: WebSocket) -> None:
+    while (await websocket.receive())["type"] != "websocket.disconnect":
+        pass
+
+@router.get("/voos-completo", response_class=StreamingResponse)
+def voos_completo(
+    formato: str = Query("json", description="Formato da resposta: 'json' (lista) ou 'ndjson' (um voo por linha)"),
+    cabecalhos: dict = Depends(condicional("voo", "aeronave", "cia")),
+):
+    if formato not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="Formato inválido: use 'json' ou 'ndjson'")
+
+    media_type = "application/x-ndjson" if formato == "ndjson" else "application/json"
+    # Respostas em streaming não recebem os cabeçalhos da dependência: repassados aqui
+    return StreamingResponse(_gerar_voos_completos(formato), media_type=media_type, headers=cabecalhos)
+
+# Tamanho dos lotes lidos do cursor do banco durante o streaming
+LOTE_STREAMING = 1000
+
+def _gerar_voos_completos(formato: str):
+    # A sessão é aberta dentro do gerador porque o corpo da resposta é enviado
+    # depois que o endpoint retorna (e depois do encerramento das dependências)
+    with Session(engine_leitura()) as session:
+        # 1ª consulta: aeronaves agrupadas por companhia (tabela pequena, cabe em memória)
+        aeronaves_por_cia = {}
+        for aeronave in session.exec(
+            select(Aeronave.id, Aeronave.modelo, Aeronave.capacidade, Aeronave.cia_id)
+        ):
+            aeronaves_por_cia.setdefault(aeronave.cia_id, []).append(
+                {"id": aeronave.id, "modelo": aeronave.modelo, "capacidade": aeronave.capacidade}
+            )
+
+        # 2ª consulta (uma por partição de voos): projeção plana de voo + cia + aeronave +
+        # cia da aeronave, lida em lotes por um cursor do lado do servidor
+        CiaAeronave = aliased(Cia)
+        consultas = (
+            select(
+                voo.c.id, voo.c.numero_voo, voo.c.origem, voo.c.destino,
+                voo.c.hr_partida, voo.c.hr_chegada, voo.c.status,
+                Cia.id.label("cia_id"), Cia.nome.label("cia_nome"), Cia.cod_iata.label("cia_cod_iata"),
+                Aeronave.id.label("aeronave_id"), Aeronave.modelo, Aeronave.capacidade,
+                Aeronave.last_check, Aeronave.next_check,
+                CiaAeronave.id.label("aeronave_cia_id"),
+                CiaAeronave.nome.label("aeronave_cia_nome"),
+                CiaAeronave.cod_iata.label("aeronave_cia_cod_iata"),
+            )
+            .select_from(voo)
+            .join(Cia, voo.c.cia_id == Cia.id)  # Join explícito entre Voo e Cia
+            .join(Aeronave, voo.c.aeronave_id == Aeronave.id)  # Join explícito entre Voo e Aeronave
+            .join(CiaAeronave, Aeronave.cia_id == CiaAeronave.id)  # Cia dona da aeronave
+            .execution_options(yield_per=LOTE_STREAMING)
+            for voo in tabelas_voo()
+        )
+        blocos = (linhas for statement in consultas for linhas in session.exec(statement).partitions())
+
+        if formato == "json":
+            yield "["
+        separador = ""
+        for linhas in blocos:
+            pedaco = []
+            for linha in linhas:
+                voo_completo = {
+                    "id": linha.id,
+                    "numero_voo": linha.numero_voo,
+                    "origem": linha.origem,
+                    "destino": linha.destino,
+                    "hr_partida": linha.hr_partida,
+                    "hr_chegada": linha.hr_chegada,
+                    "status": linha.status,
+                    "cia": {
+                        "id": linha.cia_id,
+                        "nome": linha.cia_nome,
+                        "cod_iata": linha.cia_cod_iata,
+                        "aeronaves": aeronaves_por_cia.get(linha.cia_id, []),
+                    },
+                    "aeronave": {
+                        "id": linha.aeronave_id,
+                        "modelo": linha.modelo,
+                        "capacidade": linha.capacidade,
+                        "last_check": linha.last_check,
+                        "next_check": linha.next_check,
+                        "cia": {
+                            "id": linha.aeronave_cia_id,
+                            "nome": linha.aeronave_cia_nome,
+                            "cod_iata": linha.aeronave_cia_cod_iata,
+                        },
+                    },
                 }
-            }
-        })
-    
-    return voos_completos
+                if formato == "json":
+                    pedaco.append(separador + _json(voo_completo))
+                    separador = ","
+                else:
+                    pedaco.append(_json(voo_completo) + "\n")
+            yield "".join(pedaco)
+        if formato == "json":
+            yield "]"
+
+def _json(valor) -> str:
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":"), default=_serializar_datetime)
 
+def _serializar_datetime(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
@@ -0,0 +1,74 @@
+# Notificação das alterações confirmadas (após o commit) nas tabelas do sistema.
+#
+# Alterações feitas pela sessão do ORM (add/delete/alteração de atributos) são coletadas
+# automaticamente no flush e entregues aos ouvintes somente depois do commit; um rollback as
+# descarta. Escritas feitas com instruções em lote (INSERT/UPDATE/DELETE diretos) chamam
+# publicar() após o commit. Caches, contadores e demais estruturas derivadas se registram
+# com @ouvinte e são atualizados por aqui, qualquer que seja o caminho de escrita.
+from dataclasses import dataclass
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+import logging
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Alteracao:
+    tabela: str  # "voo", "aeronave" ou "cia"
+    operacao: str  # "insert", "update", "delete" ou "arquivamento" (voo movido para services.particoes)
+    antes: dict | None  # Valores anteriores (None em inserções)
+    depois: dict | None  # Valores novos (None em exclusões)
+
+    @property
+    def id(self) -> int | None:
+        return (self.depois or self.antes or {}).get("id")
+
+_ouvintes = []
+
+def ouvinte(funcao):
+    _ouvintes.append(funcao)
+    return funcao
+
+def publicar(alteracoes: list[Alteracao]) -> None:
+    if not alteracoes:
+        return
+    for funcao in _ouvintes:
+        try:
+            funcao(alteracoes)
+        except Exception:
+            # Uma estrutura derivada com problema não pode desfazer uma escrita já confirmada
+            logger.exception("Falha no ouvinte de alterações %s", funcao.__qualname__)
+
+def _valores(objeto) -> dict:
+    # Apenas atributos já carregados, para não disparar consultas durante o flush
+    estado = inspect(objeto)
+    return {
+        atributo.key: estado.dict[atributo.key]
+        for atributo in estado.mapper.column_attrs if atributo.key in estado.dict
+    }
+
+@event.listens_for(Session, "after_flush")
+def _coletar(session, contexto_flush) -> None:
+    alteracoes = session.info.setdefault("alteracoes", [])
+    for objeto in session.new:
+        alteracoes.append(Alteracao(objeto.__tablename__, "insert", None, _valores(objeto)))
+    for objeto in session.dirty:
+        if not session.is_modified(objeto, include_collections=False):
+            continue
+        estado = inspect(objeto)
+        antes = _valores(objeto)
+        for atributo in estado.mapper.column_attrs:
+            historico = estado.attrs[atributo.key].history
+            if historico.deleted:
+                antes[atributo.key] = historico.deleted[0]
+        alteracoes.append(Alteracao(objeto.__tablename__, "update", antes, _valores(objeto)))
+    for objeto in session.deleted:
+        alteracoes.append(Alteracao(objeto.__tablename__, "delete", _valores(objeto), None))
+
+@event.listens_for(Session, "after_commit")
+def _entregar(session) -> None:
+    publicar(session.info.pop("alteracoes", []))
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session) -> None:
+    session.info.pop("alteracoes", None)
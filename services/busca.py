@@ -0,0 +1,215 @@
+# Busca textual indexada em voos (origem/destino), companhias (nome) e aeronaves (modelo).
+#
+# SQLite: tabelas FTS5 com tokenizador trigram (substring sem diferenciar maiúsculas), mantidas
+# em sincronia com as tabelas de origem por triggers, qualquer que seja o caminho de escrita.
+# Postgres: extensão pg_trgm com índices GIN nas mesmas colunas (ILIKE e word_similarity usam o
+# índice). Sem nenhum dos dois (ex.: SQLite sem FTS5), os filtros voltam ao ILIKE '%termo%'.
+#
+# A busca ranqueada (buscar) combina correspondência exata por substring, com prioridade para
+# prefixos, e tolerância a erros de digitação por similaridade de trigramas, como o pg_trgm.
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, case, func, literal, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from models.aeronave import Aeronave
+from models.cia import Cia
+from models.voo import Voo
+import logging
+import os
+import re
+import sqlite3
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+BUSCA_SIMILARIDADE = float(os.getenv("BUSCA_SIMILARIDADE", "0.5"))  # Fração mínima de trigramas em comum
+BUSCA_CANDIDATOS = 200  # Candidatos avaliados na etapa tolerante a erros
+
+# Colunas indexadas de cada tabela
+INDICES = {
+    "voo": (Voo, ("origem", "destino")),
+    "cia": (Cia, ("nome",)),
+    "aeronave": (Aeronave, ("modelo",)),
+}
+
+# Tabelas FTS5 (fora do metadata do SQLModel: criadas por criar_indices_busca)
+_metadata = MetaData()
+_fts = {
+    tabela: Table(
+        f"busca_{tabela}", _metadata,
+        Column("rowid", Integer), Column("rank", Float), Column(f"busca_{tabela}", String),
+        *(Column(coluna, String) for coluna in colunas),
+    )
+    for tabela, (_, colunas) in INDICES.items()
+}
+
+_backend = None  # "fts5", "pg_trgm" ou "" (sem índice), detectado no primeiro uso
+
+def _sql_fts5(tabela: str, colunas: tuple[str, ...]) -> list[str]:
+    fts = f"busca_{tabela}"
+    lista = ", ".join(colunas)
+    novos = ", ".join(f"new.{coluna}" for coluna in colunas)
+    antigos = ", ".join(f"old.{coluna}" for coluna in colunas)
+    remover = f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos});"
+    inserir = f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos});"
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({lista}, content='{tabela}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabela} BEGIN {inserir} END",
+        f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabela} BEGIN {remover} END",
+        f"CREATE TRIGGER {fts}_au AFTER UPDATE OF {lista} ON {tabela} BEGIN {remover} {inserir} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+def criar_indices_busca(engine: Engine) -> list[str]:
+    global _backend
+    criados = []
+    if engine.dialect.name == "sqlite":
+        if sqlite3.sqlite_version_info < (3, 34, 0):
+            logger.warning("SQLite %s sem tokenizador trigram: busca sem índice", sqlite3.sqlite_version)
+            return criados
+        with engine.begin() as conexao:
+            existentes = set(conexao.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'").scalars())
+            for tabela, (_, colunas) in INDICES.items():
+                if f"busca_{tabela}" in existentes:
+                    continue
+                try:
+                    for sql in _sql_fts5(tabela, colunas):
+                        conexao.exec_driver_sql(sql)
+                except OperationalError as erro:  # SQLite compilado sem FTS5
+                    logger.warning("Índice de busca indisponível: %s", erro)
+                    return criados
+                criados.append(f"busca_{tabela}")
+    elif engine.dialect.name == "postgresql":
+        try:
+            with engine.begin() as conexao:
+                conexao.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+                for tabela, (_, colunas) in INDICES.items():
+                    for coluna in colunas:
+                        conexao.exec_driver_sql(
+                            f"CREATE INDEX IF NOT EXISTS ix_{tabela}_{coluna}_trgm ON {tabela} USING gin ({coluna} gin_trgm_ops)"
+                        )
+                        criados.append(f"ix_{tabela}_{coluna}_trgm")
+        except (OperationalError, ProgrammingError) as erro:  # Sem permissão para criar a extensão
+            logger.warning("Índice de busca indisponível: %s", erro)
+            return []
+    for nome in criados:
+        logger.info("Índice de busca criado: %s", nome)
+    _backend = None  # Detecta de novo no próximo uso
+    return criados
+
+def backend() -> str:
+    global _backend
+    if _backend is None:
+        from database import engine  # Import tardio: database importa as migrações, que importam este módulo
+        with engine.connect() as conexao:
+            if engine.dialect.name == "sqlite":
+                encontrado = conexao.exec_driver_sql(
+                    "SELECT count(*) FROM sqlite_master WHERE name IN ('busca_voo', 'busca_cia', 'busca_aeronave')"
+                ).scalar() == len(INDICES)
+                _backend = "fts5" if encontrado else ""
+            elif engine.dialect.name == "postgresql":
+                encontrado = conexao.exec_driver_sql("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'").first()
+                _backend = "pg_trgm" if encontrado else ""
+            else:
+                _backend = ""
+    return _backend
+
+def _frase(termo: str) -> str:
+    return '"' + termo.replace('"', '""') + '"'
+
+def _consulta_fts(colunas, expressao: str) -> str:
+    return f"{{{' '.join(colunas)}}} : ({expressao})"
+
+# Trigramas no estilo do pg_trgm: por palavra, sem acentos, com espaços nas bordas ("  b", " bo", ...)
+def trigramas(texto: str) -> set[str]:
+    sem_acentos = "".join(
+        caractere for caractere in unicodedata.normalize("NFKD", texto.lower()) if not unicodedata.combining(caractere)
+    )
+    resultado = set()
+    for palavra in re.findall(r"\w+", sem_acentos):
+        palavra = f"  {palavra} "
+        resultado.update(palavra[i:i + 3] for i in range(len(palavra) - 2))
+    return resultado
+
+# Fração dos trigramas do termo presentes no texto, sem diferenciar acentos e maiúsculas
+def similaridade(termo: str, texto: str | None) -> float:
+    do_termo = trigramas(termo)
+    if not do_termo or not texto:
+        return 0.0
+    return len(do_termo & trigramas(texto)) / len(do_termo)
+
+# Filtro "alguma das colunas contém o termo", equivalente a ILIKE '%termo%' nas colunas.
+# Com FTS5 vira uma consulta ao índice trigram; termos com menos de 3 caracteres não formam
+# trigramas e continuam no ILIKE (no Postgres o próprio ILIKE usa o índice GIN).
+def filtro_texto(colunas: list, termo: str):
+    tabela = colunas[0].table  # Atributo do modelo ou coluna de Table (ex.: partições de arquivo)
+    if backend() == "fts5" and len(termo) >= 3 and tabela.name in _fts:
+        fts = _fts[tabela.name]
+        consulta = _consulta_fts([coluna.key for coluna in colunas], _frase(termo))
+        return tabela.c.id.in_(select(fts.c.rowid).where(fts.c[fts.name].match(consulta)))
+    return or_(*(coluna.ilike(f"%{termo}%") for coluna in colunas))
+
+# Busca ranqueada em uma tabela: lista de (linha, score), score em [0, 2]
+# (1 + bônus de prefixo para correspondências exatas; similaridade de trigramas para as demais)
+def buscar(session, tabela: str, termo: str, limite: int) -> list[tuple[dict, float]]:
+    modelo, nomes = INDICES[tabela]
+    colunas = [getattr(modelo, nome) for nome in nomes]
+    termo = termo.strip()
+    if not termo:
+        return []
+    if backend() == "pg_trgm":
+        return _buscar_pg_trgm(session, modelo, colunas, termo, limite)
+
+    # 1ª etapa: o termo aparece inteiro em alguma coluna; prefixos primeiro
+    prefixo = or_(*(coluna.ilike(f"{termo}%") for coluna in colunas))
+    statement = (
+        select(*modelo.__table__.columns, case((prefixo, 1), else_=0).label("prefixo"))
+        .where(filtro_texto(colunas, termo))
+        .order_by(text("prefixo DESC"), *colunas, modelo.id)
+        .limit(limite)
+    )
+    resultados = [
+        ({chave: valor for chave, valor in linha._mapping.items() if chave != "prefixo"}, 1.0 + linha.prefixo)
+        for linha in session.exec(statement)
+    ]
+
+    # 2ª etapa (tolerante a erros): candidatos com algum trigrama do termo, ranqueados pela
+    # fração de trigramas em comum
+    if len(resultados) < limite and backend() == "fts5" and len(termo) >= 3:
+        fts = _fts[tabela]
+        termo_minusculo = termo.lower()
+        do_termo = sorted({termo_minusculo[i:i + 3] for i in range(len(termo_minusculo) - 2)})
+        consulta = _consulta_fts(nomes, " OR ".join(_frase(trigrama) for trigrama in do_termo))
+        encontrados = {linha["id"] for linha, _ in resultados}
+        candidatos = session.exec(
+            select(*modelo.__table__.columns)
+            .join(fts, fts.c.rowid == modelo.id)
+            .where(fts.c[fts.name].match(consulta))
+            .order_by(fts.c.rank)
+            .limit(BUSCA_CANDIDATOS)
+        )
+        aproximados = []
+        for linha in candidatos:
+            if linha.id in encontrados:
+                continue
+            score = max(similaridade(termo, getattr(linha, nome)) for nome in nomes)
+            if score >= BUSCA_SIMILARIDADE:
+                aproximados.append((dict(linha._mapping), round(score, 4)))
+        aproximados.sort(key=lambda item: -item[1])
+        resultados += aproximados[:limite - len(resultados)]
+    return resultados
+
+def _buscar_pg_trgm(session, modelo, colunas, termo: str, limite: int) -> list[tuple[dict, float]]:
+    # word_similarity compara o termo com o trecho mais parecido de cada coluna; o operador <%
+    # (limiar pg_trgm.word_similarity_threshold) e o ILIKE usam os índices GIN
+    score = func.greatest(*(func.word_similarity(termo, coluna) for coluna in colunas))
+    prefixo = or_(*(coluna.ilike(f"{termo}%") for coluna in colunas))
+    statement = (
+        select(*modelo.__table__.columns, (score + case((prefixo, 1), else_=0)).label("score"))
+        .where(or_(*(coluna.ilike(f"%{termo}%") for coluna in colunas), *(literal(termo).op("<%")(coluna) for coluna in colunas)))
+        .order_by(text("score DESC"), modelo.id)
+        .limit(limite)
+    )
+    return [
+        ({chave: valor for chave, valor in linha._mapping.items() if chave != "score"}, round(float(linha.score), 4))
+        for linha in session.exec(statement)
+    ]
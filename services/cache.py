@@ -0,0 +1,215 @@
+# Cache de leitura (read-through) para as consultas de companhias e aeronaves.
+#
+# Backends: "memoria" (LRU com TTL e limite de itens, por processo), "redis" (servidor
+# compatível com Redis, compartilhado entre workers) ou "desativado". As entradas são
+# invalidadas com precisão pelas alterações confirmadas (services.alteracoes), inclusive
+# as feitas pelos endpoints em lote e pela importação.
+#
+# O cache em memória só vê as invalidações do próprio processo: com vários workers ele é
+# ignorado (use o Redis). Com réplicas de leitura, um valor lido de uma réplica atrasada
+# seria gravado depois da invalidação; nesse caso nenhum backend é usado.
+from collections import OrderedDict
+from database import DATABASE_URL_REPLICAS, varios_processos
+from services.alteracoes import ouvinte
+from threading import Lock
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memoria")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "300"))  # Segundos
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", "10000"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+class Estatisticas:
+    def __init__(self):
+        self._lock = Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.despejos = 0  # Removidos por limite de tamanho (LRU)
+        self.expirados = 0  # Removidos por TTL
+        self.invalidacoes = 0  # Removidos por escrita
+
+    def incrementar(self, contador: str, quantidade: int = 1) -> None:
+        with self._lock:
+            setattr(self, contador, getattr(self, contador) + quantidade)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0,
+                "despejos": self.despejos,
+                "expirados": self.expirados,
+                "invalidacoes": self.invalidacoes,
+            }
+
+class CacheMemoria:
+    def __init__(self, max_itens: int = CACHE_MAX_ITENS, ttl: float = CACHE_TTL):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.estatisticas = Estatisticas()
+        self._itens = OrderedDict()  # chave -> (expira_em, valor), do menos ao mais recente
+        self._lock = Lock()
+        # Incrementada a cada invalidação: um valor calculado antes de uma escrita não é gravado
+        self.geracao = 0
+
+    def obter(self, chave: str):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is not None and item[0] < time.monotonic():
+                del self._itens[chave]
+                self.estatisticas.incrementar("expirados")
+                item = None
+            if item is None:
+                self.estatisticas.incrementar("falhas")
+                return None
+            self._itens.move_to_end(chave)
+            self.estatisticas.incrementar("acertos")
+            return item[1]
+
+    def definir(self, chave: str, valor, geracao: int | None = None) -> None:
+        with self._lock:
+            if geracao is not None and geracao != self.geracao:
+                return
+            self._itens[chave] = (time.monotonic() + self.ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+                self.estatisticas.incrementar("despejos")
+
+    def remover(self, chaves: list[str], prefixos: list[str] = ()) -> None:
+        with self._lock:
+            self.geracao += 1
+            removidas = [chave for chave in chaves if chave in self._itens]
+            if prefixos:
+                removidas += [chave for chave in self._itens if chave.startswith(tuple(prefixos))]
+            for chave in set(removidas):
+                del self._itens[chave]
+            self.estatisticas.incrementar("invalidacoes", len(set(removidas)))
+
+    def resumo(self) -> dict:
+        with self._lock:
+            itens = len(self._itens)
+        return {"backend": "memoria", "itens": itens, "max_itens": self.max_itens, "ttl": self.ttl,
+                **self.estatisticas.resumo()}
+
+class CacheRedis:
+    def __init__(self, url: str = CACHE_REDIS_URL, ttl: float = CACHE_TTL):
+        # Importado aqui: o backend Redis depende do extra opcional "redis"
+        import redis
+
+        self.cliente = redis.Redis.from_url(url)
+        self.erro_redis = redis.RedisError
+        self.ttl = ttl
+        self.estatisticas = Estatisticas()
+        self.geracao = None  # Sem controle de geração: o TTL limita a janela de valores antigos
+
+    # Com o Redis indisponível as leituras vão direto ao banco, em vez de falhar
+    def obter(self, chave: str):
+        try:
+            valor = self.cliente.get(f"voos:{chave}")
+        except self.erro_redis as erro:
+            logger.warning("Falha ao ler do cache Redis: %s", erro)
+            valor = None
+        self.estatisticas.incrementar("acertos" if valor is not None else "falhas")
+        return json.loads(valor) if valor is not None else None
+
+    def definir(self, chave: str, valor, geracao: int | None = None) -> None:
+        try:
+            self.cliente.set(f"voos:{chave}", json.dumps(valor), px=int(self.ttl * 1000))
+        except self.erro_redis as erro:
+            logger.warning("Falha ao gravar no cache Redis: %s", erro)
+
+    def remover(self, chaves: list[str], prefixos: list[str] = ()) -> None:
+        try:
+            removidas = [f"voos:{chave}" for chave in chaves]
+            for prefixo in prefixos:
+                removidas += list(self.cliente.scan_iter(match=f"voos:{prefixo}*"))
+            if removidas:
+                self.estatisticas.incrementar("invalidacoes", self.cliente.delete(*removidas))
+        except self.erro_redis as erro:
+            logger.error("Falha ao invalidar o cache Redis (entradas expiram pelo TTL): %s", erro)
+
+    def resumo(self) -> dict:
+        # Despejos e expirações acontecem no servidor; vêm das estatísticas do Redis
+        info = self.cliente.info("stats")
+        return {"backend": "redis", "itens": self.cliente.dbsize(), "ttl": self.ttl,
+                **self.estatisticas.resumo(),
+                "despejos": info.get("evicted_keys", 0), "expirados": info.get("expired_keys", 0)}
+
+class CacheDesativado:
+    geracao = None
+
+    def obter(self, chave: str):
+        return None
+
+    def definir(self, chave: str, valor, geracao: int | None = None) -> None:
+        pass
+
+    def remover(self, chaves: list[str], prefixos: list[str] = ()) -> None:
+        pass
+
+    def resumo(self) -> dict:
+        return {"backend": "desativado"}
+
+def _criar_cache():
+    if CACHE_BACKEND == "memoria":
+        return CacheMemoria()
+    if CACHE_BACKEND == "redis":
+        return CacheRedis()
+    if CACHE_BACKEND == "desativado":
+        return CacheDesativado()
+    raise ValueError(f"CACHE_BACKEND desconhecido: {CACHE_BACKEND!r} (use 'memoria', 'redis' ou 'desativado')")
+
+cache = _criar_cache()
+
+def ativo() -> bool:
+    if DATABASE_URL_REPLICAS:
+        return False
+    return not (CACHE_BACKEND == "memoria" and varios_processos())
+
+# Read-through: devolve o valor em cache ou calcula, grava e devolve.
+# Valores None e exceções de calcular() (ex.: 404) não são gravados.
+def lembrar(chave: str, calcular):
+    if not ativo():
+        return calcular()
+    valor = cache.obter(chave)
+    if valor is not None:
+        return valor
+    geracao = cache.geracao
+    valor = calcular()
+    if valor is not None:
+        cache.definir(chave, valor, geracao)
+    return valor
+
+# Chaves afetadas por cada alteração confirmada
+@ouvinte
+def _invalidar(alteracoes) -> None:
+    chaves, prefixos = [], set()
+    for alteracao in alteracoes:
+        if alteracao.tabela == "cia":
+            chaves.append(f"cia:{alteracao.id}")
+            for valores in (alteracao.antes, alteracao.depois):
+                if valores and "cod_iata" in valores:
+                    chaves.append(f"cia:iata:{valores['cod_iata']}")
+            if alteracao.antes is not None and "cod_iata" not in alteracao.antes:
+                # Atualização parcial (PATCH) não lê o código anterior: invalida todos
+                prefixos.add("cia:iata:")
+            prefixos.add("cia:listar:")
+        elif alteracao.tabela == "aeronave":
+            chaves.append(f"aeronave:{alteracao.id}")
+    if chaves or prefixos:
+        cache.remover(chaves, sorted(prefixos))
+
+def estatisticas() -> dict:
+    try:
+        return {**cache.resumo(), "ativo": ativo()}
+    except Exception as erro:
+        logger.warning("Não foi possível obter as estatísticas do cache: %s", erro)
+        return {"backend": CACHE_BACKEND, "erro": str(erro)}
@@ -0,0 +1,104 @@
+# Controle de concorrência otimista e atualização parcial (PATCH) de voos, aeronaves e cias.
+#
+# Cada linha tem uma coluna `versao`, incrementada no próprio UPDATE a cada alteração, qualquer
+# que seja o caminho de escrita: sessão do ORM (PUT), endpoints /bulk e PATCH. O PATCH grava só os
+# campos enviados com um único UPDATE ... RETURNING, sem ler a linha antes: quando o cliente
+# informa a versão que conhece, a condição `versao = :versao` faz parte do mesmo UPDATE, que não
+# altera nada se outra escrita chegou primeiro (409). Nenhum lock fica retido entre requisições.
+#
+# Como o estado anterior não é lido, a alteração publicada (services.alteracoes) traz em `antes`
+# apenas os campos que não mudaram; as estruturas derivadas que dependem dos valores anteriores
+# dos campos alterados recarregam na próxima consulta, como nas escritas em lote.
+from contextlib import nullcontext
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict, Field, create_model
+from sqlalchemy import event, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
+from services.alteracoes import Alteracao, publicar
+import functools
+
+COLUNA_VERSAO = "versao"
+
+# Escritas pela sessão do ORM: o UPDATE gerado no flush incrementa a versão no banco
+# (versao = versao + 1), então duas escritas simultâneas não gravam a mesma versão
+@event.listens_for(Session, "before_flush")
+def _incrementar_versoes(session, contexto_flush, instancias) -> None:
+    for objeto in session.dirty:
+        modelo = type(objeto)
+        tabela = getattr(modelo, "__table__", None)
+        if tabela is not None and COLUNA_VERSAO in tabela.c and session.is_modified(objeto, include_collections=False):
+            setattr(objeto, COLUNA_VERSAO, getattr(modelo, COLUNA_VERSAO) + 1)
+
+# Commit de uma alteração feita pelo ORM (PUT): se outra requisição excluiu a linha entre a leitura
+# e o UPDATE, nenhuma linha é alterada (StaleDataError) e a resposta é 404
+def confirmar(session: Session, nao_encontrado: str) -> None:
+    try:
+        session.commit()
+    except StaleDataError:
+        session.rollback()
+        raise HTTPException(status_code=404, detail=nao_encontrado)
+
+# Corpo do PATCH: os campos da tabela, todos opcionais (só os enviados são gravados), e a versão
+# esperada. Campos desconhecidos são recusados (422) em vez de ignorados
+@functools.cache
+def modelo_parcial(modelo) -> type[BaseModel]:
+    campos = {
+        nome: (campo.annotation | None, None)
+        for nome, campo in modelo.model_fields.items() if nome not in ("id", COLUNA_VERSAO)
+    }
+    campos[COLUNA_VERSAO] = (
+        int | None,
+        Field(None, description="Versão lida do registro: a alteração só é gravada se ela ainda for a atual (409 se não)"),
+    )
+    return create_model(f"{modelo.__name__}Parcial", __config__=ConfigDict(extra="forbid"), **campos)
+
+# `referencias`: {campo: modelo} das chaves estrangeiras verificadas quando alteradas (o SQLite não
+# as verifica por padrão). `reservar`, quando informado, é um gerenciador de contexto
+# reservar(session, id, campos) mantido até o commit (ex.: horários das aeronaves)
+def atualizar_parcial(
+    session: Session, modelo, id: int, dados: BaseModel, nao_encontrado: str,
+    referencias: dict | None = None, reservar=None,
+) -> dict:
+    tabela = modelo.__table__
+    campos = dados.model_dump(exclude_unset=True)
+    versao = campos.pop(COLUNA_VERSAO, None)
+    if not campos:
+        raise HTTPException(status_code=422, detail="Nenhum campo para alterar")
+    nulos = [campo for campo, valor in campos.items() if valor is None and not tabela.c[campo].nullable]
+    if nulos:
+        raise HTTPException(status_code=422, detail=f"Campos não podem ser nulos: {', '.join(nulos)}")
+    for campo, referencia in (referencias or {}).items():
+        if campo in campos and session.scalar(select(referencia.id).where(referencia.id == campos[campo])) is None:
+            raise HTTPException(status_code=422, detail=f"{campo}={campos[campo]} não encontrado")
+
+    condicao = tabela.c.id == id
+    if versao is not None:
+        condicao &= tabela.c[COLUNA_VERSAO] == versao
+    comando = (
+        update(tabela).where(condicao)
+        .values(**campos, **{COLUNA_VERSAO: tabela.c[COLUNA_VERSAO] + 1})
+        .returning(*tabela.c)
+    )
+
+    with reservar(session, id, campos) if reservar is not None else nullcontext():
+        try:
+            linha = session.execute(comando).first()
+            if linha is None:
+                # Só no caminho de erro: distingue registro inexistente de versão desatualizada
+                atual = session.scalar(select(tabela.c[COLUNA_VERSAO]).where(tabela.c.id == id))
+                session.rollback()
+                if atual is None:
+                    raise HTTPException(status_code=404, detail=nao_encontrado)
+                raise HTTPException(status_code=409, detail=f"Versão {versao} desatualizada: a versão atual é {atual}")
+            session.commit()
+        except IntegrityError as erro:
+            session.rollback()
+            raise HTTPException(status_code=409, detail=f"Restrição violada: {erro.orig}")
+
+    depois = dict(linha._mapping)
+    antes = {campo: valor for campo, valor in depois.items() if campo not in campos}
+    antes[COLUNA_VERSAO] = depois[COLUNA_VERSAO] - 1
+    publicar([Alteracao(tabela.name, "update", antes, depois)])
+    return depois
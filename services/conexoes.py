@@ -0,0 +1,191 @@
+# Busca de conexões entre aeroportos (rede de voos como grafo dependente do tempo).
+#
+# Cada voo não cancelado da partição quente é uma conexão origem -> destino com horário de partida
+# e de chegada. As conexões ficam em um array único ordenado por partida, e cada aeroporto aponta
+# para as suas partidas no mesmo array. A menor chegada de A a B partindo após T é calculada pelo
+# Connection Scan Algorithm: percorre as conexões em ordem de partida a partir de T, marcando o
+# horário mais cedo em que cada aeroporto é alcançado, até que as partidas passem da melhor chegada
+# ao destino (ou do horizonte da busca). O tempo mínimo de conexão vale entre dois voos seguidos.
+#
+# O grafo é carregado na primeira consulta e atualizado a cada alteração confirmada de voo
+# (services.alteracoes); uma recarga periódica incorpora escritas de outros processos.
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from services.alteracoes import ouvinte
+from services.disponibilidade import STATUS_LIVRE, horario_sem_fuso
+from sqlmodel import Session, select
+from threading import Lock
+from models.voo import Voo
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CONEXOES_TEMPO_MINIMO = float(os.getenv("CONEXOES_TEMPO_MINIMO", "45"))  # Minutos entre dois voos
+CONEXOES_HORIZONTE = float(os.getenv("CONEXOES_HORIZONTE", "48"))  # Horas após a partida pedida
+CONEXOES_RECARGA = float(os.getenv("CONEXOES_RECARGA", "300"))  # Segundos (0 desativa)
+
+def _aeroporto(nome: str) -> str:
+    return nome.strip().casefold()
+
+class RedeVoos:
+    def __init__(self):
+        self._lock = Lock()
+        self.carregado = False
+        # Conexões (partida, voo_id, chegada, origem, destino) ordenadas por partida e id
+        self.conexoes = []
+        self.por_voo = {}  # voo_id -> conexão
+        self.partidas = {}  # aeroporto -> [(partida, voo_id)] ordenadas: as partidas de cada aeroporto
+        self.nomes = {}  # aeroporto normalizado -> nome como gravado
+        self.recargas = 0
+
+    def _conexao(self, voo_id: int, origem: str, destino: str, partida, chegada) -> tuple | None:
+        partida, chegada = horario_sem_fuso(partida), horario_sem_fuso(chegada)
+        if partida is None or chegada is None or chegada < partida:
+            return None
+        return (partida, voo_id, chegada, _aeroporto(origem), _aeroporto(destino))
+
+    def _ler_banco(self, session: Session) -> dict:
+        colunas = (Voo.id, Voo.origem, Voo.destino, Voo.hr_partida, Voo.hr_chegada)
+        conexoes, nomes = [], {}
+        for linha in session.exec(select(*colunas).where(Voo.status != STATUS_LIVRE)):
+            conexao = self._conexao(*linha)
+            if conexao is not None:
+                conexoes.append(conexao)
+                nomes.setdefault(conexao[3], linha.origem)
+                nomes.setdefault(conexao[4], linha.destino)
+        conexoes.sort()
+        partidas = {}
+        for conexao in conexoes:
+            partidas.setdefault(conexao[3], []).append(conexao[:2])
+        return {
+            "conexoes": conexoes,
+            "por_voo": {conexao[1]: conexao for conexao in conexoes},
+            "partidas": partidas,
+            "nomes": nomes,
+        }
+
+    def _carregar(self, session: Session) -> None:
+        if self.carregado:
+            return
+        estado = self._ler_banco(session)
+        with self._lock:
+            if not self.carregado:
+                self.__dict__.update(estado)
+                self.carregado = True
+
+    def recarregar(self, session: Session) -> None:
+        estado = self._ler_banco(session)
+        with self._lock:
+            self.__dict__.update(estado)
+            self.carregado = True
+            self.recargas += 1
+
+    def aplicar(self, alteracoes) -> None:
+        with self._lock:
+            if not self.carregado:
+                return  # A carga inicial já lerá o estado atual do banco
+            for alteracao in alteracoes:
+                if alteracao.tabela != "voo":
+                    continue
+                anterior = self.por_voo.pop(alteracao.id, None)
+                if anterior is not None:
+                    del self.conexoes[bisect_left(self.conexoes, anterior)]
+                    partidas = self.partidas[anterior[3]]
+                    del partidas[bisect_left(partidas, anterior[:2])]
+                if alteracao.depois is None or alteracao.operacao == "arquivamento":
+                    continue
+                # Escritas em lote trazem em `depois` apenas as colunas alteradas
+                voo = {**(alteracao.antes or {}), **alteracao.depois}
+                if any(campo not in voo for campo in ("id", "origem", "destino", "hr_partida", "hr_chegada", "status")):
+                    self.carregado = False  # Sem os valores necessários: recarrega na próxima consulta
+                    return
+                if voo["status"] == STATUS_LIVRE:
+                    continue
+                conexao = self._conexao(voo["id"], voo["origem"], voo["destino"], voo["hr_partida"], voo["hr_chegada"])
+                if conexao is not None:
+                    insort(self.conexoes, conexao)
+                    insort(self.partidas.setdefault(conexao[3], []), conexao[:2])
+                    self.por_voo[conexao[1]] = conexao
+                    self.nomes.setdefault(conexao[3], voo["origem"])
+                    self.nomes.setdefault(conexao[4], voo["destino"])
+
+    # Menor chegada de `origem` a `destino` partindo a partir de `partida`; devolve os ids dos
+    # voos da viagem, em ordem, ou None se não há caminho dentro do horizonte
+    def buscar(self, session: Session, origem: str, destino: str, partida: datetime,
+               tempo_minimo: timedelta, horizonte: timedelta) -> list[int] | None:
+        self._carregar(session)
+        origem, destino, partida = _aeroporto(origem), _aeroporto(destino), horario_sem_fuso(partida)
+        limite = partida + horizonte
+        with self._lock:
+            if origem == destino or origem not in self.partidas:
+                return None
+            # A varredura começa na primeira partida da origem a partir do horário pedido
+            saidas = self.partidas[origem]
+            primeira = bisect_left(saidas, (partida,))
+            if primeira == len(saidas):
+                return None
+            conexoes = self.conexoes
+            inicio = bisect_left(conexoes, saidas[primeira])
+
+            # Horário a partir do qual se pode embarcar em cada aeroporto (chegada + tempo mínimo)
+            embarque = {origem: partida}
+            chegada_em = {}  # aeroporto -> melhor chegada
+            ultimo_voo = {}  # aeroporto -> conexão que chegou mais cedo
+            for posicao in range(inicio, len(conexoes)):
+                conexao = conexoes[posicao]
+                saida = conexao[0]
+                if saida > limite or (destino in chegada_em and saida >= chegada_em[destino]):
+                    break
+                pronto = embarque.get(conexao[3])
+                if pronto is None or saida < pronto:
+                    continue
+                chegada, proximo = conexao[2], conexao[4]
+                if proximo not in chegada_em or chegada < chegada_em[proximo]:
+                    chegada_em[proximo] = chegada
+                    ultimo_voo[proximo] = conexao
+                    if proximo != origem:
+                        embarque[proximo] = chegada + tempo_minimo
+            if destino not in ultimo_voo:
+                return None
+            # Reconstrói a viagem do destino até a origem
+            viagem, aeroporto = [], destino
+            while aeroporto != origem:
+                conexao = ultimo_voo[aeroporto]
+                viagem.append(conexao[1])
+                aeroporto = conexao[3]
+            return viagem[::-1]
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                "carregado": self.carregado,
+                "aeroportos": len(self.nomes),
+                "conexoes": len(self.conexoes),
+                "recargas": self.recargas,
+                "intervalo_recarga": CONEXOES_RECARGA,
+            }
+
+rede = RedeVoos()
+
+@ouvinte
+def _atualizar(alteracoes) -> None:
+    rede.aplicar(alteracoes)
+
+# Tarefa de fundo iniciada no lifespan da aplicação
+async def recarregar_periodicamente(engine) -> None:
+    if CONEXOES_RECARGA <= 0:
+        return
+    while True:
+        await asyncio.sleep(CONEXOES_RECARGA)
+        if not rede.carregado:
+            continue  # A próxima consulta fará a carga
+        try:
+            await asyncio.to_thread(_recarregar, engine)
+        except Exception:
+            logger.exception("Falha na recarga da rede de voos")
+
+def _recarregar(engine) -> None:
+    with Session(engine) as session:
+        rede.recarregar(session)
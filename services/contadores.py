@@ -0,0 +1,219 @@
+# Contadores materializados para os endpoints de contagem (contagem-*).
+#
+# Em vez de um JOIN + GROUP BY sobre todos os voos a cada requisição, o processo mantém em
+# memória as contagens por chave estrangeira (voos por cia, voos por aeronave) e os atributos
+# das tabelas pequenas usados no agrupamento (nome da cia, modelo e cia da aeronave). Tudo é
+# atualizado de forma incremental pelas alterações confirmadas (services.alteracoes) e os
+# resultados agregados ficam memorizados até a próxima alteração.
+#
+# A carga inicial é feita na primeira consulta. Uma reconciliação periódica recalcula tudo a
+# partir do banco e corrige divergências (escritas feitas por outros processos ou fora da API,
+# ou confirmadas enquanto uma carga estava em andamento).
+from collections import Counter
+from datetime import datetime, timezone
+from services.alteracoes import ouvinte
+from services.particoes import tabelas_voo
+from sqlalchemy import func
+from sqlmodel import Session, select
+from threading import Lock
+from models.aeronave import Aeronave
+from models.cia import Cia
+import asyncio
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+CONTADORES_RECONCILIACAO = float(os.getenv("CONTADORES_RECONCILIACAO", "300"))  # Segundos (0 desativa)
+
+# Campos de cada tabela de que os contadores dependem
+CAMPOS = {
+    "cia": ("nome",),
+    "aeronave": ("modelo", "cia_id"),
+    "voo": ("cia_id", "aeronave_id"),
+}
+
+def _ordenar(chave):
+    # Mesma ordem do GROUP BY original, com valores nulos por último
+    return tuple((valor is None, valor) for valor in (chave if isinstance(chave, tuple) else (chave,)))
+
+class Contadores:
+    def __init__(self):
+        self._lock = Lock()
+        self.carregado = False
+        self.nome_cia = {}  # cia_id -> nome
+        self.modelo_aeronave = {}  # aeronave_id -> modelo
+        self.cia_aeronave = {}  # aeronave_id -> cia_id
+        self.voos_por_cia = Counter()  # cia_id -> total de voos
+        self.voos_por_aeronave = Counter()  # aeronave_id -> total de voos
+        self._agregados = {}  # Resultados já agregados, descartados a cada alteração
+        self.alteracoes_aplicadas = 0
+        self.reconciliacoes = 0
+        self.divergencias = 0  # Chaves corrigidas pela última reconciliação
+        self.ultima_reconciliacao = None
+
+    # Carga completa a partir do banco (consultas agrupadas por chave estrangeira),
+    # somando a partição quente e as partições de arquivo dos voos
+    def _ler_banco(self, session: Session) -> dict:
+        voos_por_cia, voos_por_aeronave = Counter(), Counter()
+        for tabela in tabelas_voo():
+            for cia_id, total in session.exec(select(tabela.c.cia_id, func.count()).group_by(tabela.c.cia_id)):
+                voos_por_cia[cia_id] += total
+            for aeronave_id, total in session.exec(select(tabela.c.aeronave_id, func.count()).group_by(tabela.c.aeronave_id)):
+                voos_por_aeronave[aeronave_id] += total
+        aeronaves = session.exec(select(Aeronave.id, Aeronave.modelo, Aeronave.cia_id)).all()
+        return {
+            "nome_cia": dict(session.exec(select(Cia.id, Cia.nome)).all()),
+            "modelo_aeronave": {id_aeronave: modelo for id_aeronave, modelo, _ in aeronaves},
+            "cia_aeronave": {id_aeronave: cia_id for id_aeronave, _, cia_id in aeronaves},
+            "voos_por_cia": voos_por_cia,
+            "voos_por_aeronave": voos_por_aeronave,
+        }
+
+    def _carregar(self, session: Session) -> None:
+        if self.carregado:
+            return
+        estado = self._ler_banco(session)
+        with self._lock:
+            if not self.carregado:
+                self.__dict__.update(estado)
+                self._agregados.clear()
+                self.carregado = True
+
+    # Recalcula tudo e substitui o estado incremental, registrando as divergências encontradas
+    def reconciliar(self, session: Session) -> int:
+        estado = self._ler_banco(session)
+        with self._lock:
+            divergencias = 0
+            if self.carregado:
+                for nome, valores in estado.items():
+                    atuais = getattr(self, nome)
+                    divergencias += sum(
+                        1 for chave in valores.keys() | atuais.keys() if valores.get(chave) != atuais.get(chave)
+                    )
+            self.__dict__.update(estado)
+            self._agregados.clear()
+            self.carregado = True
+            self.reconciliacoes += 1
+            self.divergencias = divergencias
+            self.ultima_reconciliacao = datetime.now(timezone.utc)
+        if divergencias:
+            logger.warning("Reconciliação dos contadores corrigiu %d chaves", divergencias)
+        return divergencias
+
+    def aplicar(self, alteracoes) -> None:
+        with self._lock:
+            if not self.carregado:
+                return  # A carga inicial já lerá o estado atual do banco
+            for alteracao in alteracoes:
+                campos = CAMPOS.get(alteracao.tabela)
+                if campos is None or alteracao.operacao == "arquivamento":
+                    continue  # Voos arquivados continuam contando
+                valores = [v for v in (alteracao.antes, alteracao.depois) if v is not None]
+                esperados = 2 if alteracao.operacao == "update" else 1
+                if len(valores) < esperados or any(c not in v for v in valores for c in campos + ("id",)):
+                    # Alteração sem os valores necessários: recarrega na próxima consulta
+                    self.carregado = False
+                    return
+                getattr(self, f"_aplicar_{alteracao.tabela}")(alteracao)
+                self.alteracoes_aplicadas += 1
+            self._agregados.clear()
+
+    def _aplicar_cia(self, alteracao) -> None:
+        if alteracao.antes:
+            self.nome_cia.pop(alteracao.antes["id"], None)
+        if alteracao.depois:
+            self.nome_cia[alteracao.depois["id"]] = alteracao.depois["nome"]
+
+    def _aplicar_aeronave(self, alteracao) -> None:
+        if alteracao.antes:
+            self.modelo_aeronave.pop(alteracao.antes["id"], None)
+            self.cia_aeronave.pop(alteracao.antes["id"], None)
+        if alteracao.depois:
+            self.modelo_aeronave[alteracao.depois["id"]] = alteracao.depois["modelo"]
+            self.cia_aeronave[alteracao.depois["id"]] = alteracao.depois["cia_id"]
+
+    def _aplicar_voo(self, alteracao) -> None:
+        if alteracao.antes:
+            self.voos_por_cia[alteracao.antes["cia_id"]] -= 1
+            self.voos_por_aeronave[alteracao.antes["aeronave_id"]] -= 1
+        if alteracao.depois:
+            self.voos_por_cia[alteracao.depois["cia_id"]] += 1
+            self.voos_por_aeronave[alteracao.depois["aeronave_id"]] += 1
+
+    # Agregados memorizados: calculados sob o lock a partir do estado atual
+    def _agregado(self, session: Session, nome: str, calcular):
+        self._carregar(session)
+        with self._lock:
+            if nome not in self._agregados:
+                self._agregados[nome] = calcular()
+            return self._agregados[nome]
+
+    # Equivale ao JOIN Voo x Cia agrupado pelo nome da cia
+    def voos_por_companhia(self, session: Session) -> dict:
+        def calcular():
+            totais = Counter()
+            for cia_id, total in self.voos_por_cia.items():
+                if total > 0 and cia_id in self.nome_cia:
+                    totais[self.nome_cia[cia_id]] += total
+            return {nome: totais[nome] for nome in sorted(totais, key=_ordenar)}
+        return dict(self._agregado(session, "voos_por_companhia", calcular))
+
+    # Equivale ao JOIN Voo x Aeronave agrupado pelo modelo
+    def voos_por_modelo(self, session: Session) -> dict:
+        def calcular():
+            totais = Counter()
+            for aeronave_id, total in self.voos_por_aeronave.items():
+                if total > 0 and aeronave_id in self.modelo_aeronave:
+                    totais[self.modelo_aeronave[aeronave_id]] += total
+            return {modelo: totais[modelo] for modelo in sorted(totais, key=_ordenar)}
+        return dict(self._agregado(session, "voos_por_modelo", calcular))
+
+    # Equivale ao JOIN Cia x Aeronave agrupado por cia e modelo
+    def aeronaves_por_cia_e_modelo(self, session: Session) -> list[dict]:
+        def calcular():
+            totais = Counter(
+                (self.nome_cia[cia_id], self.modelo_aeronave[aeronave_id])
+                for aeronave_id, cia_id in self.cia_aeronave.items() if cia_id in self.nome_cia
+            )
+            return [
+                {"cia": cia, "modelo": modelo, "total_aeronaves": totais[(cia, modelo)]}
+                for cia, modelo in sorted(totais, key=_ordenar)
+            ]
+        return [dict(item) for item in self._agregado(session, "aeronaves_por_cia_e_modelo", calcular)]
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                "carregado": self.carregado,
+                "cias": len(self.nome_cia),
+                "aeronaves": len(self.modelo_aeronave),
+                "alteracoes_aplicadas": self.alteracoes_aplicadas,
+                "reconciliacoes": self.reconciliacoes,
+                "divergencias_ultima_reconciliacao": self.divergencias,
+                "ultima_reconciliacao": self.ultima_reconciliacao,
+                "intervalo_reconciliacao": CONTADORES_RECONCILIACAO,
+            }
+
+contadores = Contadores()
+
+@ouvinte
+def _atualizar(alteracoes) -> None:
+    contadores.aplicar(alteracoes)
+
+# Tarefa de fundo iniciada no lifespan da aplicação
+async def reconciliar_periodicamente(engine) -> None:
+    if CONTADORES_RECONCILIACAO <= 0:
+        return
+    while True:
+        await asyncio.sleep(CONTADORES_RECONCILIACAO)
+        if not contadores.carregado:
+            continue  # Nada materializado ainda: a próxima consulta fará a carga
+        try:
+            await asyncio.to_thread(reconciliar, engine)
+        except Exception:
+            logger.exception("Falha na reconciliação dos contadores")
+
+def reconciliar(engine) -> int:
+    with Session(engine) as session:
+        return contadores.reconciliar(session)
@@ -0,0 +1,348 @@
+# Disponibilidade das aeronaves: índice de intervalos (hr_partida, hr_chegada) por aeronave.
+#
+# Cada aeronave tem duas listas ordenadas, com os horários de partida e de chegada dos seus voos.
+# Os voos que se sobrepõem a [inicio, fim) são os que partem antes de `fim`, menos os que já
+# chegaram até `inicio` (estes sempre partem antes de `fim`), então a verificação de conflito são
+# duas buscas binárias, mesmo que existam voos sobrepostos no banco. "Aeronaves livres da cia X
+# entre T1 e T2" repete essa verificação para cada aeronave da cia.
+#
+# O índice é carregado na primeira consulta a partir da partição quente (voos arquivados já
+# terminaram) e mantido pelas alterações confirmadas (services.alteracoes). Voos cancelados não
+# ocupam a aeronave. As escritas reservam o horário no índice antes do commit, para que duas
+# requisições simultâneas não aloquem a mesma aeronave; uma recarga periódica incorpora escritas
+# feitas por outros processos ou direto no banco.
+#
+# Com vários workers (database.varios_processos), a reserva no índice de um processo não é vista
+# pelos outros: antes dela, a escrita bloqueia as linhas das aeronaves envolvidas (até o commit) e
+# procura os conflitos no banco primário, pela mesma sessão que fará a escrita.
+from bisect import bisect_left, bisect_right, insort
+from contextlib import contextmanager
+from datetime import datetime
+from fastapi import HTTPException
+from database import varios_processos
+from services.alteracoes import ouvinte
+from sqlalchemy import update
+from sqlmodel import Session, select
+from threading import Lock
+from models.aeronave import Aeronave
+from models.voo import Voo
+import asyncio
+import itertools
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+DISPONIBILIDADE_RECARGA = float(os.getenv("DISPONIBILIDADE_RECARGA", "300"))  # Segundos (0 desativa)
+STATUS_LIVRE = "Cancelado"  # Voos neste status não ocupam a aeronave
+
+def horario_sem_fuso(valor) -> datetime | None:
+    # O SQLite grava o horário sem fuso: a comparação é feita com o horário "de parede"
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+    if isinstance(valor, datetime):
+        return valor if valor.tzinfo is None else valor.replace(tzinfo=None)
+    return None
+
+class Agenda:
+    def __init__(self):
+        self.partidas = []  # Ordenadas
+        self.chegadas = []  # Ordenadas
+        self.voos = {}  # chave (id do voo ou reserva) -> (partida, chegada)
+
+    def adicionar(self, chave, partida: datetime, chegada: datetime) -> None:
+        insort(self.partidas, partida)
+        insort(self.chegadas, chegada)
+        self.voos[chave] = (partida, chegada)
+
+    def remover(self, chave) -> None:
+        partida, chegada = self.voos.pop(chave)
+        del self.partidas[bisect_left(self.partidas, partida)]
+        del self.chegadas[bisect_left(self.chegadas, chegada)]
+
+    def sobrepostos(self, inicio: datetime, fim: datetime) -> int:
+        return bisect_left(self.partidas, fim) - bisect_right(self.chegadas, inicio)
+
+    # Chaves em conflito com [inicio, fim), exceto `ignorar` (o próprio voo em uma alteração)
+    def conflitos(self, inicio: datetime, fim: datetime, ignorar=None) -> list:
+        total = self.sobrepostos(inicio, fim)
+        if ignorar in self.voos and self.voos[ignorar][0] < fim and self.voos[ignorar][1] > inicio:
+            total -= 1
+        if total <= 0:
+            return []
+        # Só há varredura quando existe conflito, para informar quais voos o causam
+        return sorted(
+            (chave for chave, (partida, chegada) in self.voos.items()
+             if chave != ignorar and partida < fim and chegada > inicio),
+            key=str,
+        )
+
+class Disponibilidade:
+    def __init__(self):
+        self._lock = Lock()
+        self.carregado = False
+        self.agendas = {}  # aeronave_id -> Agenda
+        self.aeronave_voo = {}  # voo_id -> aeronave_id (voos presentes no índice)
+        self.cia_aeronave = {}  # aeronave_id -> cia_id
+        self._reservas = itertools.count(1)
+        self._carregando = 0  # Leituras do banco em andamento
+        self._durante_carga = []  # Alterações publicadas durante essas leituras
+        self.recargas = 0
+
+    def _ler_banco(self, session: Session) -> dict:
+        agendas, aeronave_voo = {}, {}
+        voos = session.exec(
+            select(Voo.id, Voo.aeronave_id, Voo.hr_partida, Voo.hr_chegada).where(Voo.status != STATUS_LIVRE)
+        )
+        for voo_id, aeronave_id, partida, chegada in voos:
+            partida, chegada = horario_sem_fuso(partida), horario_sem_fuso(chegada)
+            if partida is not None and chegada is not None and partida < chegada:
+                agendas.setdefault(aeronave_id, Agenda()).adicionar(voo_id, partida, chegada)
+                aeronave_voo[voo_id] = aeronave_id
+        return {
+            "agendas": agendas,
+            "aeronave_voo": aeronave_voo,
+            "cia_aeronave": dict(session.exec(select(Aeronave.id, Aeronave.cia_id)).all()),
+        }
+
+    def _carregar(self, session: Session) -> None:
+        if not self.carregado:
+            self._ler_e_instalar(session, recarga=False)
+
+    def recarregar(self, session: Session) -> None:
+        self._ler_e_instalar(session, recarga=True)
+
+    # O banco é lido fora do lock: alterações publicadas durante a leitura podem ou não estar no
+    # estado lido, então são guardadas e reaplicadas sobre ele (reaplicar um voo completo não muda
+    # o resultado)
+    def _ler_e_instalar(self, session: Session, recarga: bool) -> None:
+        with self._lock:
+            self._carregando += 1
+        try:
+            estado = self._ler_banco(session)
+        except BaseException:
+            with self._lock:
+                self._finalizar_carga()
+            raise
+        with self._lock:
+            durante_carga = self._finalizar_carga()
+            if self.carregado and not recarga:
+                return  # Outra carga terminou antes
+            if recarga:
+                # Reservas em andamento continuam valendo até o commit das suas escritas
+                for aeronave_id, agenda in self.agendas.items():
+                    for chave, (partida, chegada) in agenda.voos.items():
+                        if isinstance(chave, tuple):
+                            estado["agendas"].setdefault(aeronave_id, Agenda()).adicionar(chave, partida, chegada)
+                self.recargas += 1
+            self.__dict__.update(estado)
+            self.carregado = True
+            self._aplicar(durante_carga)
+
+    def _finalizar_carga(self) -> list:
+        durante_carga = self._durante_carga
+        self._carregando -= 1
+        if not self._carregando:
+            self._durante_carga = []
+        return list(durante_carga)
+
+    def aplicar(self, alteracoes) -> None:
+        with self._lock:
+            if self._carregando:
+                self._durante_carga.extend(alteracoes)
+            if self.carregado:
+                self._aplicar(alteracoes)
+
+    def _aplicar(self, alteracoes) -> None:
+        for alteracao in alteracoes:
+            if alteracao.tabela == "voo":
+                self._aplicar_voo(alteracao)
+            elif alteracao.tabela == "aeronave":
+                if alteracao.antes:
+                    self.cia_aeronave.pop(alteracao.antes.get("id"), None)
+                if alteracao.depois:
+                    if "cia_id" not in alteracao.depois:
+                        self.carregado = False  # Sem os valores necessários: recarrega na próxima consulta
+                        return
+                    self.cia_aeronave[alteracao.depois["id"]] = alteracao.depois["cia_id"]
+            if not self.carregado:
+                return
+
+    def _aplicar_voo(self, alteracao) -> None:
+        voo_id = alteracao.id
+        if voo_id in self.aeronave_voo:
+            self.agendas[self.aeronave_voo.pop(voo_id)].remover(voo_id)
+        if alteracao.depois is None or alteracao.operacao == "arquivamento":
+            return
+        # Escritas em lote trazem em `depois` apenas as colunas alteradas
+        voo = {**(alteracao.antes or {}), **alteracao.depois}
+        if any(campo not in voo for campo in ("aeronave_id", "hr_partida", "hr_chegada", "status")):
+            self.carregado = False
+            return
+        partida, chegada = horario_sem_fuso(voo["hr_partida"]), horario_sem_fuso(voo["hr_chegada"])
+        if voo["status"] != STATUS_LIVRE and partida is not None and chegada is not None and partida < chegada:
+            self.agendas.setdefault(voo["aeronave_id"], Agenda()).adicionar(voo_id, partida, chegada)
+            self.aeronave_voo[voo_id] = voo["aeronave_id"]
+
+    # Aeronaves (da cia, se informada) sem voos em [inicio, fim)
+    def livres(self, session: Session, inicio, fim, cia_id: int | None = None) -> list[int]:
+        self._carregar(session)
+        inicio, fim = horario_sem_fuso(inicio), horario_sem_fuso(fim)
+        with self._lock:
+            return sorted(
+                aeronave_id for aeronave_id, cia in self.cia_aeronave.items()
+                if (cia_id is None or cia == cia_id)
+                and (aeronave_id not in self.agendas or self.agendas[aeronave_id].sobrepostos(inicio, fim) <= 0)
+            )
+
+    # Verifica e reserva os horários de um bloco de voos até o commit. `voos` é uma lista de
+    # (indice, linha); devolve {indice: detalhe} dos que conflitam com o índice ou entre si
+    @contextmanager
+    def reservar(self, session: Session, voos: list):
+        self._carregar(session)
+        reservas = []
+        recusados = _conflitos_no_banco(session, voos) if varios_processos() else {}
+        with self._lock:
+            for indice, voo in voos:
+                if indice in recusados:
+                    continue
+                partida, chegada = horario_sem_fuso(voo.get("hr_partida")), horario_sem_fuso(voo.get("hr_chegada"))
+                if voo.get("status") == STATUS_LIVRE or partida is None or chegada is None or partida >= chegada:
+                    continue
+                agenda = self.agendas.setdefault(voo.get("aeronave_id"), Agenda())
+                conflitos = agenda.conflitos(partida, chegada, voo.get("id"))
+                if conflitos:
+                    em_conflito = [chave for chave in conflitos if not isinstance(chave, tuple)]
+                    if em_conflito:
+                        recusados[indice] = f"Aeronave {voo.get('aeronave_id')} já alocada no horário (voos {em_conflito})"
+                    elif any((agenda, chave) in reservas for chave in conflitos):
+                        recusados[indice] = f"Aeronave {voo.get('aeronave_id')} alocada no mesmo horário por outro item"
+                    else:
+                        recusados[indice] = f"Aeronave {voo.get('aeronave_id')} sendo alocada no horário por outra escrita"
+                    continue
+                chave = ("reserva", next(self._reservas))
+                agenda.adicionar(chave, partida, chegada)
+                reservas.append((agenda, chave))
+        try:
+            yield recusados
+        finally:
+            with self._lock:
+                for agenda, chave in reservas:
+                    agenda.remover(chave)
+
+    # Escrita de um único voo: 409 se a aeronave já está ocupada no horário
+    @contextmanager
+    def reservar_voo(self, session: Session, voo: dict):
+        with self.reservar(session, [(0, voo)]) as recusados:
+            if recusados:
+                raise HTTPException(status_code=409, detail=recusados[0])
+            yield
+
+    # Alteração parcial de um voo (PATCH): o voo só é lido quando a alteração pode ocupar a aeronave
+    # em outro horário. Trocar apenas o status de um voo que já está na agenda (ou cancelá-lo) não
+    # tem conflito possível e não consulta o banco
+    @contextmanager
+    def reservar_alteracao(self, session: Session, voo_id: int, campos: dict):
+        if not campos.keys() & {"aeronave_id", "hr_partida", "hr_chegada"} and (
+            "status" not in campos or campos["status"] == STATUS_LIVRE or self.na_agenda(session, voo_id)
+        ):
+            yield
+            return
+        atual = session.exec(
+            select(Voo.aeronave_id, Voo.hr_partida, Voo.hr_chegada, Voo.status).where(Voo.id == voo_id)
+        ).first()
+        if atual is None:
+            yield  # O UPDATE não encontrará o voo (404)
+            return
+        with self.reservar_voo(session, {**atual._asdict(), **campos, "id": voo_id}):
+            yield
+
+    def na_agenda(self, session: Session, voo_id: int) -> bool:
+        self._carregar(session)
+        with self._lock:
+            return voo_id in self.aeronave_voo
+
+    # Alterações só de status em lote (services.fila_status), {voo_id: status}: apenas os voos fora
+    # da agenda (cancelados) que deixam de estar cancelados podem ocupar a aeronave, e só estes são
+    # lidos e reservados até o commit. Devolve {voo_id: detalhe} dos recusados
+    @contextmanager
+    def reservar_status(self, session: Session, status: dict):
+        self._carregar(session)
+        with self._lock:
+            candidatos = [voo_id for voo_id, novo in status.items() if novo != STATUS_LIVRE and voo_id not in self.aeronave_voo]
+        if not candidatos:
+            yield {}
+            return
+        atuais = session.exec(
+            select(Voo.id, Voo.aeronave_id, Voo.hr_partida, Voo.hr_chegada).where(Voo.id.in_(candidatos))
+        ).all()
+        voos = [(linha.id, {**linha._asdict(), "status": status[linha.id]}) for linha in atuais]
+        with self.reservar(session, voos) as recusados:
+            yield recusados
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                "carregado": self.carregado,
+                "aeronaves": len(self.cia_aeronave),
+                "voos_indexados": len(self.aeronave_voo),
+                "recargas": self.recargas,
+                "intervalo_recarga": DISPONIBILIDADE_RECARGA,
+            }
+
+disponibilidade = Disponibilidade()
+
+# Conflitos consultados no banco (vários workers). O UPDATE sem efeito nas aeronaves obtém o
+# bloqueio de escrita (SQLite) ou das linhas (Postgres) até o fim da transação: duas escritas na
+# mesma aeronave em processos diferentes são serializadas e a segunda vê o commit da primeira
+def _conflitos_no_banco(session: Session, voos: list) -> dict:
+    intervalos = []
+    for indice, voo in voos:
+        partida, chegada = horario_sem_fuso(voo.get("hr_partida")), horario_sem_fuso(voo.get("hr_chegada"))
+        if voo.get("status") == STATUS_LIVRE or partida is None or chegada is None or partida >= chegada:
+            continue
+        intervalos.append((indice, voo, partida, chegada))
+    if not intervalos:
+        return {}
+    aeronaves = sorted({voo.get("aeronave_id") for _, voo, _, _ in intervalos})
+    tabela = Aeronave.__table__
+    session.execute(update(tabela).where(tabela.c.id.in_(aeronaves)).values(id=tabela.c.id))
+    ocupados = session.exec(
+        select(Voo.id, Voo.aeronave_id, Voo.hr_partida, Voo.hr_chegada).where(
+            Voo.aeronave_id.in_(aeronaves),
+            Voo.status != STATUS_LIVRE,
+            Voo.hr_partida < max(chegada for _, _, _, chegada in intervalos),
+            Voo.hr_chegada > min(partida for _, _, partida, _ in intervalos),
+        )
+    ).all()
+    recusados = {}
+    for indice, voo, partida, chegada in intervalos:
+        em_conflito = sorted(
+            ocupado.id for ocupado in ocupados
+            if ocupado.aeronave_id == voo.get("aeronave_id") and ocupado.id != voo.get("id")
+            and horario_sem_fuso(ocupado.hr_partida) < chegada and horario_sem_fuso(ocupado.hr_chegada) > partida
+        )
+        if em_conflito:
+            recusados[indice] = f"Aeronave {voo.get('aeronave_id')} já alocada no horário (voos {em_conflito})"
+    return recusados
+
+@ouvinte
+def _atualizar(alteracoes) -> None:
+    disponibilidade.aplicar(alteracoes)
+
+# Tarefa de fundo iniciada no lifespan da aplicação
+async def recarregar_periodicamente(engine) -> None:
+    if DISPONIBILIDADE_RECARGA <= 0:
+        return
+    while True:
+        await asyncio.sleep(DISPONIBILIDADE_RECARGA)
+        if not disponibilidade.carregado:
+            continue  # A próxima consulta fará a carga
+        try:
+            await asyncio.to_thread(_recarregar, engine)
+        except Exception:
+            logger.exception("Falha na recarga do índice de disponibilidade")
+
+def _recarregar(engine) -> None:
+    with Session(engine) as session:
+        disponibilidade.recarregar(session)
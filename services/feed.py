@@ -0,0 +1,176 @@
+# Feed de alterações dos voos em tempo real (GET /voos/stream via SSE ou WebSocket).
+#
+# Cada alteração confirmada na tabela voo (services.alteracoes, qualquer caminho de escrita) vira
+# um evento entregue às conexões inscritas, filtradas por companhia, origem ou destino. No backend
+# "memoria" os eventos são distribuídos por filas asyncio do próprio processo; no "redis" passam
+# por um canal pub/sub, para que clientes conectados a qualquer worker recebam as escritas de todos.
+#
+# As filas são limitadas: um cliente que não acompanha o ritmo perde eventos e recebe um aviso
+# "perdidos", para reler o estado com GET /voos.
+from datetime import date, datetime
+from services.alteracoes import ouvinte
+from threading import Lock
+import asyncio
+import itertools
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+FEED_BACKEND = os.getenv("FEED_BACKEND", "memoria")  # "memoria" ou "redis"
+FEED_REDIS_URL = os.getenv("FEED_REDIS_URL", os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0"))
+FEED_FILA = int(os.getenv("FEED_FILA", "1000"))  # Eventos pendentes por conexão antes de descartar
+FEED_HEARTBEAT = float(os.getenv("FEED_HEARTBEAT", "15"))  # Segundos entre mensagens de keep-alive
+CANAL_REDIS = "voos:feed"
+
+class Assinante:
+    def __init__(self, cia_id: int | None = None, origem: str | None = None, destino: str | None = None):
+        self.cia_id = cia_id
+        self.origem = origem.upper() if origem else None
+        self.destino = destino.upper() if destino else None
+        self.fila = asyncio.Queue(maxsize=FEED_FILA)
+        self.loop = asyncio.get_running_loop()
+        self.perdidos = 0  # Eventos descartados desde o último aviso
+
+    def aceita(self, evento: dict) -> bool:
+        # Compara os valores antes e depois: um voo que sai do filtro (ex.: troca de destino) também é avisado
+        estados = [estado for estado in (evento["voo"], evento["antes"]) if estado]
+        if self.cia_id is not None and not any(estado.get("cia_id") == self.cia_id for estado in estados):
+            return False
+        if self.origem and not any(str(estado.get("origem", "")).upper() == self.origem for estado in estados):
+            return False
+        if self.destino and not any(str(estado.get("destino", "")).upper() == self.destino for estado in estados):
+            return False
+        return True
+
+    # Executado no event loop do assinante
+    def entregar(self, evento: dict) -> None:
+        try:
+            self.fila.put_nowait(evento)
+        except asyncio.QueueFull:
+            self.perdidos += 1
+
+    async def proximo(self, timeout: float) -> dict | None:
+        if self.perdidos:
+            perdidos, self.perdidos = self.perdidos, 0
+            return {"tipo": "perdidos", "quantidade": perdidos}
+        try:
+            return await asyncio.wait_for(self.fila.get(), timeout)
+        except asyncio.TimeoutError:
+            return None  # Nenhum evento no intervalo: hora do keep-alive
+
+class Feed:
+    def __init__(self):
+        self._lock = Lock()
+        self._assinantes = set()
+        self._sequencia = itertools.count(1)
+        self.publicados = 0
+
+    def inscrever(self, assinante: Assinante) -> None:
+        with self._lock:
+            self._assinantes.add(assinante)
+
+    def cancelar(self, assinante: Assinante) -> None:
+        with self._lock:
+            self._assinantes.discard(assinante)
+
+    # Pode ser chamado de qualquer thread (os ouvintes rodam na thread que fez o commit)
+    def distribuir(self, eventos: list[dict]) -> None:
+        with self._lock:
+            assinantes = list(self._assinantes)
+            eventos = [{**evento, "seq": next(self._sequencia)} for evento in eventos]
+            self.publicados += len(eventos)
+        for assinante in assinantes:
+            selecionados = [evento for evento in eventos if assinante.aceita(evento)]
+            if not selecionados:
+                continue
+            try:
+                assinante.loop.call_soon_threadsafe(_entregar_todos, assinante, selecionados)
+            except RuntimeError:  # Event loop já encerrado
+                self.cancelar(assinante)
+
+    def resumo(self) -> dict:
+        with self._lock:
+            return {
+                "backend": FEED_BACKEND,
+                "conexoes": len(self._assinantes),
+                "eventos_publicados": self.publicados,
+                "eventos_pendentes": sum(assinante.fila.qsize() for assinante in self._assinantes),
+            }
+
+def _entregar_todos(assinante: Assinante, eventos: list[dict]) -> None:
+    for evento in eventos:
+        assinante.entregar(evento)
+
+feed = Feed()
+
+def _evento(alteracao) -> dict:
+    # Estado completo após a alteração: escritas em lote trazem só as colunas alteradas em `depois`
+    voo = {**(alteracao.antes or {}), **alteracao.depois} if alteracao.depois is not None else None
+    antes = alteracao.antes
+    alterados = sorted(
+        campo for campo, valor in (alteracao.depois or {}).items() if antes and antes.get(campo) != valor
+    )
+    return {"operacao": alteracao.operacao, "id": alteracao.id, "voo": voo, "antes": antes, "alterados": alterados}
+
+def codificar(evento: dict) -> str:
+    return json.dumps(evento, ensure_ascii=False, separators=(",", ":"), default=_converter)
+
+def _converter(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+_redis = None
+
+def _publicar_redis(eventos: list[dict]) -> bool:
+    global _redis
+    # Importado aqui: o backend Redis depende do extra opcional "redis"
+    import redis
+
+    try:
+        if _redis is None:
+            _redis = redis.Redis.from_url(FEED_REDIS_URL)
+        _redis.publish(CANAL_REDIS, codificar(eventos))
+        return True
+    except redis.RedisError as erro:
+        logger.warning("Falha ao publicar no feed Redis (entregue só neste processo): %s", erro)
+        return False
+
+@ouvinte
+def _publicar(alteracoes) -> None:
+    # Voos arquivados continuam existindo (services.particoes): não são mudanças de estado do voo
+    eventos = [
+        _evento(alteracao) for alteracao in alteracoes
+        if alteracao.tabela == "voo" and alteracao.operacao != "arquivamento"
+    ]
+    if not eventos:
+        return
+    if FEED_BACKEND == "redis" and _publicar_redis(eventos):
+        return  # Volta por retransmitir_redis, inclusive para este processo
+    feed.distribuir(eventos)
+
+# Tarefa de fundo iniciada no lifespan (FEED_BACKEND=redis): repassa os eventos publicados por
+# todos os workers aos assinantes deste processo
+async def retransmitir_redis() -> None:
+    if FEED_BACKEND != "redis":
+        return
+    import redis.asyncio as redis_async
+
+    espera = 1.0
+    while True:
+        try:
+            cliente = redis_async.Redis.from_url(FEED_REDIS_URL)
+            async with cliente.pubsub() as pubsub:
+                await pubsub.subscribe(CANAL_REDIS)
+                espera = 1.0
+                async for mensagem in pubsub.listen():
+                    if mensagem["type"] == "message":
+                        feed.distribuir(json.loads(mensagem["data"]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as erro:
+            logger.warning("Conexão com o feed Redis perdida, reconectando em %.0fs: %s", espera, erro)
+            await asyncio.sleep(espera)
+            espera = min(espera * 2, 30.0)
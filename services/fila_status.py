@@ -0,0 +1,470 @@
+# Fila de escrita diferida (write-behind) para alterações de status dos voos em rajadas.
+#
+# PUT /voos/{id}/status e POST /voos/status aceitam a alteração numa fila limitada do processo e
+# respondem 202 sem esperar o banco. Alterações do mesmo voo ainda pendentes são combinadas (vale
+# a última), e uma tarefa de fundo as grava em lotes de até STATUS_FILA_LOTE voos, cada lote um
+# único UPDATE ... CASE numa transação, quando o lote enche ou STATUS_FILA_INTERVALO segundos
+# depois da primeira pendente. Com o SQLite, milhares de alterações por segundo viram poucas
+# transações, em vez de uma fila de requisições esperando o lock de escrita.
+#
+# Durabilidade (STATUS_FILA_DURABILIDADE):
+#   memoria  responde ao entrar na fila; pendentes se perdem se o processo cair
+#   diario   antes de responder, grava a alteração num diário (NDJSON) relido na inicialização;
+#            com STATUS_FILA_FSYNC=true, sobrevive também a uma queda da máquina
+#   commit   responde depois do commit do lote que contém a alteração (mantém a combinação e os
+#            lotes, mas cada requisição espera até STATUS_FILA_INTERVALO)
+#
+# Com a fila cheia, a requisição espera até STATUS_FILA_ESPERA segundos por espaço e então recebe
+# 503 com Retry-After. GET /voos aplica os status pendentes às linhas devolvidas (read-your-writes
+# no mesmo processo); a `versao` só muda quando o lote é gravado. Voos inexistentes são
+# descartados na gravação, e um voo cancelado cuja aeronave já está ocupada no horário não é
+# reativado (409 no modo "commit"). Alterações pelas rotas diretas (PUT/PATCH) são gravadas na
+# hora e podem ser sobrescritas por um status da fila gravado depois.
+from database import varios_processos
+from fastapi import HTTPException
+from pydantic import BaseModel, Field, ValidationError
+from sqlalchemy import case, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+from services.alteracoes import Alteracao, publicar
+from services.disponibilidade import disponibilidade
+from services.lote import ItemInvalido, ResultadoLote
+from services.versoes import versoes
+from threading import Lock
+from models.voo import Voo
+import asyncio
+import glob
+import itertools
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+FILA_CHEIA = "Fila de alterações de status cheia"
+
+STATUS_FILA_MAX = int(os.getenv("STATUS_FILA_MAX", "10000"))  # Voos com alteração pendente
+STATUS_FILA_LOTE = int(os.getenv("STATUS_FILA_LOTE", "500"))  # Voos por transação
+STATUS_FILA_INTERVALO = float(os.getenv("STATUS_FILA_INTERVALO", "0.2"))  # Segundos até gravar um lote incompleto
+STATUS_FILA_DURABILIDADE = os.getenv("STATUS_FILA_DURABILIDADE", "diario")  # "memoria", "diario" ou "commit"
+STATUS_FILA_DIARIO = os.getenv("STATUS_FILA_DIARIO", os.path.join("dados", "status_pendentes.ndjson"))
+STATUS_FILA_FSYNC = os.getenv("STATUS_FILA_FSYNC", "false").lower() in ("1", "true", "sim")
+STATUS_FILA_ESPERA = float(os.getenv("STATUS_FILA_ESPERA", "0.5"))  # Segundos esperando espaço na fila
+
+if STATUS_FILA_DURABILIDADE not in ("memoria", "diario", "commit"):
+    raise ValueError(
+        f"STATUS_FILA_DURABILIDADE desconhecida: {STATUS_FILA_DURABILIDADE!r} (use 'memoria', 'diario' ou 'commit')"
+    )
+
+# Diário das alterações aceitas e ainda não gravadas, por processo: <base>.<pid> recebe as novas
+# alterações e <base>.<pid>.base guarda as pendentes no momento da última compactação. Após cada
+# lote gravado, o diário ativo é renomeado para <base>.<pid>.anterior (sob o lock da fila, sem
+# escrever nada) e as pendentes são gravadas no novo .base fora do lock; só então o .anterior é
+# apagado. Na inicialização, os diários de processos que já não existem (ex.: um worker que caiu)
+# são assumidos e reaplicados, do mais antigo para o mais novo
+class Diario:
+    # Ordem de leitura dos arquivos de um processo ("" é o diário ativo)
+    SUFIXOS = (".recuperando", ".base", ".anterior", "")
+
+    def __init__(self, base: str, fsync: bool = STATUS_FILA_FSYNC):
+        self.base = base
+        self.fsync = fsync
+        self._arquivo = None
+
+    # Calculado no uso: a fila é criada no processo pai, antes do fork dos workers
+    @property
+    def caminho(self) -> str:
+        return f"{self.base}.{os.getpid()}"
+
+    def _abrir(self):
+        if self._arquivo is None:
+            os.makedirs(os.path.dirname(self.caminho) or ".", exist_ok=True)
+            self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        return self._arquivo
+
+    def _fechar(self) -> None:
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+    def registrar(self, alteracoes: list[tuple[int, str]]) -> None:
+        arquivo = self._abrir()
+        arquivo.write(_linhas(alteracoes))
+        arquivo.flush()
+        if self.fsync:
+            os.fsync(arquivo.fileno())
+
+    # Sob o lock da fila: as próximas alterações vão para um diário novo. Se a compactação
+    # anterior falhou, o .anterior é mantido e o diário ativo continua recebendo as alterações
+    def rotacionar(self) -> None:
+        self._fechar()
+        if os.path.exists(self.caminho) and not os.path.exists(f"{self.caminho}.anterior"):
+            os.replace(self.caminho, f"{self.caminho}.anterior")
+
+    # Fora do lock: `pendentes` é a cópia feita junto com a rotação
+    def compactar(self, pendentes: dict) -> None:
+        temporario = f"{self.caminho}.base.tmp"
+        with open(temporario, "w", encoding="utf-8") as arquivo:
+            arquivo.write(_linhas(pendentes.items()))
+            arquivo.flush()
+            if self.fsync:
+                os.fsync(arquivo.fileno())
+        os.replace(temporario, f"{self.caminho}.base")
+        _remover(f"{self.caminho}.anterior")
+
+    # Encerramento sem pendentes: não sobra diário para a próxima inicialização
+    def remover(self) -> None:
+        self._fechar()
+        for sufixo in self.SUFIXOS:
+            _remover(f"{self.caminho}{sufixo}")
+
+    # Alterações dos diários abandonados, na ordem em que foram aceitas
+    def recuperar(self) -> list[tuple[int, str]]:
+        pids = set()
+        for caminho in glob.glob(f"{glob.escape(self.base)}.*"):
+            pid = caminho[len(self.base) + 1:].partition(".")[0]
+            if pid.isdigit() and int(pid) != os.getpid():
+                pids.add(int(pid))
+        alteracoes = []
+        for pid in sorted(pids):
+            if _processo_ativo(pid):
+                continue
+            for sufixo in self.SUFIXOS:
+                alteracoes.extend(self._assumir(f"{self.base}.{pid}{sufixo}"))
+            _remover(f"{self.base}.{pid}.base.tmp")  # Compactação interrompida
+        return alteracoes
+
+    def _assumir(self, caminho: str) -> list[tuple[int, str]]:
+        assumido = f"{self.caminho}.recuperando"
+        try:
+            os.replace(caminho, assumido)  # Outro worker pode estar assumindo o mesmo arquivo
+        except FileNotFoundError:
+            return []
+        recuperadas = []
+        with open(assumido, encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                    recuperadas.append((int(registro["id"]), str(registro["status"])))
+                except (ValueError, KeyError, TypeError):
+                    continue  # Linha incompleta de uma escrita interrompida
+        # As alterações recuperadas entram no diário deste processo antes de apagar o antigo
+        self.registrar(recuperadas)
+        os.remove(assumido)
+        return recuperadas
+
+def _linhas(alteracoes) -> str:
+    return "".join(json.dumps({"id": id_voo, "status": status}) + "\n" for id_voo, status in alteracoes)
+
+def _remover(caminho: str) -> None:
+    try:
+        os.remove(caminho)
+    except FileNotFoundError:
+        pass
+
+def _processo_ativo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class StatusVoo(BaseModel):
+    status: str = Field(min_length=1)
+
+class ItemStatus(StatusVoo):
+    id: int
+
+# Fila cheia: 503, com o tempo sugerido para a nova tentativa
+def fila_cheia() -> HTTPException:
+    return HTTPException(status_code=503, detail=FILA_CHEIA, headers={"Retry-After": str(max(1, round(STATUS_FILA_INTERVALO)))})
+
+class FilaStatus:
+    def __init__(self, durabilidade: str = STATUS_FILA_DURABILIDADE, maximo: int = STATUS_FILA_MAX, lote: int = STATUS_FILA_LOTE):
+        self.durabilidade = durabilidade
+        self.maximo = maximo
+        self.lote = lote
+        self.diario = Diario(STATUS_FILA_DIARIO) if durabilidade == "diario" else None
+        # O diário e as pendentes mudam juntos: a compactação não pode perder uma alteração já
+        # registrada no diário e ainda não visível em _pendentes
+        self._lock = Lock()
+        self._pendentes = {}  # voo_id -> status, na ordem de chegada
+        self._gravando = {}  # Lote em gravação: continua visível para as leituras até o commit
+        self._aguardando = {}  # voo_id -> futures das requisições no modo "commit"
+        self._primeira_em = 0.0  # Instante da pendente mais antiga
+        self._acordar = None  # asyncio.Event da tarefa de gravação
+        self._espaco = None  # asyncio.Event: houve gravação (espaço livre na fila)
+        self._laco = None  # Event loop dos eventos e das futures
+        self._encerrando = False
+        self.aceitas = 0
+        self.combinadas = 0  # Alterações de um voo que já tinha status pendente
+        self.rejeitadas = 0  # Fila cheia
+        self.gravadas = 0
+        self.descartadas = 0  # Voos inexistentes
+        self.conflitos = 0  # Recusadas na gravação: a aeronave já está ocupada no horário
+        self.lotes = 0
+        self.falhas = 0
+        self.ultima_gravacao = None
+
+    def _eventos(self) -> None:
+        if self._acordar is None:
+            self._laco = asyncio.get_running_loop()
+            self._acordar = asyncio.Event()
+            self._espaco = asyncio.Event()
+
+    # Status pendentes de uma lista de voos (read-your-writes)
+    def sobrepor(self, voos: list[dict]) -> list[dict]:
+        with self._lock:
+            if not self._pendentes and not self._gravando:
+                return voos
+            for voo in voos:
+                status = self._pendentes.get(voo["id"], self._gravando.get(voo["id"]))
+                if status is not None:
+                    voo["status"] = status
+        return voos
+
+    # Executado no event loop. Devolve os índices aceitos (os demais não couberam na fila) e, no
+    # modo "commit", {indice: detalhe} das alterações recusadas na gravação por conflito de horário
+    async def enfileirar(self, alteracoes: list[tuple[int, str]]) -> tuple[list[int], dict[int, str]]:
+        self._eventos()
+        prazo = time.monotonic() + STATUS_FILA_ESPERA
+        aceitos, restantes = [], list(enumerate(alteracoes))
+        # No modo "commit", a espera de cada alteração é registrada junto com a sua entrada na fila,
+        # antes que a tarefa de gravação possa retirá-la num lote
+        futuros = [] if self.durabilidade == "commit" else None
+        while restantes:
+            if self.diario is not None and self.diario.fsync:
+                restantes, acordar = await asyncio.to_thread(self._aceitar, restantes, aceitos, futuros)
+            else:
+                restantes, acordar = self._aceitar(restantes, aceitos, futuros)
+            if acordar:
+                self._acordar.set()
+            espera = prazo - time.monotonic()
+            if not restantes or espera <= 0:
+                break
+            self._espaco.clear()
+            try:
+                await asyncio.wait_for(self._espaco.wait(), espera)
+            except asyncio.TimeoutError:
+                pass
+        self.rejeitadas += len(restantes)
+        if aceitos:
+            # O ETag de GET /voos muda com o status pendente (com vários workers, grava no banco)
+            if varios_processos():
+                await asyncio.to_thread(versoes.incrementar, ["voo"])
+            else:
+                versoes.incrementar(["voo"])
+        conflitos = {}
+        if futuros:
+            # As futures seguem a ordem de `aceitos`; cada uma traz o motivo da recusa na gravação
+            for indice, detalhe in zip(list(aceitos), await asyncio.gather(*futuros)):
+                if detalhe is not None:
+                    conflitos[indice] = detalhe
+                    aceitos.remove(indice)
+        return aceitos, conflitos
+
+    # POST /voos/status: itens validados individualmente, com os erros reportados pelo índice como
+    # nas operações em lote (services.lote)
+    async def enfileirar_lote(self, itens: list) -> dict:
+        resultado, validos = ResultadoLote(), []
+        for indice, item in enumerate(itens):
+            if isinstance(item, ItemInvalido):
+                resultado.erro(indice, item.detalhe)
+                continue
+            try:
+                item = ItemStatus.model_validate(item)
+            except ValidationError as erro:
+                resultado.erro(indice, erro.errors(include_url=False, include_context=False))
+                continue
+            validos.append((indice, (item.id, item.status)))
+        aceitos, conflitos = await self.enfileirar([alteracao for _, alteracao in validos])
+        if validos and not aceitos and not conflitos:
+            raise fila_cheia()
+        aceitos = set(aceitos)
+        for posicao, (indice, (id_voo, _)) in enumerate(validos):
+            if posicao in aceitos:
+                resultado.sucesso += 1
+                resultado.ids.append(id_voo)
+            else:
+                resultado.erro(indice, conflitos.get(posicao, FILA_CHEIA))
+        return resultado.resumo(len(itens))
+
+    # Devolve os itens recusados e se a tarefa de gravação deve ser acordada
+    def _aceitar(self, itens: list, aceitos: list, futuros: list | None = None) -> tuple[list, bool]:
+        recusados, novas, acordar = [], [], False
+        with self._lock:
+            for indice, (id_voo, status) in itens:
+                if id_voo not in self._pendentes and len(self._pendentes) >= self.maximo:
+                    recusados.append((indice, (id_voo, status)))
+                    continue
+                novas.append((id_voo, status))
+                aceitos.append(indice)
+            if novas and self.diario is not None:
+                self.diario.registrar(novas)
+            for id_voo, status in novas:
+                acordar |= self._incluir(id_voo, status)
+                if futuros is not None:
+                    futuro = self._laco.create_future()
+                    self._aguardando.setdefault(id_voo, []).append(futuro)
+                    futuros.append(futuro)
+        return recusados, acordar
+
+    def _incluir(self, id_voo: int, status: str) -> bool:
+        if not self._pendentes:
+            self._primeira_em = time.monotonic()
+        if id_voo in self._pendentes:
+            self.combinadas += 1
+            del self._pendentes[id_voo]  # Reinsere no fim: a ordem de chegada define os lotes
+        self._pendentes[id_voo] = status
+        self.aceitas += 1
+        return len(self._pendentes) == 1 or len(self._pendentes) >= self.lote
+
+    # Alterações dos diários de processos encerrados (na inicialização, sem limite da fila)
+    def recuperar(self) -> int:
+        if self.diario is None:
+            return 0
+        with self._lock:
+            alteracoes = self.diario.recuperar()
+            for id_voo, status in alteracoes:
+                self._incluir(id_voo, status)
+        if alteracoes:
+            logger.warning("%d alterações de status recuperadas do diário", len(alteracoes))
+        return len(alteracoes)
+
+    # Tarefa de fundo iniciada no lifespan da aplicação; termina com encerrar(), depois de gravar
+    # as pendentes
+    async def gravar_periodicamente(self, engine: Engine) -> None:
+        self._eventos()
+        if await asyncio.to_thread(self.recuperar):
+            self._acordar.set()
+        while not self._encerrando:
+            await self._acordar.wait()
+            self._acordar.clear()
+            espera = self._primeira_em + STATUS_FILA_INTERVALO - time.monotonic()
+            if self._pendentes and espera > 0 and len(self._pendentes) < self.lote and not self._encerrando:
+                try:
+                    await asyncio.wait_for(self._acordar.wait(), espera)  # O lote pode encher antes
+                except asyncio.TimeoutError:
+                    pass
+                self._acordar.clear()
+            await self.gravar(engine)
+
+    async def encerrar(self, tarefa: asyncio.Task) -> None:
+        self._eventos()
+        self._encerrando = True
+        self._acordar.set()
+        await tarefa
+        with self._lock:
+            if self.diario is not None and not self._pendentes:
+                self.diario.remover()
+
+    # Grava as pendentes em lotes até esvaziar a fila
+    async def gravar(self, engine: Engine) -> None:
+        self._eventos()
+        while self._pendentes:
+            with self._lock:
+                ids = list(itertools.islice(self._pendentes, self.lote))
+                self._gravando = {id_voo: self._pendentes.pop(id_voo) for id_voo in ids}
+                lote = self._gravando
+                aguardando = {id_voo: self._aguardando.pop(id_voo) for id_voo in ids if id_voo in self._aguardando}
+            try:
+                gravados, recusados = await asyncio.to_thread(self._executar, engine, lote)
+            except Exception:
+                self.falhas += 1
+                logger.exception("Falha ao gravar %d alterações de status; nova tentativa em 1s", len(lote))
+                with self._lock:
+                    # Alterações que chegaram durante a gravação são mais novas e prevalecem
+                    self._pendentes = {**lote, **self._pendentes}
+                    self._gravando = {}
+                    self._primeira_em = time.monotonic()
+                    for id_voo, futuros in aguardando.items():
+                        self._aguardando.setdefault(id_voo, [])[:0] = futuros
+                if self._encerrando:
+                    return  # As pendentes continuam no diário (modo "diario")
+                await asyncio.sleep(1)
+                continue
+
+            await asyncio.to_thread(self._concluir_lote)
+            self.lotes += 1
+            self.gravadas += gravados
+            self.conflitos += len(recusados)
+            self.descartadas += len(lote) - gravados - len(recusados)
+            self.ultima_gravacao = time.time()
+            for id_voo, futuros in aguardando.items():
+                for futuro in futuros:
+                    if not futuro.done():
+                        futuro.set_result(recusados.get(id_voo))
+            self._espaco.set()
+
+    # O lock só cobre a troca do estado e a rotação do diário: a escrita das pendentes (com
+    # fsync, se configurado) acontece fora dele, sem bloquear quem está enfileirando
+    def _concluir_lote(self) -> None:
+        with self._lock:
+            self._gravando = {}
+            if self._pendentes:
+                self._primeira_em = time.monotonic()
+            if self.diario is None:
+                return
+            self.diario.rotacionar()
+            pendentes = dict(self._pendentes)
+        try:
+            self.diario.compactar(pendentes)
+        except OSError:
+            logger.exception("Falha ao compactar o diário da fila de status")
+
+    # Um UPDATE ... SET status = CASE id ... END por lote; RETURNING traz os voos completos para
+    # as estruturas derivadas (services.alteracoes). Um voo cancelado que volta a ocupar a aeronave
+    # passa pela mesma verificação de horário das outras escritas (services.disponibilidade); os
+    # recusados não são gravados. Devolve o número de voos gravados e {voo_id: detalhe} dos recusados
+    def _executar(self, engine: Engine, lote: dict) -> tuple[int, dict[int, str]]:
+        tabela = Voo.__table__
+        with Session(engine) as session:
+            with disponibilidade.reservar_status(session, lote) as recusados:
+                gravar = {id_voo: status for id_voo, status in lote.items() if id_voo not in recusados}
+                linhas = []
+                if gravar:
+                    comando = (
+                        update(tabela)
+                        .where(tabela.c.id.in_(list(gravar)))
+                        .values(status=case(gravar, value=tabela.c.id), versao=tabela.c.versao + 1)
+                        .returning(*tabela.c)
+                    )
+                    linhas = [dict(linha._mapping) for linha in session.execute(comando)]
+                session.commit()
+        for id_voo, detalhe in recusados.items():
+            logger.warning("Status %r do voo %d recusado na gravação: %s", lote[id_voo], id_voo, detalhe)
+        # O status anterior não é lido: `antes` traz só as colunas que não mudaram
+        publicar([
+            Alteracao("voo", "update", {**_sem_status(voo), "versao": voo["versao"] - 1}, voo)
+            for voo in linhas
+        ])
+        return len(linhas), recusados
+
+    def resumo(self) -> dict:
+        with self._lock:
+            pendentes, gravando = len(self._pendentes), len(self._gravando)
+        return {
+            "durabilidade": self.durabilidade,
+            "pendentes": pendentes,
+            "gravando": gravando,
+            "capacidade": self.maximo,
+            "lote": self.lote,
+            "intervalo": STATUS_FILA_INTERVALO,
+            "aceitas": self.aceitas,
+            "combinadas": self.combinadas,
+            "rejeitadas": self.rejeitadas,
+            "gravadas": self.gravadas,
+            "descartadas": self.descartadas,
+            "conflitos": self.conflitos,
+            "lotes": self.lotes,
+            "falhas": self.falhas,
+            "ultima_gravacao": self.ultima_gravacao,
+        }
+
+def _sem_status(voo: dict) -> dict:
+    return {campo: valor for campo, valor in voo.items() if campo != "status"}
+
+fila_status = FilaStatus()
@@ -0,0 +1,298 @@
+# Operações em lote (bulk) para voos, aeronaves e companhias.
+#
+# Os itens chegam como array JSON ou como NDJSON (um objeto por linha), são validados
+# individualmente e gravados em blocos de LOTE_TAMANHO linhas, cada bloco na sua própria
+# transação com INSERT/UPDATE/DELETE executados via executemany. Itens com erro são
+# reportados pelo índice sem abortar o restante do lote. Como as instruções não passam pela
+# unidade de trabalho do ORM, as alterações de cada bloco são publicadas após o commit.
+from contextlib import nullcontext
+from fastapi import HTTPException, Request
+from pydantic import ValidationError, create_model
+from pydantic.fields import FieldInfo
+from sqlalchemy import bindparam, delete, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from services.alteracoes import Alteracao, publicar
+from services.concorrencia import COLUNA_VERSAO
+import functools
+import json
+import os
+
+LOTE_TAMANHO = int(os.getenv("LOTE_TAMANHO", "500"))
+
+# Linha NDJSON (ou elemento do array) que não pôde ser interpretada
+class ItemInvalido:
+    def __init__(self, detalhe: str):
+        self.detalhe = detalhe
+
+# Dependência que lê o corpo da requisição como array JSON ou NDJSON
+async def ler_itens_lote(request: Request) -> list:
+    if "ndjson" in request.headers.get("content-type", ""):
+        itens, pendente = [], b""
+        async for pedaco in request.stream():
+            pendente += pedaco
+            *linhas, pendente = pendente.split(b"\n")
+            itens.extend(_ler_linha(linha) for linha in linhas if linha.strip())
+        if pendente.strip():
+            itens.append(_ler_linha(pendente))
+        return itens
+
+    try:
+        itens = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Corpo inválido: esperado um array JSON ou NDJSON")
+    if not isinstance(itens, list):
+        raise HTTPException(status_code=400, detail="Corpo inválido: esperado um array JSON ou NDJSON")
+    return itens
+
+def _ler_linha(linha: bytes):
+    try:
+        return json.loads(linha)
+    except ValueError as erro:
+        return ItemInvalido(f"JSON inválido: {erro}")
+
+class ResultadoLote:
+    def __init__(self):
+        self.sucesso = 0
+        self.ids = []
+        self.erros = []
+
+    def erro(self, indice: int, detalhe) -> None:
+        self.erros.append({"indice": indice, "detalhe": detalhe})
+
+    def resumo(self, total: int) -> dict:
+        erros = sorted(self.erros, key=lambda erro: erro["indice"])
+        return {"processados": total, "sucesso": self.sucesso, "ids": self.ids, "erros": erros}
+
+# Modelo pydantic simples com os mesmos campos da tabela: validar por ele evita instanciar
+# objetos ORM (model_validate em modelos table=True é cerca de 10x mais lento)
+@functools.cache
+def _modelo_validacao(modelo):
+    campos = {nome: (campo.annotation, FieldInfo.merge_field_infos(campo)) for nome, campo in modelo.model_fields.items()}
+    return create_model(f"{modelo.__name__}Validacao", **campos)
+
+def _validar(modelo, item, resultado: ResultadoLote, indice: int):
+    if isinstance(item, ItemInvalido):
+        resultado.erro(indice, item.detalhe)
+        return None
+    if not isinstance(item, dict):
+        resultado.erro(indice, "Item deve ser um objeto JSON")
+        return None
+    try:
+        return _modelo_validacao(modelo).model_validate(item).model_dump(exclude={"id"} if item.get("id") is None else set())
+    except ValidationError as erro:
+        resultado.erro(indice, erro.errors(include_url=False, include_context=False))
+        return None
+
+def _blocos(sequencia: list, tamanho: int = LOTE_TAMANHO):
+    for inicio in range(0, len(sequencia), tamanho):
+        yield sequencia[inicio:inicio + tamanho]
+
+# Referências (chaves estrangeiras) ausentes por item; o SQLite não as verifica por padrão
+def _referencias_invalidas(session: Session, referencias: dict, linhas: list) -> dict[int, str]:
+    invalidas = {}
+    for campo, modelo in referencias.items():
+        valores = {linha[campo] for _, linha in linhas if linha.get(campo) is not None}
+        existentes = set(session.exec(select(modelo.id).where(modelo.id.in_(valores))).all()) if valores else set()
+        for indice, linha in linhas:
+            if linha.get(campo) not in existentes:
+                invalidas.setdefault(indice, f"{campo}={linha.get(campo)} não encontrado")
+    return invalidas
+
+# `reservar`, quando informado, é um gerenciador de contexto reservar(session, bloco) que valida
+# os itens do bloco contra recursos compartilhados, mantidos reservados até o commit, e devolve
+# {indice: detalhe} dos recusados (ex.: horários das aeronaves, services.disponibilidade)
+def _reservar(session: Session, reservar, bloco: list):
+    return reservar(session, bloco) if reservar is not None else nullcontext({})
+
+def inserir_em_lote(session: Session, modelo, itens: list, referencias: dict | None = None, reservar=None) -> dict:
+    resultado = ResultadoLote()
+    validos = [(indice, linha) for indice, item in enumerate(itens)
+               if (linha := _validar(modelo, item, resultado, indice)) is not None]
+
+    for bloco in _blocos(validos):
+        invalidas = _referencias_invalidas(session, referencias or {}, bloco)
+        for indice, detalhe in invalidas.items():
+            resultado.erro(indice, detalhe)
+        bloco = [(indice, linha) for indice, linha in bloco if indice not in invalidas]
+        if not bloco:
+            continue
+
+        with _reservar(session, reservar, bloco) as recusados:
+            for indice, detalhe in recusados.items():
+                resultado.erro(indice, detalhe)
+            bloco = [(indice, linha) for indice, linha in bloco if indice not in recusados]
+            if not bloco:
+                continue
+
+            try:
+                ids = session.scalars(
+                    insert(modelo).returning(modelo.id, sort_by_parameter_order=True),
+                    [linha for _, linha in bloco],
+                ).all()
+                session.commit()
+                resultado.ids.extend(ids)
+                resultado.sucesso += len(ids)
+                publicar([
+                    Alteracao(modelo.__tablename__, "insert", None, {**linha, "id": id_novo})
+                    for (_, linha), id_novo in zip(bloco, ids)
+                ])
+            except IntegrityError:
+                # Algum item viola uma restrição: refaz o bloco item a item para isolar os erros
+                session.rollback()
+                _inserir_individualmente(session, modelo, bloco, resultado)
+
+    return resultado.resumo(len(itens))
+
+def _inserir_individualmente(session: Session, modelo, bloco: list, resultado: ResultadoLote) -> None:
+    alteracoes = []
+    for indice, linha in bloco:
+        try:
+            with session.begin_nested():
+                id_novo = session.scalar(insert(modelo).returning(modelo.id), linha)
+            resultado.ids.append(id_novo)
+            resultado.sucesso += 1
+            alteracoes.append(Alteracao(modelo.__tablename__, "insert", None, {**linha, "id": id_novo}))
+        except IntegrityError as erro:
+            resultado.erro(indice, f"Restrição violada: {erro.orig}")
+    session.commit()
+    publicar(alteracoes)
+
+# UPDATE de um item: grava só os campos enviados e incrementa a versão, desde que a linha ainda
+# esteja na versão lida (services.concorrencia); sem isso, uma escrita concorrente entre a leitura
+# do bloco e o UPDATE seria sobrescrita
+@functools.cache
+def _comando_atualizacao(tabela, campos: tuple):
+    return (
+        update(tabela)
+        .where(tabela.c.id == bindparam("_id"), tabela.c[COLUNA_VERSAO] == bindparam("_versao"))
+        .values({
+            **{campo: bindparam(f"_novo_{campo}") for campo in campos},
+            COLUNA_VERSAO: tabela.c[COLUNA_VERSAO] + 1,
+        })
+    )
+
+def _gravar_item(session: Session, tabela, campos: tuple, linha: dict) -> bool:
+    parametros = {"_id": linha["id"], "_versao": linha[COLUNA_VERSAO] - 1}
+    parametros.update({f"_novo_{campo}": linha[campo] for campo in campos})
+    return session.execute(_comando_atualizacao(tabela, campos), parametros).rowcount == 1
+
+# Atualização parcial: cada item traz o id e apenas os campos a alterar. A versão da linha
+# (services.concorrencia) é incrementada; se o item informar `versao`, ela deve ser a atual
+def atualizar_em_lote(session: Session, modelo, itens: list, referencias: dict | None = None, reservar=None) -> dict:
+    resultado = ResultadoLote()
+    tabela = modelo.__table__
+    com_id = []
+    for indice, item in enumerate(itens):
+        if isinstance(item, ItemInvalido):
+            resultado.erro(indice, item.detalhe)
+        elif not isinstance(item, dict) or not isinstance(item.get("id"), int):
+            resultado.erro(indice, "Item deve ser um objeto JSON com o campo 'id'")
+        else:
+            com_id.append((indice, item))
+
+    for bloco in _blocos(com_id):
+        # Uma única consulta traz o estado atual de todo o bloco para validar o registro completo
+        atuais = {
+            registro.id: registro.model_dump()
+            for registro in session.exec(select(modelo).where(modelo.id.in_([item["id"] for _, item in bloco])))
+        }
+        validos, campos = [], {}  # campos: indice -> colunas enviadas pelo item
+        for indice, item in bloco:
+            atual = atuais.get(item["id"])
+            if atual is None:
+                resultado.erro(indice, f"id={item['id']} não encontrado")
+                continue
+            if item.get(COLUNA_VERSAO, atual[COLUNA_VERSAO]) != atual[COLUNA_VERSAO]:
+                resultado.erro(indice, f"Versão {item[COLUNA_VERSAO]} desatualizada: a versão atual é {atual[COLUNA_VERSAO]}")
+                continue
+            campos[indice] = tuple(sorted(campo for campo in item if campo in tabela.c and campo not in ("id", COLUNA_VERSAO)))
+            if not campos[indice]:
+                resultado.erro(indice, "Nenhum campo para alterar")
+                continue
+            # O registro completo é validado (e reservado) para que o resultado seja consistente
+            linha = _validar(modelo, {**atual, **item, COLUNA_VERSAO: atual[COLUNA_VERSAO] + 1}, resultado, indice)
+            if linha is not None:
+                validos.append((indice, linha))
+
+        invalidas = _referencias_invalidas(session, referencias or {}, validos)
+        for indice, detalhe in invalidas.items():
+            resultado.erro(indice, detalhe)
+        validos = [(indice, linha) for indice, linha in validos if indice not in invalidas]
+        if not validos:
+            continue
+
+        with _reservar(session, reservar, validos) as recusados:
+            for indice, detalhe in recusados.items():
+                resultado.erro(indice, detalhe)
+            validos = [(indice, linha) for indice, linha in validos if indice not in recusados]
+            if not validos:
+                continue
+
+            try:
+                gravados = [_gravar_item(session, tabela, campos[indice], linha) for indice, linha in validos]
+                session.commit()
+            except IntegrityError:
+                # Algum item viola uma restrição: refaz o bloco item a item para isolar os erros
+                session.rollback()
+                gravados = []
+                for indice, linha in validos:
+                    try:
+                        with session.begin_nested():
+                            gravados.append(_gravar_item(session, tabela, campos[indice], linha))
+                    except IntegrityError as erro:
+                        resultado.erro(indice, f"Restrição violada: {erro.orig}")
+                        gravados.append(None)
+                session.commit()
+
+            atualizados = []
+            for (indice, linha), gravado in zip(validos, gravados):
+                if gravado:
+                    atualizados.append((indice, linha))
+                elif gravado is False:
+                    # Outra escrita alterou a linha depois da leitura do bloco
+                    resultado.erro(indice, f"Versão {linha[COLUNA_VERSAO] - 1} desatualizada: o registro foi alterado por outra escrita")
+
+            resultado.ids.extend(linha["id"] for _, linha in atualizados)
+            resultado.sucesso += len(atualizados)
+            publicar([
+                Alteracao(modelo.__tablename__, "update", atuais[linha["id"]], linha)
+                for _, linha in atualizados
+            ])
+
+    return resultado.resumo(len(itens))
+
+# Exclusão: itens são ids ou objetos com o campo 'id'. Um id repetido é erro do item repetido:
+# a linha é excluída (e contada) uma única vez
+def excluir_em_lote(session: Session, modelo, itens: list) -> dict:
+    resultado = ResultadoLote()
+    ids, vistos = [], {}  # vistos: id -> índice do primeiro item com ele
+    for indice, item in enumerate(itens):
+        id_item = item.get("id") if isinstance(item, dict) else item
+        if not isinstance(id_item, int) or isinstance(id_item, bool):
+            resultado.erro(indice, "Item deve ser um id inteiro ou um objeto com o campo 'id'")
+        elif id_item in vistos:
+            resultado.erro(indice, f"id={id_item} repetido (item {vistos[id_item]})")
+        else:
+            vistos[id_item] = indice
+            ids.append((indice, id_item))
+
+    for bloco in _blocos(ids):
+        colunas = list(modelo.__table__.columns)
+        linhas_excluidas = session.execute(
+            delete(modelo).where(modelo.id.in_([id_item for _, id_item in bloco])).returning(*colunas)
+        ).all()
+        session.commit()
+        excluidos = {linha.id for linha in linhas_excluidas}
+        publicar([
+            Alteracao(modelo.__tablename__, "delete", dict(zip((coluna.name for coluna in colunas), linha)), None)
+            for linha in linhas_excluidas
+        ])
+        for indice, id_item in bloco:
+            if id_item in excluidos:
+                resultado.ids.append(id_item)
+                resultado.sucesso += 1
+            else:
+                resultado.erro(indice, f"id={id_item} não encontrado")
+
+    return resultado.resumo(len(itens))
@@ -0,0 +1,135 @@
+# Planejamento das manutenções (checks) das aeronaves, calculado em lote com NumPy.
+#
+# As aeronaves e os voos do horizonte são lidos uma única vez para arrays por coluna; vencimentos,
+# janelas de manutenção, voos em conflito e a carga por companhia são calculados com operações
+# vetorizadas, sem laços em Python por aeronave ou por voo.
+#
+# Uma aeronave está devida quando o next_check cai até `dias` dias após a referência. A janela de
+# manutenção começa no next_check (ou na referência, para checks já vencidos) e dura
+# `duracao_horas`; os voos não cancelados da aeronave que se sobrepõem à janela estão em conflito.
+# Voos arquivados (services.particoes) já terminaram e não entram no planejamento.
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import String, type_coerce
+from sqlmodel import Session, select
+from models.aeronave import Aeronave
+from models.cia import Cia
+from models.voo import Voo
+from services.disponibilidade import STATUS_LIVRE
+
+try:
+    import numpy as np
+except ImportError:  # Dependência opcional (extra "planejamento")
+    np = None
+
+# Colunas de data lidas como o driver as devolve (texto ISO no SQLite, datetime no Postgres), sem a
+# conversão linha a linha do SQLAlchemy: o NumPy converte a coluna inteira para datetime64
+def _bruto(coluna):
+    return type_coerce(coluna, String).label(coluna.key)
+
+def _datas(valores) -> "np.ndarray":
+    return np.array(valores, dtype="datetime64[us]")
+
+def planejar(session: Session, dias: int, duracao_horas: float, referencia: datetime | None = None,
+             cia_id: int | None = None) -> dict:
+    if np is None:
+        raise HTTPException(status_code=503, detail="Planejamento de manutenção requer o NumPy (extra 'planejamento')")
+    referencia = (referencia or datetime.now()).replace(tzinfo=None)
+    agora = np.datetime64(referencia, "us")
+    limite = np.datetime64(referencia + timedelta(days=dias), "us")
+    duracao = np.timedelta64(int(duracao_horas * 3600 * 1e6), "us")
+
+    # Aeronaves em colunas: uma consulta Core, sem a camada de carregamento do ORM
+    conexao = session.connection()
+    statement = select(Aeronave.id, Aeronave.modelo, Aeronave.cia_id, _bruto(Aeronave.last_check), _bruto(Aeronave.next_check))
+    if cia_id is not None:
+        statement = statement.where(Aeronave.cia_id == cia_id)
+    aeronaves = conexao.execute(statement).all()
+    ids, modelos, cias, ultimos, proximos = zip(*aeronaves) if aeronaves else ((),) * 5
+    ids = np.array(ids, dtype=np.int64)
+    cias = np.array(cias, dtype=np.int64)
+    proximos = _datas(proximos)
+
+    # Vencimentos e janelas de manutenção (NaT em next_check nunca fica devido)
+    devidas = np.flatnonzero(proximos <= limite)
+    devidas = devidas[np.argsort(proximos[devidas], kind="stable")]
+    inicio_janela = np.maximum(proximos[devidas], agora)
+    fim_janela = inicio_janela + duracao
+
+    # Voos que podem cruzar alguma janela: uma consulta limitada ao horizonte
+    voos_conflito = np.empty(0, dtype=np.int64)
+    posicao_conflito = np.empty(0, dtype=np.int64)
+    if len(devidas):
+        voos = conexao.execute(
+            select(Voo.id, Voo.aeronave_id, _bruto(Voo.hr_partida), _bruto(Voo.hr_chegada))
+            .where(Voo.hr_chegada > referencia, Voo.hr_partida < fim_janela.max().item(), Voo.status != STATUS_LIVRE)
+        ).all()
+        if voos:
+            id_voo, aeronave_voo, partidas, chegadas = zip(*voos)
+            id_voo = np.array(id_voo, dtype=np.int64)
+            aeronave_voo = np.array(aeronave_voo, dtype=np.int64)
+            partidas, chegadas = _datas(partidas), _datas(chegadas)
+
+            # Posição de cada voo entre as aeronaves devidas (busca binária nos ids ordenados)
+            ordem = np.argsort(ids[devidas])
+            ids_ordenados = ids[devidas][ordem]
+            encontrado = np.searchsorted(ids_ordenados, aeronave_voo).clip(max=len(ids_ordenados) - 1)
+            pertence = ids_ordenados[encontrado] == aeronave_voo
+            posicao = ordem[encontrado]
+            conflito = pertence & (partidas < fim_janela[posicao]) & (chegadas > inicio_janela[posicao])
+
+            selecionados = np.flatnonzero(conflito)
+            selecionados = selecionados[np.lexsort((partidas[selecionados], posicao[selecionados]))]
+            voos_conflito = id_voo[selecionados]
+            posicao_conflito = posicao[selecionados]
+
+    # Voos em conflito agrupados por aeronave devida (já ordenados por aeronave e partida)
+    por_aeronave = np.bincount(posicao_conflito, minlength=len(devidas))
+    limites = np.concatenate(([0], np.cumsum(por_aeronave))).tolist()
+    voos_conflito = voos_conflito.tolist()
+
+    # Carga por companhia: frota, devidas, vencidas e voos em conflito
+    lista_cias, indice_cia = np.unique(cias, return_inverse=True)
+    frota = np.bincount(indice_cia, minlength=len(lista_cias))
+    devidas_cia = np.bincount(indice_cia[devidas], minlength=len(lista_cias))
+    vencidas_cia = np.bincount(indice_cia[devidas], weights=proximos[devidas] < agora, minlength=len(lista_cias))
+    conflitos_cia = np.bincount(indice_cia[devidas], weights=por_aeronave, minlength=len(lista_cias))
+    nomes = dict(session.exec(select(Cia.id, Cia.nome).where(Cia.id.in_(lista_cias.tolist()))).all())
+
+    # Conversão das colunas para listas de uma vez (mais rápido que escalares NumPy item a item)
+    dias_restantes = ((proximos[devidas] - agora) / np.timedelta64(1, "D")).round(2).tolist()
+    ultimos = _datas(ultimos)[devidas].tolist()
+    vencidas = (proximos[devidas] < agora).tolist()
+    return {
+        "referencia": referencia,
+        "horizonte_dias": dias,
+        "duracao_horas": duracao_horas,
+        "aeronaves": [
+            {
+                "id": id_aeronave,
+                "modelo": modelos[indice],
+                "cia_id": cia,
+                "last_check": ultimo,
+                "next_check": proximo,
+                "vencida": vencida,
+                "dias_restantes": restantes,
+                "janela": {"inicio": inicio, "fim": fim},
+                "voos_em_conflito": voos_conflito[limites[posicao]:limites[posicao + 1]],
+            }
+            for posicao, (indice, id_aeronave, cia, ultimo, proximo, vencida, restantes, inicio, fim) in enumerate(zip(
+                devidas.tolist(), ids[devidas].tolist(), cias[devidas].tolist(), ultimos, proximos[devidas].tolist(),
+                vencidas, dias_restantes, inicio_janela.tolist(), fim_janela.tolist(),
+            ))
+        ],
+        "carga_por_cia": [
+            {
+                "cia_id": cia, "nome": nomes.get(cia), "frota": total, "devidas": devidas_total,
+                "vencidas": int(vencidas), "voos_em_conflito": int(conflitos),
+                "fracao_frota": round(devidas_total / total, 4),
+            }
+            for cia, total, devidas_total, vencidas, conflitos in zip(
+                lista_cias.tolist(), frota.tolist(), devidas_cia.tolist(), vencidas_cia.tolist(), conflitos_cia.tolist(),
+            )
+            if devidas_total
+        ],
+    }
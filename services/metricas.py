@@ -0,0 +1,212 @@
+# Métricas de desempenho por requisição, expostas em GET /metrics (formato texto do Prometheus).
+#
+# Um middleware ASGI mede cada requisição e os eventos das engines (database.py) acrescentam à
+# medição da requisição corrente o tempo gasto no banco, o número de comandos SQL e a espera por
+# uma conexão do pool. A medição fica numa ContextVar: as rotas síncronas rodam no threadpool com
+# uma cópia do contexto e as assíncronas no mesmo task, e nos dois casos alteram o mesmo objeto.
+# Tarefas de fundo (recargas, reconciliação) não têm medição e não são contadas.
+#
+# Os rótulos usam o caminho declarado da rota (/voos/{id}), não o da requisição, para que o número
+# de séries não cresça com os ids. As métricas são do processo: com vários workers, cada um tem
+# as suas.
+from contextvars import ContextVar
+from threading import Lock
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+METRICAS = os.getenv("METRICAS", "true").lower() in ("1", "true", "sim")
+METRICAS_SERVER_TIMING = os.getenv("METRICAS_SERVER_TIMING", "false").lower() in ("1", "true", "sim")
+METRICAS_ALERTA_CONSULTAS = int(os.getenv("METRICAS_ALERTA_CONSULTAS", "50"))  # 0 desativa
+
+# Limites superiores dos buckets de cada histograma
+BUCKETS_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500, 1000)
+BUCKETS_BYTES = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+class Medicao:
+    __slots__ = ("consultas", "tempo_banco", "espera_pool", "inicio_consulta")
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_banco = 0.0
+        self.espera_pool = 0.0
+        self.inicio_consulta = 0.0
+
+_medicao: ContextVar[Medicao | None] = ContextVar("medicao", default=None)
+
+# Eventos das engines (database.py)
+def antes_da_consulta(conexao, cursor, comando, parametros, contexto, varios) -> None:
+    medicao = _medicao.get()
+    if medicao is not None:
+        medicao.consultas += 1
+        medicao.inicio_consulta = time.perf_counter()
+
+def depois_da_consulta(conexao, cursor, comando, parametros, contexto, varios) -> None:
+    medicao = _medicao.get()
+    if medicao is not None:
+        medicao.tempo_banco += time.perf_counter() - medicao.inicio_consulta
+
+def registrar_espera_pool(segundos: float) -> None:
+    medicao = _medicao.get()
+    if medicao is not None:
+        medicao.espera_pool += segundos
+
+class Histograma:
+    def __init__(self, nome: str, descricao: str, buckets: tuple):
+        self.nome = nome
+        self.descricao = descricao
+        self.buckets = buckets
+        self._series = {}  # rótulos -> [contagem por bucket..., soma, contagem]
+
+    def observar(self, rotulos: tuple, valor: float) -> None:
+        serie = self._series.get(rotulos)
+        if serie is None:
+            serie = self._series[rotulos] = [0] * len(self.buckets) + [0.0, 0]
+        for posicao, limite in enumerate(self.buckets):
+            if valor <= limite:
+                serie[posicao] += 1
+                break
+        serie[-2] += valor
+        serie[-1] += 1
+
+    def exportar(self, nomes_rotulos: tuple) -> list[str]:
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} histogram"]
+        for rotulos, serie in sorted(self._series.items()):
+            base = _rotulos(nomes_rotulos, rotulos)
+            acumulado = 0
+            for limite, quantidade in zip(self.buckets, serie):
+                acumulado += quantidade
+                linhas.append(f'{self.nome}_bucket{{{base},le="{limite}"}} {acumulado}')
+            linhas.append(f'{self.nome}_bucket{{{base},le="+Inf"}} {serie[-1]}')
+            linhas.append(f"{self.nome}_sum{{{base}}} {serie[-2]}")
+            linhas.append(f"{self.nome}_count{{{base}}} {serie[-1]}")
+        return linhas
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _rotulos(nomes: tuple, valores: tuple) -> str:
+    return ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores))
+
+class Metricas:
+    ROTULOS = ("metodo", "rota")
+
+    def __init__(self):
+        self._lock = Lock()
+        self.requisicoes = {}  # (metodo, rota, status) -> total
+        self.em_andamento = 0
+        self.duracao = Histograma("http_requisicao_duracao_segundos", "Duração das requisições", BUCKETS_SEGUNDOS)
+        self.banco = Histograma("http_requisicao_banco_segundos", "Tempo gasto em comandos SQL por requisição", BUCKETS_SEGUNDOS)
+        self.consultas = Histograma("http_requisicao_consultas", "Comandos SQL por requisição", BUCKETS_CONSULTAS)
+        self.espera_pool = Histograma("http_requisicao_espera_pool_segundos", "Espera por conexões do pool por requisição", BUCKETS_SEGUNDOS)
+        self.bytes = Histograma("http_resposta_bytes", "Tamanho do corpo das respostas", BUCKETS_BYTES)
+        self._alertadas = set()  # Rotas já registradas no log por excesso de consultas
+
+    def iniciar(self) -> None:
+        with self._lock:
+            self.em_andamento += 1
+
+    def registrar(self, metodo: str, rota: str, status: int, duracao: float, medicao: Medicao, tamanho: int) -> None:
+        rotulos = (metodo, rota)
+        with self._lock:
+            self.em_andamento -= 1
+            chave = (metodo, rota, str(status))
+            self.requisicoes[chave] = self.requisicoes.get(chave, 0) + 1
+            self.duracao.observar(rotulos, duracao)
+            self.banco.observar(rotulos, medicao.tempo_banco)
+            self.consultas.observar(rotulos, medicao.consultas)
+            self.espera_pool.observar(rotulos, medicao.espera_pool)
+            self.bytes.observar(rotulos, tamanho)
+            alertar = 0 < METRICAS_ALERTA_CONSULTAS <= medicao.consultas and rotulos not in self._alertadas
+            if alertar:
+                self._alertadas.add(rotulos)
+        if alertar:
+            # Muitos comandos numa só requisição costumam indicar um N+1 (uma consulta por linha)
+            logger.warning("%s %s executou %d comandos SQL numa requisição", metodo, rota, medicao.consultas)
+
+    def exportar(self) -> list[str]:
+        with self._lock:
+            linhas = ["# HELP http_requisicoes_total Requisições atendidas", "# TYPE http_requisicoes_total counter"]
+            linhas += [
+                f"http_requisicoes_total{{{_rotulos((*self.ROTULOS, 'status'), chave)}}} {total}"
+                for chave, total in sorted(self.requisicoes.items())
+            ]
+            linhas += [
+                "# HELP http_requisicoes_em_andamento Requisições sendo atendidas",
+                "# TYPE http_requisicoes_em_andamento gauge",
+                f"http_requisicoes_em_andamento {self.em_andamento}",
+            ]
+            for histograma in (self.duracao, self.banco, self.consultas, self.espera_pool, self.bytes):
+                linhas += histograma.exportar(self.ROTULOS)
+        return linhas
+
+metricas = Metricas()
+
+# Gauges e contadores do pool de conexões por engine (database.estatisticas_pool)
+def exportar_pool(estatisticas: dict) -> list[str]:
+    series = (
+        ("db_pool_conexoes_em_uso", "gauge", "em_uso", "Conexões emprestadas pelo pool"),
+        ("db_pool_checkouts_total", "counter", "checkouts", "Conexões retiradas do pool"),
+        ("db_pool_conexoes_criadas_total", "counter", "conexoes_criadas", "Conexões abertas com o banco"),
+        ("db_pool_invalidacoes_total", "counter", "invalidacoes", "Conexões invalidadas"),
+    )
+    linhas = []
+    for nome, tipo, campo, descricao in series:
+        linhas += [f"# HELP {nome} {descricao}", f"# TYPE {nome} {tipo}"]
+        linhas += [
+            f'{nome}{{engine="{_escapar(engine)}"}} {resumo[campo]}'
+            for engine, resumo in estatisticas.items() if resumo[campo] is not None
+        ]
+    return linhas
+
+def _rota(scope) -> str:
+    # Preenchida pelo roteamento do FastAPI; sem ela (404), um rótulo fixo
+    rota = scope.get("route")
+    return getattr(rota, "path_format", None) or getattr(rota, "path", None) or "nao_encontrada"
+
+def _server_timing(duracao: float, medicao: Medicao) -> bytes:
+    return (
+        f'db;dur={medicao.tempo_banco * 1000:.2f};desc="{medicao.consultas} consultas", '
+        f"pool;dur={medicao.espera_pool * 1000:.2f}, app;dur={duracao * 1000:.2f}"
+    ).encode("latin-1")
+
+# Middleware ASGI (e não BaseHTTPMiddleware): não cria outro task por requisição e vê cada
+# mensagem enviada, inclusive os pedaços das respostas em streaming.
+# O Server-Timing vai nos cabeçalhos, antes do corpo: nas respostas em streaming ele cobre só o
+# trabalho feito até o início do envio, enquanto o histograma registra a requisição inteira.
+class MiddlewareMetricas:
+    def __init__(self, app, server_timing: bool = METRICAS_SERVER_TIMING):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicao = Medicao()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        status = 500
+        tamanho = 0
+
+        async def enviar(mensagem):
+            nonlocal status, tamanho
+            if mensagem["type"] == "http.response.start":
+                status = mensagem["status"]
+                if self.server_timing:
+                    valor = _server_timing(time.perf_counter() - inicio, medicao)
+                    mensagem["headers"] = [*mensagem.get("headers", []), (b"server-timing", valor)]
+            elif mensagem["type"] == "http.response.body":
+                tamanho += len(mensagem.get("body", b""))
+            await send(mensagem)
+
+        metricas.iniciar()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            metricas.registrar(scope["method"], _rota(scope), status, time.perf_counter() - inicio, medicao, tamanho)
+            _medicao.reset(token)
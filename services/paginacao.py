@@ -0,0 +1,66 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+import binascii
+import json
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import DateTime, tuple_
+
+# Cabeçalho com o cursor da próxima página (ausente na última página)
+CABECALHO_CURSOR = "X-Next-Cursor"
+
+# Parâmetros de paginação compartilhados pelos endpoints de listagem
+class Paginacao:
+    def __init__(
+        self,
+        cursor: str = Query(None, description="Cursor opaco retornado no cabeçalho X-Next-Cursor da página anterior"),
+        limit: int = Query(default=10, ge=1, le=100, description="Quantidade máxima de itens por página"),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+# Paginação por chave (keyset): cada página é buscada com
+# WHERE (chave) > (:cursor) ORDER BY chave LIMIT n, com custo constante
+# independentemente da profundidade. A última coluna da chave deve ser única (id).
+def paginar(session, statement, chaves, paginacao: Paginacao, response: Response) -> list:
+    nomes = [coluna.key for coluna in chaves]
+
+    if paginacao.cursor:
+        valores = decodificar_cursor(paginacao.cursor, chaves)
+        statement = statement.where(tuple_(*chaves) > tuple_(*valores))
+
+    statement = statement.order_by(*chaves).limit(paginacao.limit + 1)
+    itens = session.exec(statement).all()
+
+    # Um item a mais indica que existe próxima página
+    if len(itens) > paginacao.limit:
+        itens = itens[:paginacao.limit]
+        ultimo = itens[-1]
+        response.headers[CABECALHO_CURSOR] = codificar_cursor(nomes, [getattr(ultimo, nome) for nome in nomes])
+
+    return itens
+
+def codificar_cursor(nomes: list[str], valores: list) -> str:
+    conteudo = {"k": nomes, "v": [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores]}
+    return urlsafe_b64encode(json.dumps(conteudo, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decodificar_cursor(cursor: str, chaves) -> list:
+    try:
+        conteudo = json.loads(urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        nomes, valores = conteudo["k"], conteudo["v"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    # O cursor só vale para a mesma ordenação em que foi gerado
+    if nomes != [coluna.key for coluna in chaves] or not isinstance(valores, list) or len(valores) != len(chaves):
+        raise HTTPException(status_code=400, detail="Cursor não corresponde à ordenação solicitada")
+    # Só valores escalares chegam ao banco (listas e objetos seriam erros de parâmetro, 500)
+    if not all(isinstance(valor, (str, int, float)) for valor in valores):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    try:
+        return [
+            datetime.fromisoformat(valor) if isinstance(coluna.type, DateTime) else valor
+            for coluna, valor in zip(chaves, valores)
+        ]
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
@@ -0,0 +1,136 @@
+# Armazenamento dos voos particionado por mês de partida.
+#
+# A tabela voo é a partição "quente": voos futuros, em andamento e recentes, com as chaves
+# estrangeiras, índices de busca e demais estruturas derivadas. O arquivamento move os voos já
+# concluídos (chegada anterior ao corte) para tabelas mensais voo_arquivo_AAAAMM, pelo mês de
+# partida. As consultas por período passam pelo roteador (tabelas_voo), que devolve a partição
+# quente e apenas as mensais que se sobrepõem ao intervalo pedido.
+#
+# As tabelas mensais são tabelas comuns (SQLite e Postgres), sem chaves estrangeiras: o histórico
+# continua legível mesmo que a aeronave ou a companhia seja excluída depois.
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Index, MetaData, Table, delete, insert, inspect, select, union_all
+from sqlalchemy.engine import Engine
+from services.alteracoes import Alteracao, publicar
+from threading import Lock
+from models.voo import Voo
+import asyncio
+import logging
+import os
+import re
+import time
+
+logger = logging.getLogger(__name__)
+
+ARQUIVO_DIAS = int(os.getenv("ARQUIVO_DIAS", "30"))  # Voos com chegada há mais dias vão para o arquivo
+ARQUIVO_INTERVALO = float(os.getenv("ARQUIVO_INTERVALO", "0"))  # Segundos entre arquivamentos (0 desativa)
+ARQUIVO_LOTE = 5000  # Voos movidos por transação
+# Segundos até reler a lista de partições: outro processo pode ter criado uma partição nova
+PARTICOES_TTL = float(os.getenv("PARTICOES_TTL", "60"))
+
+PADRAO_ARQUIVO = re.compile(r"^voo_arquivo_(\d{4})(\d{2})$")
+
+_metadata = MetaData()
+_particoes = None  # {(ano, mês): Table}, lido do banco no primeiro uso e a cada PARTICOES_TTL
+_lido_em = 0.0
+_lock = Lock()
+
+def _tabela_arquivo(ano: int, mes: int) -> Table:
+    nome = f"voo_arquivo_{ano:04d}{mes:02d}"
+    if nome in _metadata.tables:
+        return _metadata.tables[nome]
+    return Table(
+        nome, _metadata,
+        *(Column(coluna.name, coluna.type, primary_key=coluna.primary_key) for coluna in Voo.__table__.columns),
+        Index(f"ix_{nome}_hr_partida_id", "hr_partida", "id"),
+    )
+
+def _carregar(engine: Engine) -> dict:
+    global _particoes, _lido_em
+    with _lock:
+        if _particoes is None or time.monotonic() - _lido_em > PARTICOES_TTL:
+            particoes = {}
+            for nome in inspect(engine).get_table_names():
+                encontrado = PADRAO_ARQUIVO.match(nome)
+                if encontrado:
+                    ano, mes = int(encontrado[1]), int(encontrado[2])
+                    particoes[(ano, mes)] = _tabela_arquivo(ano, mes)
+            _particoes = particoes
+            _lido_em = time.monotonic()
+        return _particoes
+
+def _inicio_mes(ano: int, mes: int) -> datetime:
+    return datetime(ano, mes, 1)
+
+def _fim_mes(ano: int, mes: int) -> datetime:
+    return datetime(ano + mes // 12, mes % 12 + 1, 1)
+
+def particoes(engine: Engine | None = None) -> dict:
+    if engine is None:
+        from database import engine  # Import tardio: database importa as migrações
+    return dict(sorted(_carregar(engine).items()))
+
+# Roteador: partição quente (sempre) + partições mensais que se sobrepõem a [inicio, fim]
+def tabelas_voo(inicio: datetime | None = None, fim: datetime | None = None, engine: Engine | None = None) -> list[Table]:
+    tabelas = [Voo.__table__]
+    for (ano, mes), tabela in particoes(engine).items():
+        if inicio is not None and _fim_mes(ano, mes) <= inicio:
+            continue
+        if fim is not None and _inicio_mes(ano, mes) > fim:
+            continue
+        tabelas.append(tabela)
+    return tabelas
+
+# Monta a consulta sobre as partições roteadas: construir(tabela) devolve o SELECT de uma
+# partição (com os filtros aplicados). Devolve o SELECT final e as colunas para ordenar/paginar.
+def consultar_particoes(construir, inicio: datetime | None = None, fim: datetime | None = None):
+    consultas = [construir(tabela) for tabela in tabelas_voo(inicio, fim)]
+    if len(consultas) == 1:
+        return consultas[0], Voo.__table__.c
+    uniao = union_all(*consultas).subquery("voos")
+    return select(*uniao.c), uniao.c
+
+# Move os voos com chegada anterior a `corte` para as partições mensais; devolve o total movido
+def arquivar(engine: Engine, corte: datetime | None = None) -> int:
+    global _particoes
+    corte = corte or datetime.now() - timedelta(days=ARQUIVO_DIAS)
+    colunas = list(Voo.__table__.columns)
+    movidos = 0
+    while True:
+        with engine.begin() as conexao:
+            # Os ids continuam únicos entre as partições: voo.id nunca é reutilizado (AUTOINCREMENT
+            # no SQLite, criado por migracoes.criar_autoincremento_voo em bancos antigos)
+            linhas = conexao.execute(
+                select(*colunas).where(Voo.hr_chegada < corte).order_by(Voo.id).limit(ARQUIVO_LOTE)
+            ).all()
+            if not linhas:
+                break
+
+            por_mes = {}
+            for linha in linhas:
+                por_mes.setdefault((linha.hr_partida.year, linha.hr_partida.month), []).append(linha._asdict())
+            for (ano, mes), voos in por_mes.items():
+                tabela = _tabela_arquivo(ano, mes)
+                tabela.create(conexao, checkfirst=True)
+                conexao.execute(insert(tabela), voos)
+            conexao.execute(delete(Voo.__table__).where(Voo.id.in_([linha.id for linha in linhas])))
+
+        with _lock:
+            _particoes = None  # Novas partições podem ter sido criadas
+        movidos += len(linhas)
+        # Os voos continuam existindo (no arquivo): os ouvintes decidem o que isso significa
+        publicar([Alteracao("voo", "arquivamento", linha._asdict(), None) for linha in linhas])
+    if movidos:
+        logger.info("Arquivamento: %d voos com chegada anterior a %s", movidos, corte.isoformat())
+    return movidos
+
+# Tarefa de fundo iniciada no lifespan da aplicação (ARQUIVO_INTERVALO > 0)
+async def arquivar_periodicamente(engine: Engine) -> None:
+    if ARQUIVO_INTERVALO <= 0:
+        return
+    while True:
+        await asyncio.sleep(ARQUIVO_INTERVALO)
+        try:
+            await asyncio.to_thread(arquivar, engine)
+        except Exception:
+            logger.exception("Falha no arquivamento de voos")
@@ -0,0 +1,46 @@
+# Caminho rápido de serialização para as listagens.
+#
+# As consultas selecionam apenas as colunas (tuplas/Row, sem instâncias do ORM) e o corpo é
+# codificado uma única vez: a rota devolve a Response pronta, então o FastAPI não revalida os
+# itens contra o response_model. Com o orjson instalado (extra "rapido") a codificação usa
+# ORJSONResponse; sem ele, o json da biblioteca padrão com a mesma saída.
+from datetime import date, datetime
+from fastapi import Response
+from fastapi.responses import JSONResponse, ORJSONResponse
+import json
+
+try:
+    import orjson
+except ImportError:  # Dependência opcional
+    orjson = None
+
+class _JSONPadrao(JSONResponse):
+    def render(self, content) -> bytes:
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_converter,
+        ).encode("utf-8")
+
+def _converter(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+RespostaJSON = ORJSONResponse if orjson is not None else _JSONPadrao
+
+# Colunas da tabela de um modelo, na ordem dos campos, para select(*colunas(Modelo))
+def colunas(modelo) -> list:
+    return list(modelo.__table__.columns)
+
+def como_dicts(linhas) -> list[dict]:
+    return [dict(linha._mapping) for linha in linhas]
+
+# Response já codificada, com os cabeçalhos que dependências e a rota definiram em `response`
+# (ETag, X-Next-Cursor...), que o FastAPI não copia quando a rota devolve uma Response
+def resposta_json(conteudo, response: Response | None = None) -> Response:
+    resposta = RespostaJSON(conteudo)
+    if response is not None:
+        resposta.raw_headers.extend(
+            (nome, valor) for nome, valor in response.raw_headers
+            if nome not in (b"content-length", b"content-type")
+        )
+    return resposta
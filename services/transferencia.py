@@ -0,0 +1,197 @@
+# Importação e exportação em streaming (CSV e NDJSON) das tabelas voo, aeronave e cia.
+#
+# A exportação lê o banco em blocos (yield_per) e devolve o arquivo aos pedaços; a importação
+# interpreta as linhas incrementalmente, resolve as referências (cia_id/aeronave_id) com um
+# lookup em memória carregado uma única vez e grava em lotes. A memória usada depende do
+# tamanho do lote e das tabelas de referência, não da quantidade de linhas transferidas.
+from datetime import datetime
+from sqlmodel import Session, select
+from models.aeronave import Aeronave
+from models.cia import Cia
+from models.voo import Voo
+from services.lote import LOTE_TAMANHO, inserir_em_lote
+from services.particoes import tabelas_voo
+import csv
+import io
+import json
+
+MODELOS = {"voo": Voo, "aeronave": Aeronave, "cia": Cia}
+FORMATOS = ("csv", "ndjson")
+
+# Máximo de erros detalhados no resumo (os demais são apenas contados)
+MAXIMO_ERROS_DETALHADOS = 1000
+
+def _valor(valor):
+    return valor.isoformat() if isinstance(valor, datetime) else valor
+
+def exportar(engine, modelo, formato: str):
+    nomes = [coluna.name for coluna in modelo.__table__.columns]
+    # Voos: partições de arquivo (mais antigas primeiro) e depois a partição quente
+    tabelas = [modelo.__table__]
+    if modelo is Voo:
+        tabelas = tabelas_voo(engine=engine)
+        tabelas = tabelas[1:] + tabelas[:1]
+
+    with Session(engine) as session:
+        blocos = (
+            linhas
+            for tabela in tabelas
+            for linhas in session.exec(
+                select(*tabela.columns).order_by(tabela.c.id).execution_options(yield_per=LOTE_TAMANHO)
+            ).partitions()
+        )
+        if formato == "csv":
+            buffer = io.StringIO()
+            escritor = csv.writer(buffer)
+            escritor.writerow(nomes)
+            for linhas in blocos:
+                escritor.writerows([[_valor(valor) for valor in linha] for linha in linhas])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+        else:
+            for linhas in blocos:
+                yield "".join(
+                    json.dumps(dict(zip(nomes, map(_valor, linha))), ensure_ascii=False) + "\n"
+                    for linha in linhas
+                )
+
+# Interpreta linhas de texto (sem quebra de linha) de CSV ou NDJSON em dicionários. Um registro
+# CSV pode ocupar várias linhas (campo entre aspas com quebra de linha, como o csv.writer da
+# exportação grava): as linhas são juntadas até as aspas fecharem (número par de aspas, já que
+# aspas dentro do campo são duplicadas) e só registros completos vão ao csv.reader. `final`
+# indica o fim do arquivo: um registro com aspas não fechadas é interpretado como está.
+class LeitorLinhas:
+    def __init__(self, formato: str):
+        self.formato = formato
+        self.cabecalho = None
+        self._incompleto = []  # Linhas do registro CSV em andamento
+        self._aspas = 0
+
+    def _registros_csv(self, linhas: list[str], final: bool) -> list[str]:
+        completos = []
+        for linha in linhas:
+            self._incompleto.append(linha)
+            self._aspas += linha.count('"')
+            if self._aspas % 2 == 0:
+                completos.append("\n".join(self._incompleto).rstrip("\r"))
+                self._incompleto, self._aspas = [], 0
+        if final and self._incompleto:
+            completos.append("\n".join(self._incompleto).rstrip("\r"))
+            self._incompleto, self._aspas = [], 0
+        return [registro for registro in completos if registro.strip()]
+
+    def ler(self, linhas: list[str], final: bool = False) -> list:
+        if self.formato == "ndjson":
+            linhas = [linha.rstrip("\r") for linha in linhas if linha.strip()]
+            registros = []
+            for linha in linhas:
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError as erro:
+                    registros.append(ValueError(f"JSON inválido: {erro}"))
+            return registros
+
+        registros = []
+        for valores in csv.reader(self._registros_csv(linhas, final)):
+            if self.cabecalho is None:
+                self.cabecalho = [nome.strip() for nome in valores]
+                continue
+            # Campos vazios no CSV são tratados como ausentes
+            registros.append({nome: valor for nome, valor in zip(self.cabecalho, valores) if valor != ""})
+        return registros
+
+class Importador:
+    def __init__(self, session: Session, modelo):
+        self.session = session
+        self.modelo = modelo
+        self.pendentes = []  # (número da linha, registro)
+        self.linha = 0
+        self.processados = 0
+        self.sucesso = 0
+        self.total_erros = 0
+        self.erros = []
+
+        # Lookups em memória para resolver e validar referências sem consultar o banco por linha
+        self.cias_por_iata = {}
+        self.ids_cias = set()
+        self.ids_aeronaves = set()
+        if modelo in (Voo, Aeronave):
+            for id_cia, cod_iata in session.exec(select(Cia.id, Cia.cod_iata)):
+                self.cias_por_iata[cod_iata] = id_cia
+                self.ids_cias.add(id_cia)
+        if modelo is Voo:
+            self.ids_aeronaves = set(session.exec(select(Aeronave.id)).all())
+
+    def _erro(self, linha: int, detalhe) -> None:
+        self.total_erros += 1
+        if len(self.erros) < MAXIMO_ERROS_DETALHADOS:
+            self.erros.append({"linha": linha, "detalhe": detalhe})
+
+    def _resolver(self, registro: dict) -> str | None:
+        if self.modelo not in (Voo, Aeronave):
+            return None
+        # A companhia pode vir pelo id ou pelo código IATA (coluna cod_iata)
+        cod_iata = registro.pop("cod_iata", None)
+        if registro.get("cia_id") is None and cod_iata is not None:
+            if cod_iata not in self.cias_por_iata:
+                return f"cod_iata={cod_iata} não encontrado"
+            registro["cia_id"] = self.cias_por_iata[cod_iata]
+        elif _inteiro(registro.get("cia_id")) not in self.ids_cias:
+            return f"cia_id={registro.get('cia_id')} não encontrado"
+        if self.modelo is Voo and _inteiro(registro.get("aeronave_id")) not in self.ids_aeronaves:
+            return f"aeronave_id={registro.get('aeronave_id')} não encontrado"
+        return None
+
+    def adicionar(self, registros: list) -> None:
+        for registro in registros:
+            self.linha += 1
+            self.processados += 1
+            if isinstance(registro, Exception):
+                self._erro(self.linha, str(registro))
+                continue
+            if not isinstance(registro, dict):
+                self._erro(self.linha, "Registro deve ser um objeto JSON")
+                continue
+            erro = self._resolver(registro)
+            if erro:
+                self._erro(self.linha, erro)
+                continue
+            self.pendentes.append((self.linha, registro))
+            if len(self.pendentes) >= LOTE_TAMANHO:
+                self.gravar()
+
+    def gravar(self) -> None:
+        if not self.pendentes:
+            return
+        resultado = inserir_em_lote(self.session, self.modelo, [registro for _, registro in self.pendentes])
+        self.sucesso += resultado["sucesso"]
+        for erro in resultado["erros"]:
+            self._erro(self.pendentes[erro["indice"]][0], erro["detalhe"])
+        self.pendentes = []
+
+    def resumo(self) -> dict:
+        return {"processados": self.processados, "sucesso": self.sucesso,
+                "total_erros": self.total_erros, "erros": self.erros}
+
+def _inteiro(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+# Importa de um iterável de linhas de texto (ex.: um arquivo aberto)
+def importar_arquivo(engine, modelo, formato: str, linhas) -> dict:
+    leitor = LeitorLinhas(formato)
+    with Session(engine) as session:
+        importador = Importador(session, modelo)
+        bloco = []
+        for linha in linhas:
+            bloco.append(linha.rstrip("\n"))
+            if len(bloco) >= LOTE_TAMANHO:
+                importador.adicionar(leitor.ler(bloco))
+                bloco = []
+        importador.adicionar(leitor.ler(bloco, final=True))
+        importador.gravar()
+        return importador.resumo()
@@ -0,0 +1,162 @@
+# Versões por tabela para requisições condicionais (ETag / If-None-Match).
+#
+# Cada alteração confirmada (services.alteracoes) incrementa a versão das tabelas envolvidas,
+# qualquer que seja o caminho de escrita (rotas individuais, /bulk, importação). O ETag de uma
+# resposta GET é derivado das versões das tabelas que ela lê; quando o cliente envia um ETag
+# igual ao atual, a resposta é 304 sem consultar o banco nem serializar o corpo.
+#
+# Com um único processo, as versões ficam em memória: o identificador de inicialização no ETag
+# evita colisões após um reinício, mas escritas feitas direto no banco não são percebidas. Com
+# vários workers (database.varios_processos), elas ficam na tabela versao_tabela, incrementada
+# após cada commit e lida por cada requisição condicional (uma consulta pela chave primária): uma
+# escrita em um worker muda o ETag de todos. Com réplicas de leitura, o corpo pode vir de uma
+# réplica atrasada em relação às versões do primário; nesse caso as respostas não levam ETag.
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from fastapi import HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, select, update
+from sqlalchemy.engine import Engine
+from services.alteracoes import ouvinte
+from threading import Lock
+import os
+import secrets
+import zlib
+
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "0"))  # Segundos (0 = sempre revalidar)
+
+# Identifica esta execução do processo
+INICIALIZACAO = secrets.token_hex(4)
+
+TABELAS = ("voo", "aeronave", "cia")
+
+# Versões compartilhadas entre workers (fora do metadata do SQLModel: criada por criar_tabela_versoes).
+# A linha de tabela "" guarda um identificador do banco, com o papel de INICIALIZACAO
+_metadata = MetaData()
+versao_tabela = Table(
+    "versao_tabela", _metadata,
+    Column("tabela", String, primary_key=True),
+    Column("versao", Integer, nullable=False),
+    Column("modificada_em", DateTime, nullable=False),
+)
+
+def criar_tabela_versoes(engine: Engine) -> None:
+    _metadata.create_all(engine)
+    agora = datetime.now(timezone.utc).replace(microsecond=0, tzinfo=None)
+    with engine.begin() as conexao:
+        existentes = set(conexao.execute(select(versao_tabela.c.tabela)).scalars())
+        novas = [
+            {"tabela": tabela, "versao": secrets.randbits(31) if tabela == "" else 0, "modificada_em": agora}
+            for tabela in ("", *TABELAS) if tabela not in existentes
+        ]
+        if novas:
+            conexao.execute(insert(versao_tabela), novas)
+
+# Importada no uso: database importa este módulo indiretamente (migracoes)
+def _engine() -> Engine:
+    from database import engine
+    return engine
+
+def _compartilhadas() -> bool:
+    from database import varios_processos
+    return varios_processos()
+
+def _com_replicas() -> bool:
+    from database import DATABASE_URL_REPLICAS
+    return bool(DATABASE_URL_REPLICAS)
+
+class Versoes:
+    def __init__(self):
+        self._lock = Lock()
+        self._versoes = {}  # tabela -> versão
+        inicio = datetime.now(timezone.utc).replace(microsecond=0)
+        self._modificadas_em = {"": inicio}  # tabela -> última alteração ("" = inicialização)
+
+    def incrementar(self, tabelas) -> None:
+        agora = datetime.now(timezone.utc).replace(microsecond=0)
+        with self._lock:
+            for tabela in tabelas:
+                self._versoes[tabela] = self._versoes.get(tabela, 0) + 1
+                self._modificadas_em[tabela] = agora
+        compartilhadas = [tabela for tabela in tabelas if tabela in TABELAS]
+        if compartilhadas and _compartilhadas():
+            with _engine().begin() as conexao:
+                conexao.execute(
+                    update(versao_tabela).where(versao_tabela.c.tabela.in_(compartilhadas))
+                    .values(versao=versao_tabela.c.versao + 1, modificada_em=agora.replace(tzinfo=None))
+                )
+
+    # ETag e data da última alteração das tabelas
+    def ler(self, tabelas) -> tuple[str, datetime]:
+        if _compartilhadas():
+            return self._ler_banco(tabelas)
+        with self._lock:
+            versoes = "-".join(str(self._versoes.get(tabela, 0)) for tabela in tabelas)
+            modificadas_em = max(self._modificadas_em.get(tabela, self._modificadas_em[""]) for tabela in tabelas)
+        return f'W/"{INICIALIZACAO}-{versoes}"', modificadas_em
+
+    def _ler_banco(self, tabelas) -> tuple[str, datetime]:
+        with _engine().connect() as conexao:
+            linhas = {
+                linha.tabela: linha for linha in conexao.execute(
+                    select(versao_tabela).where(versao_tabela.c.tabela.in_(("", *tabelas)))
+                )
+            }
+        versoes = "-".join(str(linhas[tabela].versao if tabela in linhas else 0) for tabela in tabelas)
+        modificadas_em = max(linha.modificada_em for linha in linhas.values())
+        return f'W/"{linhas[""].versao:x}-{versoes}"', modificadas_em.replace(tzinfo=timezone.utc)
+
+    def resumo(self) -> dict:
+        if _compartilhadas():
+            with _engine().connect() as conexao:
+                linhas = list(conexao.execute(select(versao_tabela).where(versao_tabela.c.tabela != "")))
+            return {
+                "origem": "banco",
+                "versoes": {linha.tabela: linha.versao for linha in linhas},
+                "modificadas_em": {linha.tabela: linha.modificada_em.replace(tzinfo=timezone.utc) for linha in linhas},
+            }
+        with self._lock:
+            return {
+                "origem": "processo",
+                "inicializacao": INICIALIZACAO,
+                "versoes": dict(self._versoes),
+                "modificadas_em": {tabela: data for tabela, data in self._modificadas_em.items() if tabela},
+            }
+
+versoes = Versoes()
+
+@ouvinte
+def _incrementar(alteracoes) -> None:
+    versoes.incrementar({alteracao.tabela for alteracao in alteracoes})
+
+def _corresponde(if_none_match: str | None, etag: str) -> bool:
+    # Comparação fraca (RFC 9110): ignora o prefixo W/
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag.removeprefix("W/") in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+# Dependência das rotas GET: responde 304 se o ETag do cliente ainda é o atual e,
+# caso contrário, acrescenta ETag, Last-Modified e Cache-Control à resposta.
+# O ETag é lido antes da consulta: uma escrita concorrente só pode torná-lo mais antigo.
+# `relogio`: parâmetro de consulta cujo padrão é "agora". Sem ele a resposta muda com o relógio,
+# não só com as tabelas, e vai sem ETag; com ele, o valor informado entra no ETag.
+def condicional(*tabelas: str, relogio: str | None = None):
+    async def verificar(request: Request, response: Response) -> dict:
+        cabecalhos = {"Cache-Control": f"max-age={HTTP_CACHE_MAX_AGE}" if HTTP_CACHE_MAX_AGE else "no-cache"}
+        if _com_replicas() or (relogio and not request.query_params.get(relogio)):
+            response.headers.update(cabecalhos)
+            return cabecalhos
+        if _compartilhadas():
+            etag, modificadas_em = await run_in_threadpool(versoes.ler, tabelas)
+        else:
+            etag, modificadas_em = versoes.ler(tabelas)
+        if relogio:
+            etag = f'{etag[:-1]}-{zlib.crc32(request.query_params[relogio].encode()):08x}"'
+        cabecalhos.update({"ETag": etag, "Last-Modified": format_datetime(modificadas_em, usegmt=True)})
+        if _corresponde(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=304, headers=cabecalhos)
+        response.headers.update(cabecalhos)
+        return cabecalhos
+    return verificar
@@ -0,0 +1,113 @@
+# Modo de produção com vários workers (python cli.py servir --workers N).
+#
+# O processo pai prepara o esquema do banco uma única vez, importa a aplicação (modelos, routers e
+# esquema OpenAPI) e inicializa os dialetos das engines; depois abre o socket e faz fork dos
+# workers, que herdam tudo isso já carregado e só iniciam o uvicorn sobre o socket compartilhado.
+# Cada worker tem os próprios pools de conexões: o pai fecha as suas antes do fork.
+#
+# O pai supervisiona os workers: recria os que terminam inesperadamente e repassa SIGINT/SIGTERM
+# para que encerrem as requisições em andamento. Sem os.fork (Windows), os workers são criados
+# pelo próprio uvicorn, e cada um importa a aplicação.
+import gc
+import logging
+import os
+import signal
+import time
+
+import uvicorn
+from sqlalchemy.orm import configure_mappers
+
+from database import create_db_and_tables, descartar_conexoes, engine, esquema_pronto, replicas
+
+# Logger do uvicorn: já configurado (formato e nível) pelo uvicorn.Config
+logger = logging.getLogger("uvicorn.error")
+
+REINICIO_MINIMO = 5.0  # Segundos de vida abaixo dos quais um worker que caiu é recriado com atraso
+
+def _aquecer():
+    # Importada aqui: o lifespan consulta DB_ESQUEMA_PRONTO, definido antes deste import
+    from main import app
+
+    configure_mappers()
+    app.openapi()  # Gerado uma vez e guardado em app.openapi_schema
+    # A primeira conexão inicializa o dialeto (versão do servidor, capacidades); as engines
+    # assíncronas só conectam dentro do event loop de cada worker
+    for engine_sync in (engine, *replicas):
+        with engine_sync.connect():
+            pass
+    descartar_conexoes()
+    # Objetos da inicialização ficam fora da coleta de lixo: os workers não tocam nessas páginas
+    # de memória herdadas, que continuam compartilhadas com o pai
+    gc.collect()
+    gc.freeze()
+    return app
+
+def _worker(config: uvicorn.Config, socket) -> int:
+    # Grupo de processos próprio: o Ctrl+C do terminal chega só ao pai, que repassa um único SIGTERM
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    servidor = uvicorn.Server(config)
+    servidor.run(sockets=[socket])
+    return 0 if servidor.started else 3  # Mesmo código do uvicorn para falha na inicialização
+
+def servir(host: str, porta: int, workers: int, log_level: str = "info") -> None:
+    # Antes de importar a aplicação: os serviços consultam o número de processos (varios_processos)
+    os.environ["SERVIDOR_WORKERS"] = str(workers)
+    if not esquema_pronto():
+        create_db_and_tables()
+        os.environ["DB_ESQUEMA_PRONTO"] = "1"
+
+    if not hasattr(os, "fork"):
+        uvicorn.run("main:app", host=host, port=porta, workers=workers, log_level=log_level)
+        return
+
+    config = uvicorn.Config(_aquecer(), host=host, port=porta, log_level=log_level)
+    socket = config.bind_socket()
+
+    filhos = {}  # pid -> instante de início
+    encerrando = False
+
+    def iniciar() -> None:
+        pid = os.fork()
+        if pid == 0:
+            codigo = 1
+            try:
+                codigo = _worker(config, socket)
+            except BaseException:
+                logger.exception("Falha no worker %d", os.getpid())
+            finally:
+                os._exit(codigo)
+        filhos[pid] = time.monotonic()
+        if encerrando:  # Sinal recebido durante o fork
+            os.kill(pid, signal.SIGTERM)
+
+    def encerrar(sinal, quadro) -> None:
+        nonlocal encerrando
+        encerrando = True
+        for pid in filhos:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, encerrar)
+    signal.signal(signal.SIGTERM, encerrar)
+    for _ in range(workers):
+        iniciar()
+    logger.info("Servindo em http://%s:%d com %d workers (supervisor pid %d)", host, porta, workers, os.getpid())
+
+    while filhos:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        inicio = filhos.pop(pid, None)
+        if inicio is None or encerrando:
+            continue
+        logger.warning("Worker %d terminou (status %d); iniciando outro", pid, os.waitstatus_to_exitcode(status))
+        if time.monotonic() - inicio < REINICIO_MINIMO:
+            time.sleep(1)  # Evita recriar em laço um worker que falha na inicialização
+        if not encerrando:
+            iniciar()
+    socket.close()
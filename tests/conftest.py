@@ -0,0 +1,61 @@
+# Os testes usam um banco SQLite temporário, e o diário da fila de status fica no mesmo diretório.
+# A configuração é lida na importação dos módulos, por isso as variáveis são definidas aqui, antes
+# de qualquer importação do aplicativo.
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+import itertools
+import logging
+import os
+import pytest
+import tempfile
+
+DIRETORIO = tempfile.mkdtemp(prefix="tp2-testes-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DIRETORIO, 'testes.db')}"
+os.environ["STATUS_FILA_DIARIO"] = os.path.join(DIRETORIO, "status_pendentes.ndjson")
+os.environ["STATUS_FILA_INTERVALO"] = "0.05"
+
+_sequencia = itertools.count(1)
+
+# Um único aplicativo para a sessão de testes: o lifespan inicia as tarefas de fundo (fila de status,
+# recargas) uma vez. Cada teste cria as próprias cias, aeronaves e voos para não depender dos outros
+@pytest.fixture(scope="session")
+def cliente():
+    import main
+
+    logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+    with TestClient(main.app) as cliente:
+        yield cliente
+
+class Dados:
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def cia(self, **campos) -> dict:
+        numero = next(_sequencia)
+        resposta = self.cliente.post("/cias/", json={"nome": f"Cia Teste {numero:05d}", "cod_iata": f"T{numero:05d}", **campos})
+        assert resposta.status_code == 200, resposta.text
+        return resposta.json()
+
+    def aeronave(self, cia: dict | None = None, **campos) -> dict:
+        cia = cia or self.cia()
+        resposta = self.cliente.post("/aeronaves/", json={"modelo": "A320", "capacidade": 180, "cia_id": cia["id"], **campos})
+        assert resposta.status_code == 200, resposta.text
+        return resposta.json()
+
+    # Voo de `duracao` horas partindo `inicio` horas depois de 2030-01-01
+    def voo(self, aeronave: dict, inicio: float = 0, duracao: float = 2, **campos) -> dict:
+        resposta = self.cliente.post("/voos/", json=self.dados_voo(aeronave, inicio, duracao, **campos))
+        assert resposta.status_code == 200, resposta.text
+        return resposta.json()
+
+    def dados_voo(self, aeronave: dict, inicio: float = 0, duracao: float = 2, **campos) -> dict:
+        partida = datetime(2030, 1, 1) + timedelta(hours=inicio)
+        return {
+            "numero_voo": next(_sequencia), "origem": "GRU", "destino": "GIG",
+            "hr_partida": partida.isoformat(), "hr_chegada": (partida + timedelta(hours=duracao)).isoformat(),
+            "status": "Agendado", "aeronave_id": aeronave["id"], "cia_id": aeronave["cia_id"], **campos,
+        }
+
+@pytest.fixture
+def dados(cliente):
+    return Dados(cliente)
@@ -0,0 +1,70 @@
+from contextlib import contextmanager
+from sqlalchemy import text
+from sqlmodel import Session
+import pytest
+
+# As respostas e os eventos das escritas parciais levam valores já validados (datas como datetime)
+pytestmark = pytest.mark.filterwarnings("error::UserWarning")
+
+def test_patch_com_versao_desatualizada_responde_409(cliente, dados):
+    voo = dados.voo(dados.aeronave(), inicio=100)
+
+    resposta = cliente.patch(f"/voos/{voo['id']}", json={"origem": "CNF", "versao": voo["versao"]})
+    assert resposta.status_code == 200
+    assert resposta.json()["versao"] == voo["versao"] + 1
+
+    resposta = cliente.patch(f"/voos/{voo['id']}", json={"origem": "POA", "versao": voo["versao"]})
+    assert resposta.status_code == 409
+    assert cliente.get("/voos/", params={"id": voo["id"]}).json()[0]["origem"] == "CNF"
+
+def test_patch_em_lote_recusa_apenas_os_itens_desatualizados(cliente, dados):
+    cia = dados.cia()
+    atual, antiga = dados.aeronave(cia), dados.aeronave(cia)
+    cliente.patch(f"/aeronaves/{antiga['id']}", json={"capacidade": 150})
+
+    resposta = cliente.patch("/aeronaves/bulk", json=[
+        {"id": atual["id"], "capacidade": 200, "versao": atual["versao"]},
+        {"id": antiga["id"], "capacidade": 120, "versao": antiga["versao"]},
+    ])
+    resultado = resposta.json()
+    assert resultado["sucesso"] == 1
+    assert [erro["indice"] for erro in resultado["erros"]] == [1]
+    assert cliente.get(f"/aeronaves/{atual['id']}").json()["capacidade"] == 200
+    assert cliente.get(f"/aeronaves/{antiga['id']}").json()["capacidade"] == 150
+
+# A versão é conferida no próprio UPDATE: uma escrita confirmada entre a leitura do bloco e a
+# gravação não é sobrescrita
+def test_patch_em_lote_nao_sobrescreve_escrita_concorrente(cliente, dados):
+    from database import engine
+    from models.voo import Voo
+    from services.lote import atualizar_em_lote
+
+    voo = dados.voo(dados.aeronave(), inicio=110)
+
+    @contextmanager
+    def escrita_concorrente(session, bloco):
+        with engine.begin() as conexao:
+            conexao.execute(text("UPDATE voo SET origem = 'REC', versao = versao + 1 WHERE id = :id"), {"id": voo["id"]})
+        yield {}
+
+    with Session(engine) as session:
+        resultado = atualizar_em_lote(session, Voo, [{"id": voo["id"], "status": "Atrasado"}], reservar=escrita_concorrente)
+
+    assert resultado["sucesso"] == 0
+    assert "desatualizada" in resultado["erros"][0]["detalhe"]
+    gravado = cliente.get("/voos/", params={"id": voo["id"]}).json()[0]
+    assert (gravado["origem"], gravado["status"], gravado["versao"]) == ("REC", "Agendado", voo["versao"] + 1)
+
+def test_patch_em_lote_publica_valores_validados(cliente, dados, monkeypatch):
+    from datetime import datetime
+    from services import alteracoes
+
+    voo = dados.voo(dados.aeronave(), inicio=120)
+    publicadas = []
+    monkeypatch.setattr(alteracoes, "_ouvintes", [*alteracoes._ouvintes, publicadas.extend])
+
+    resposta = cliente.patch("/voos/bulk", json=[{"id": voo["id"], "hr_chegada": "2030-01-06T03:00:00", "versao": voo["versao"]}])
+    assert resposta.json()["sucesso"] == 1
+    (alteracao,) = [alteracao for alteracao in publicadas if alteracao.id == voo["id"]]
+    assert alteracao.depois["hr_chegada"] == datetime(2030, 1, 6, 3)
+    assert cliente.get("/voos/", params={"id": voo["id"]}).json()[0]["hr_chegada"] == "2030-01-06T03:00:00"
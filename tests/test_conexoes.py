@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+import itertools
+
+_aeroportos = itertools.count(1)
+
+def _rede(dados) -> dict:
+    # Aeroportos exclusivos do teste: a rede de voos é a mesma para todos os testes
+    numero = next(_aeroportos)
+    a, b, c = (f"{nome}{numero:03d}" for nome in "ABC")
+    voos = {
+        "a_b": dados.voo(dados.aeronave(), inicio=400, duracao=1, origem=a, destino=b),  # 16:00-17:00
+        "b_c_curta": dados.voo(dados.aeronave(), inicio=401.5, duracao=1.5, origem=b, destino=c),  # 17:30-19:00
+        "b_c": dados.voo(dados.aeronave(), inicio=402, duracao=2, origem=b, destino=c),  # 18:00-20:00
+        "a_c": dados.voo(dados.aeronave(), inicio=400.5, duracao=4.5, origem=a, destino=c),  # 16:30-21:00
+    }
+    return {"a": a, "c": c, "voos": voos}
+
+def _buscar(cliente, rede: dict, headers: dict | None = None, **parametros):
+    partida = (datetime(2030, 1, 1) + timedelta(hours=399)).isoformat()
+    parametros = {"origem": rede["a"], "destino": rede["c"], "partida_apos": partida, **parametros}
+    return cliente.get("/voos/conexoes", params=parametros, headers=headers)
+
+def test_menor_chegada_respeita_o_tempo_minimo_de_conexao(cliente, dados):
+    rede = _rede(dados)
+    voos = rede["voos"]
+
+    viagem = _buscar(cliente, rede, conexao_minima=45).json()
+    assert [voo["id"] for voo in viagem["voos"]] == [voos["a_b"]["id"], voos["b_c"]["id"]]
+    assert (viagem["conexoes"], viagem["duracao_minutos"]) == (1, 240)
+
+    viagem = _buscar(cliente, rede, conexao_minima=30).json()
+    assert [voo["id"] for voo in viagem["voos"]] == [voos["a_b"]["id"], voos["b_c_curta"]["id"]]
+
+def test_rede_acompanha_as_escritas(cliente, dados):
+    rede = _rede(dados)
+    voos = rede["voos"]
+    _buscar(cliente, rede)  # Carrega a rede antes das alterações
+
+    for nome in ("b_c", "b_c_curta"):
+        assert cliente.patch(f"/voos/{voos[nome]['id']}", json={"status": "Cancelado"}).status_code == 200
+    viagem = _buscar(cliente, rede, conexao_minima=30).json()
+    assert [voo["id"] for voo in viagem["voos"]] == [voos["a_c"]["id"]]
+    assert viagem["conexoes"] == 0
+
+def test_sem_viagem_no_horizonte_responde_404(cliente, dados):
+    rede = _rede(dados)
+    assert _buscar(cliente, rede, horizonte=0.5).status_code == 404
+    assert _buscar(cliente, rede, partida_apos="2030-02-01T00:00:00").status_code == 404
+
+# Sem `partida_apos` a busca parte de agora: a resposta não pode ser revalidada pelas versões
+def test_etag_apenas_com_partida_informada(cliente, dados):
+    rede = _rede(dados)
+    resposta = _buscar(cliente, rede)
+    etag = resposta.headers["ETag"]
+    assert _buscar(cliente, rede, headers={"If-None-Match": etag}).status_code == 304
+
+    depois = _buscar(cliente, rede, partida_apos="2030-01-17T16:15:00", headers={"If-None-Match": etag})
+    assert depois.status_code == 200
+    assert [voo["id"] for voo in depois.json()["voos"]] == [rede["voos"]["a_c"]["id"]]
+
+    partida = datetime.now().replace(microsecond=0) + timedelta(hours=1)
+    dados.voo(dados.aeronave(), origem=rede["a"], destino=rede["c"],
+              hr_partida=partida.isoformat(), hr_chegada=(partida + timedelta(hours=2)).isoformat())
+    agora = cliente.get("/voos/conexoes", params={"origem": rede["a"], "destino": rede["c"]}, headers={"If-None-Match": "*"})
+    assert agora.status_code == 200
+    assert "ETag" not in agora.headers
@@ -0,0 +1,61 @@
+from services.alteracoes import Alteracao
+from services.disponibilidade import Disponibilidade
+
+def test_voo_sobreposto_na_mesma_aeronave_responde_409(cliente, dados):
+    aeronave = dados.aeronave()
+    dados.voo(aeronave, inicio=0, duracao=2)
+
+    resposta = cliente.post("/voos/", json=dados.dados_voo(aeronave, inicio=1, duracao=2))
+    assert resposta.status_code == 409
+    # Encostar (chegada igual à partida seguinte) e voos cancelados não conflitam
+    assert cliente.post("/voos/", json=dados.dados_voo(aeronave, inicio=2, duracao=1)).status_code == 200
+    assert cliente.post("/voos/", json=dados.dados_voo(aeronave, inicio=1, status="Cancelado")).status_code == 200
+    # Outra aeronave no mesmo horário
+    assert cliente.post("/voos/", json=dados.dados_voo(dados.aeronave(), inicio=1)).status_code == 200
+
+def test_patch_para_horario_ocupado_responde_409(cliente, dados):
+    aeronave = dados.aeronave()
+    dados.voo(aeronave, inicio=10, duracao=2)
+    cancelado = dados.voo(aeronave, inicio=11, status="Cancelado")
+    livre = dados.voo(aeronave, inicio=20)
+
+    assert cliente.patch(f"/voos/{livre['id']}", json={"hr_partida": "2030-01-01T11:00:00"}).status_code == 409
+    assert cliente.patch(f"/voos/{cancelado['id']}", json={"status": "Agendado"}).status_code == 409
+    assert cliente.patch(f"/voos/{cancelado['id']}", json={"origem": "CNF"}).status_code == 200
+
+def test_lote_recusa_itens_em_conflito_entre_si(cliente, dados):
+    aeronave = dados.aeronave()
+    resposta = cliente.post("/voos/bulk", json=[
+        dados.dados_voo(aeronave, inicio=30),
+        dados.dados_voo(aeronave, inicio=31),
+        dados.dados_voo(aeronave, inicio=32),
+    ])
+    resultado = resposta.json()
+    assert resultado["sucesso"] == 2
+    assert [erro["indice"] for erro in resultado["erros"]] == [1]
+
+def test_aeronaves_disponiveis_no_intervalo(cliente, dados):
+    cia = dados.cia()
+    ocupada, livre = dados.aeronave(cia), dados.aeronave(cia)
+    dados.voo(ocupada, inicio=40, duracao=3)
+    dados.voo(livre, inicio=43, duracao=1)
+
+    resposta = cliente.get("/aeronaves/disponiveis", params={
+        "inicio": "2030-01-02T17:00:00", "fim": "2030-01-02T19:00:00", "cia_id": cia["id"],
+    })
+    assert [aeronave["id"] for aeronave in resposta.json()] == [livre["id"]]
+
+# Um commit publicado enquanto o índice lê o banco não se perde, esteja ou não no estado lido
+def test_alteracao_publicada_durante_a_carga_e_aplicada():
+    indice = Disponibilidade()
+    voo = {"id": 1, "aeronave_id": 7, "hr_partida": "2030-01-01T10:00:00", "hr_chegada": "2030-01-01T12:00:00", "status": "Agendado"}
+
+    def ler_banco(session):
+        indice.aplicar([Alteracao("voo", "insert", None, voo)])
+        return {"agendas": {}, "aeronave_voo": {}, "cia_aeronave": {7: 1}}
+
+    indice._ler_banco = ler_banco
+    indice.recarregar(None)
+
+    assert indice.aeronave_voo == {1: 7}
+    assert not indice._carregando and not indice._durante_carga
@@ -0,0 +1,84 @@
+from services.fila_status import FilaStatus
+import asyncio
+import time
+
+def _aguardar(cliente, condicao, prazo: float = 5.0) -> dict:
+    limite = time.monotonic() + prazo
+    while True:
+        resumo = cliente.get("/monitoramento/fila-status").json()
+        if condicao(resumo) or time.monotonic() > limite:
+            return resumo
+        time.sleep(0.02)
+
+def _voo(cliente, id: int) -> dict:
+    return cliente.get("/voos/", params={"id": id}).json()[0]
+
+# Sem a tarefa de gravação: as alterações ficam pendentes até gravar() ser chamado
+def test_alteracoes_do_mesmo_voo_sao_combinadas_e_sobrepostas_na_leitura(cliente, dados):
+    from database import engine
+
+    aeronave = dados.aeronave()
+    voo, outro = dados.voo(aeronave, inicio=300), dados.voo(aeronave, inicio=310)
+    fila = FilaStatus(durabilidade="memoria")
+
+    async def cenario():
+        for status in ("Atrasado", "Embarcando"):
+            assert (await fila.enfileirar([(voo["id"], status)]))[0] == [0]
+        await fila.enfileirar([(outro["id"], "Atrasado")])
+        pendente = fila.sobrepor([{"id": voo["id"], "status": "Agendado"}])
+        assert pendente[0]["status"] == "Embarcando"
+        assert _voo(cliente, voo["id"])["status"] == "Agendado"  # Ainda não gravado
+        await fila.gravar(engine)
+
+    asyncio.run(cenario())
+    resumo = fila.resumo()
+    assert (resumo["aceitas"], resumo["combinadas"], resumo["gravadas"], resumo["lotes"]) == (3, 1, 2, 1)
+    gravado = _voo(cliente, voo["id"])
+    assert (gravado["status"], gravado["versao"]) == ("Embarcando", voo["versao"] + 1)
+
+def test_status_enfileirado_aparece_na_leitura_e_e_gravado(cliente, dados):
+    voo = dados.voo(dados.aeronave(), inicio=320)
+
+    resposta = cliente.put(f"/voos/{voo['id']}/status", json={"status": "Atrasado"})
+    assert resposta.status_code == 202
+    assert _voo(cliente, voo["id"])["status"] == "Atrasado"  # Pendente ou já gravado
+
+    _aguardar(cliente, lambda resumo: resumo["pendentes"] == resumo["gravando"] == 0)
+    gravado = _voo(cliente, voo["id"])
+    assert (gravado["status"], gravado["versao"]) == ("Atrasado", voo["versao"] + 1)
+
+# Reativar um voo cancelado cuja aeronave já está ocupada no horário é recusado na gravação
+def test_status_que_reativa_voo_em_conflito_nao_e_gravado(cliente, dados):
+    aeronave = dados.aeronave()
+    dados.voo(aeronave, inicio=330)
+    cancelado = dados.voo(aeronave, inicio=331, status="Cancelado")
+    conflitos = cliente.get("/monitoramento/fila-status").json()["conflitos"]
+
+    assert cliente.put(f"/voos/{cancelado['id']}/status", json={"status": "Agendado"}).status_code == 202
+
+    resumo = _aguardar(cliente, lambda resumo: resumo["conflitos"] > conflitos)
+    assert resumo["conflitos"] == conflitos + 1
+    assert _voo(cliente, cancelado["id"])["status"] == "Cancelado"
+
+# No modo "commit" a requisição espera a gravação e recebe o motivo da recusa
+def test_modo_commit_informa_o_conflito(cliente, dados):
+    from database import engine
+
+    aeronave = dados.aeronave()
+    dados.voo(aeronave, inicio=340)
+    cancelado = dados.voo(aeronave, inicio=341, status="Cancelado")
+    livre = dados.voo(aeronave, inicio=350, status="Cancelado")
+    fila = FilaStatus(durabilidade="commit")
+
+    async def cenario():
+        tarefa = asyncio.create_task(fila.gravar_periodicamente(engine))
+        try:
+            return await fila.enfileirar([(cancelado["id"], "Agendado"), (livre["id"], "Agendado")])
+        finally:
+            await fila.encerrar(tarefa)
+
+    aceitos, conflitos = asyncio.run(cenario())
+    assert aceitos == [1]
+    assert list(conflitos) == [0] and "já alocada" in conflitos[0]
+    assert _voo(cliente, cancelado["id"])["status"] == "Cancelado"
+    assert _voo(cliente, livre["id"])["status"] == "Agendado"
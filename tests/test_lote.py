@@ -0,0 +1,23 @@
+def test_insercao_em_lote_com_erros_por_item(cliente, dados):
+    aeronave = dados.aeronave()
+    resposta = cliente.post("/voos/bulk", json=[
+        dados.dados_voo(aeronave, inicio=700),
+        {"numero_voo": "não é número"},
+        dados.dados_voo(aeronave, inicio=710, aeronave_id=10**9),
+    ])
+    resultado = resposta.json()
+    assert (resultado["processados"], resultado["sucesso"]) == (3, 1)
+    assert [erro["indice"] for erro in resultado["erros"]] == [1, 2]
+    assert cliente.get("/voos/", params={"id": resultado["ids"][0]}).json()[0]["aeronave_id"] == aeronave["id"]
+
+def test_exclusao_em_lote_conta_ids_repetidos_uma_vez(cliente, dados):
+    aeronave = dados.aeronave()
+    voo, outro = dados.voo(aeronave, inicio=720), dados.voo(aeronave, inicio=730)
+
+    resposta = cliente.request("DELETE", "/voos/bulk", json=[voo["id"], {"id": voo["id"]}, outro["id"], 10**9])
+    resultado = resposta.json()
+
+    assert (resultado["sucesso"], resultado["ids"]) == (2, [voo["id"], outro["id"]])
+    assert [erro["indice"] for erro in resultado["erros"]] == [1, 3]
+    assert "repetido" in resultado["erros"][0]["detalhe"]
+    assert cliente.get("/voos/", params={"id": voo["id"]}).json() == []
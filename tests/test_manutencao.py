@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+# Sem `referencia` a resposta depende do relógio: não pode ser revalidada pelas versões das tabelas
+def test_referencia_padrao_nao_envia_etag(cliente, dados):
+    cia = dados.cia()
+    proximo = (datetime.now() + timedelta(days=5)).isoformat()
+    dados.aeronave(cia, next_check=proximo)
+
+    resposta = cliente.get("/aeronaves/manutencao", params={"cia_id": cia["id"]})
+    assert resposta.status_code == 200
+    assert "ETag" not in resposta.headers
+    resposta = cliente.get("/aeronaves/manutencao", params={"cia_id": cia["id"]}, headers={"If-None-Match": "*"})
+    assert resposta.status_code == 200
+
+def test_etag_acompanha_a_referencia(cliente, dados):
+    cia = dados.cia()
+    dados.aeronave(cia, next_check="2030-01-10T00:00:00")
+    parametros = {"cia_id": cia["id"], "dias": 30}
+
+    resposta = cliente.get("/aeronaves/manutencao", params={**parametros, "referencia": "2030-01-01T00:00:00"})
+    etag = resposta.headers["ETag"]
+    assert resposta.json()["aeronaves"][0]["dias_restantes"] == 9
+    revalidada = cliente.get("/aeronaves/manutencao", params={**parametros, "referencia": "2030-01-01T00:00:00"},
+                             headers={"If-None-Match": etag})
+    assert revalidada.status_code == 304
+
+    # Outra referência, mesmas tabelas: o ETag antigo não vale
+    resposta = cliente.get("/aeronaves/manutencao", params={**parametros, "referencia": "2030-01-02T00:00:00"},
+                           headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+    assert resposta.json()["aeronaves"][0]["dias_restantes"] == 8
@@ -0,0 +1,74 @@
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel
+from migracoes import aplicar_migracoes, criar_indices_ausentes, verificar_planos
+from models import aeronave, cia, voo  # noqa: F401  (registra as tabelas no metadata)
+import logging
+
+def test_consultas_usam_os_indices(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'planos.db'}")
+    SQLModel.metadata.create_all(engine)
+    aplicar_migracoes(engine)
+
+    planos = verificar_planos(engine)
+    assert planos
+    sem_indice = {nome: plano for nome, (usa_indice, plano) in planos.items() if not usa_indice}
+    assert not sem_indice
+
+def test_banco_antigo_recebe_colunas_e_indices(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'antigo.db'}")
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql("CREATE TABLE cia (id INTEGER PRIMARY KEY, nome VARCHAR NOT NULL, cod_iata VARCHAR NOT NULL)")
+        conexao.exec_driver_sql("INSERT INTO cia (nome, cod_iata) VALUES ('Azul', 'AD')")
+    SQLModel.metadata.create_all(engine)
+    aplicar_migracoes(engine)
+
+    with engine.connect() as conexao:
+        assert conexao.execute(text("SELECT versao FROM cia")).scalar_one() == 1
+        indices = {linha[1] for linha in conexao.exec_driver_sql("PRAGMA index_list(cia)")}
+    assert "ix_cia_cod_iata" in indices
+
+def test_indice_unico_com_duplicados_nao_impede_a_inicializacao(tmp_path, caplog):
+    engine = create_engine(f"sqlite:///{tmp_path / 'duplicados.db'}")
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql("CREATE TABLE cia (id INTEGER PRIMARY KEY, nome VARCHAR NOT NULL, cod_iata VARCHAR NOT NULL)")
+        conexao.exec_driver_sql("INSERT INTO cia (nome, cod_iata) VALUES ('Azul', 'AD'), ('Azul 2', 'AD'), ('Gol', 'G3')")
+    SQLModel.metadata.create_all(engine)
+
+    with caplog.at_level(logging.WARNING, logger="migracoes"):
+        criados = criar_indices_ausentes(engine)
+
+    assert "ix_cia_cod_iata" not in criados
+    assert "ix_cia_nome" in criados
+    assert "ix_cia_cod_iata" in caplog.text and "'AD'" in caplog.text
+
+def test_tabela_voo_antiga_recebe_autoincremento(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sem_autoincremento.db'}")
+    with engine.begin() as conexao:
+        conexao.exec_driver_sql(
+            "CREATE TABLE voo (id INTEGER PRIMARY KEY, numero_voo INTEGER NOT NULL, origem VARCHAR NOT NULL,"
+            " destino VARCHAR NOT NULL, hr_partida DATETIME NOT NULL, hr_chegada DATETIME NOT NULL,"
+            " status VARCHAR NOT NULL, aeronave_id INTEGER NOT NULL, cia_id INTEGER NOT NULL)"
+        )
+        conexao.exec_driver_sql(
+            "INSERT INTO voo VALUES (1, 10, 'Guarulhos', 'Galeão', '2020-01-01 10:00:00', '2020-01-01 11:00:00', 'Agendado', 1, 1)"
+        )
+        # Voo já arquivado com id maior que os da tabela quente
+        conexao.exec_driver_sql("CREATE TABLE voo_arquivo_201912 AS SELECT * FROM voo WHERE 0")
+        conexao.exec_driver_sql("INSERT INTO voo_arquivo_201912 SELECT 7, 11, origem, destino, hr_partida, hr_chegada, status, 1, 1 FROM voo")
+    SQLModel.metadata.create_all(engine)
+    aplicar_migracoes(engine)
+
+    with engine.begin() as conexao:
+        ddl = conexao.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'voo'").scalar()
+        assert "AUTOINCREMENT" in ddl
+        assert conexao.exec_driver_sql("SELECT versao FROM voo WHERE id = 1").scalar() == 1
+        novo = conexao.exec_driver_sql(
+            "INSERT INTO voo (numero_voo, origem, destino, hr_partida, hr_chegada, status, aeronave_id, cia_id)"
+            " VALUES (12, 'Confins', 'Galeão', '2020-02-01 10:00:00', '2020-02-01 11:00:00', 'Agendado', 1, 1) RETURNING id"
+        ).scalar()
+        assert novo == 8
+        # Índices e busca textual recriados sobre a tabela nova
+        indices = {linha[1] for linha in conexao.exec_driver_sql("PRAGMA index_list(voo)")}
+        assert "ix_voo_hr_partida_id" in indices
+        encontrados = conexao.exec_driver_sql("SELECT rowid FROM busca_voo WHERE busca_voo MATCH 'Confins'").scalars().all()
+        assert encontrados == [8]
@@ -0,0 +1,44 @@
+from base64 import urlsafe_b64encode
+import json
+import pytest
+
+def _cursor(conteudo) -> str:
+    return urlsafe_b64encode(json.dumps(conteudo).encode()).decode().rstrip("=")
+
+def test_cursor_percorre_todas_as_paginas(cliente, dados):
+    aeronave = dados.aeronave()
+    cia = cliente.get(f"/cias/{aeronave['cia_id']}").json()
+    # Partidas repetidas: o id desempata a chave (hr_partida, id)
+    criados = [dados.voo(aeronave, inicio=10 * (indice // 2), duracao=1 + indice % 2 * 3, status="Cancelado") for indice in range(7)]
+
+    ids, cursor = [], None
+    while True:
+        parametros = {"companhia_nome": cia["nome"], "ordenacao": "hr_partida", "limit": 3}
+        if cursor:
+            parametros["cursor"] = cursor
+        resposta = cliente.get("/voos/", params=parametros)
+        assert resposta.status_code == 200
+        ids += [voo["id"] for voo in resposta.json()]
+        cursor = resposta.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+
+    esperados = [voo["id"] for voo in sorted(criados, key=lambda voo: (voo["hr_partida"], voo["id"]))]
+    assert ids == esperados
+
+@pytest.mark.parametrize("cursor", [
+    "nao-e-base64!",
+    _cursor(["id"]),
+    _cursor({"k": ["id"]}),
+    _cursor({"k": ["hr_partida", "id"], "v": ["2030-01-01T00:00:00", 1]}),  # Outra ordenação
+    _cursor({"k": ["id"], "v": [{"a": 1}]}),
+    _cursor({"k": ["id"], "v": [[1, 2]]}),
+])
+def test_cursor_malformado_responde_400(cliente, cursor):
+    resposta = cliente.get("/voos/", params={"cursor": cursor})
+    assert resposta.status_code == 400, resposta.text
+
+def test_cursor_com_data_invalida_responde_400(cliente):
+    cursor = _cursor({"k": ["hr_partida", "id"], "v": ["ontem", 1]})
+    resposta = cliente.get("/voos/", params={"cursor": cursor, "ordenacao": "hr_partida"})
+    assert resposta.status_code == 400
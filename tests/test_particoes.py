@@ -0,0 +1,32 @@
+from datetime import datetime
+from sqlalchemy import create_engine, text
+from sqlmodel import SQLModel
+from migracoes import aplicar_migracoes
+from services import particoes
+
+# Todos os voos arquivados e o mais recente excluído: o próximo id não repete um id do arquivo
+def test_ids_nao_sao_reutilizados_apos_arquivamento(tmp_path, monkeypatch):
+    monkeypatch.setattr(particoes, "_particoes", None)  # A lista em cache é da base dos outros testes
+    engine = create_engine(f"sqlite:///{tmp_path / 'particoes.db'}")
+    SQLModel.metadata.create_all(engine)
+    aplicar_migracoes(engine)
+    inserir = text(
+        "INSERT INTO voo (numero_voo, origem, destino, hr_partida, hr_chegada, status, aeronave_id, cia_id)"
+        " VALUES (1, 'GRU', 'GIG', :partida, :chegada, 'Agendado', 1, 1) RETURNING id"
+    )
+    with engine.begin() as conexao:
+        ids = [
+            conexao.execute(inserir, {"partida": f"2020-01-0{dia} 10:00:00", "chegada": f"2020-01-0{dia} 11:00:00"}).scalar()
+            for dia in (1, 2)
+        ]
+        recente = conexao.execute(inserir, {"partida": "2099-01-01 10:00:00", "chegada": "2099-01-01 11:00:00"}).scalar()
+
+    assert particoes.arquivar(engine, corte=datetime(2021, 1, 1)) == 2
+    with engine.begin() as conexao:
+        conexao.execute(text("DELETE FROM voo WHERE id = :id"), {"id": recente})
+        assert conexao.execute(text("SELECT count(*) FROM voo")).scalar() == 0
+        novo = conexao.execute(inserir, {"partida": "2099-02-01 10:00:00", "chegada": "2099-02-01 11:00:00"}).scalar()
+        arquivados = conexao.execute(text("SELECT id FROM voo_arquivo_202001 ORDER BY id")).scalars().all()
+
+    assert arquivados == ids
+    assert novo == recente + 1
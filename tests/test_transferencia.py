@@ -0,0 +1,26 @@
+from services.transferencia import LeitorLinhas
+
+def test_campo_com_quebra_de_linha_entre_blocos():
+    leitor = LeitorLinhas("csv")
+    primeiro = leitor.ler(["id,origem,destino", '1,"Linha 1', ""])
+    segundo = leitor.ler(['Linha 3","Diz ""oi"""\r', "2,GRU,GIG\r"], final=True)
+
+    assert primeiro == []
+    assert segundo == [
+        {"id": "1", "origem": "Linha 1\n\nLinha 3", "destino": 'Diz "oi"'},
+        {"id": "2", "origem": "GRU", "destino": "GIG"},
+    ]
+
+# Exporta, exclui o voo e importa o arquivo inteiro: os demais voos já existem (erro por id
+# duplicado) e só o excluído volta, com os campos de várias linhas intactos
+def test_exportacao_e_importacao_preservam_campos_com_quebra_de_linha(cliente, dados):
+    voo = dados.voo(dados.aeronave(), inicio=600, origem="Terminal 1\nPortão 5", destino='Rio, "Galeão"\r\nRJ')
+    exportado = cliente.get("/voos/export", params={"formato": "csv"}).content
+    total = cliente.get("/voos/export", params={"formato": "ndjson"}).text.count("\n")
+    assert cliente.delete(f"/voos/{voo['id']}").status_code == 200
+
+    resumo = cliente.post("/voos/import", params={"formato": "csv"}, content=exportado).json()
+
+    assert (resumo["processados"], resumo["sucesso"]) == (total, 1)
+    importado = cliente.get("/voos/", params={"id": voo["id"]}).json()[0]
+    assert (importado["origem"], importado["destino"]) == (voo["origem"], voo["destino"])
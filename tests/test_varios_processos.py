@@ -0,0 +1,49 @@
+# Com vários workers, o estado de um processo não vê as escritas dos outros: versões e conflitos de
+# horário vêm do banco. As escritas "de outro worker" são simuladas direto no banco
+from sqlalchemy import text
+import pytest
+
+@pytest.fixture
+def varios_workers(monkeypatch):
+    monkeypatch.setenv("SERVIDOR_WORKERS", "2")
+
+def _executar(sql: str, **parametros) -> None:
+    from database import engine
+
+    with engine.begin() as conexao:
+        conexao.execute(text(sql), parametros)
+
+def test_etag_muda_com_escrita_de_outro_worker(cliente, varios_workers):
+    etag = cliente.get("/voos/").headers["ETag"]
+    assert cliente.get("/voos/", headers={"If-None-Match": etag}).status_code == 304
+
+    _executar("UPDATE versao_tabela SET versao = versao + 1 WHERE tabela = 'voo'")
+    assert cliente.get("/voos/", headers={"If-None-Match": etag}).status_code == 200
+
+def test_conflito_com_voo_gravado_por_outro_worker(cliente, dados, varios_workers):
+    aeronave = dados.aeronave()
+    dados.voo(aeronave, inicio=500)  # Carrega o índice em memória
+    _executar(
+        "INSERT INTO voo (numero_voo, origem, destino, hr_partida, hr_chegada, status, aeronave_id, cia_id, versao)"
+        " VALUES (1, 'GRU', 'GIG', '2030-01-21 22:00:00.000000', '2030-01-22 00:00:00.000000', 'Agendado', :aeronave, :cia, 1)",
+        aeronave=aeronave["id"], cia=aeronave["cia_id"],
+    )
+
+    resposta = cliente.post("/voos/", json=dados.dados_voo(aeronave, inicio=503))
+    assert resposta.status_code == 409
+    assert cliente.post("/voos/", json=dados.dados_voo(aeronave, inicio=506)).status_code == 200
+
+def test_cache_em_memoria_desativado(cliente, varios_workers):
+    assert cliente.get("/monitoramento/cache").json()["ativo"] is False
+
+def test_com_replicas_nao_ha_etag_nem_cache(cliente, monkeypatch):
+    import database
+    from services import cache
+
+    monkeypatch.setattr(database, "DATABASE_URL_REPLICAS", ["sqlite://"])
+    monkeypatch.setattr(cache, "DATABASE_URL_REPLICAS", ["sqlite://"])
+    resposta = cliente.get("/cias/")
+    assert resposta.status_code == 200
+    assert "ETag" not in resposta.headers and "Last-Modified" not in resposta.headers
+    assert cliente.get("/cias/", headers={"If-None-Match": "*"}).status_code == 200
+    assert cliente.get("/monitoramento/cache").json()["ativo"] is False
@@ -0,0 +1,39 @@
+def _revalidar(cliente, url: str, etag: str, **parametros):
+    return cliente.get(url, params=parametros, headers={"If-None-Match": etag})
+
+def test_etag_responde_304_ate_uma_escrita(cliente, dados):
+    aeronave = dados.aeronave()
+    resposta = cliente.get("/voos/")
+    etag = resposta.headers["ETag"]
+    assert resposta.headers["Last-Modified"]
+
+    assert _revalidar(cliente, "/voos/", etag).status_code == 304
+    dados.voo(aeronave, inicio=200)
+    resposta = _revalidar(cliente, "/voos/", etag)
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+
+# GET /voos?companhia_nome= lê a tabela cia no filtro: renomear a cia muda o resultado e o ETag
+def test_escrita_em_tabela_do_filtro_invalida_o_etag(cliente, dados):
+    aeronave = dados.aeronave()
+    dados.voo(aeronave, inicio=210)
+    cia = cliente.get(f"/cias/{aeronave['cia_id']}").json()
+    resposta = cliente.get("/voos/", params={"companhia_nome": cia["nome"]})
+    assert len(resposta.json()) == 1
+    etag = resposta.headers["ETag"]
+
+    novo_nome = cia["nome"].replace("Cia Teste", "Renomeada")
+    assert cliente.put(f"/cias/{cia['id']}", json={"nome": novo_nome, "cod_iata": cia["cod_iata"]}).status_code == 200
+
+    resposta = _revalidar(cliente, "/voos/", etag, companhia_nome=cia["nome"])
+    assert resposta.status_code == 200
+    assert resposta.json() == []
+
+def test_escrita_em_lote_invalida_o_etag_das_rotas_com_juncao(cliente, dados):
+    aeronave = dados.aeronave()
+    etag = cliente.get("/aeronaves/aeronaves-completas").headers["ETag"]
+    assert _revalidar(cliente, "/aeronaves/aeronaves-completas", etag).status_code == 304
+
+    resposta = cliente.patch("/cias/bulk", json=[{"id": aeronave["cia_id"], "nome": "Alterada em lote"}])
+    assert resposta.json()["sucesso"] == 1
+    assert _revalidar(cliente, "/aeronaves/aeronaves-completas", etag).status_code == 200